@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+# Lista de directorios relevantes en Godot (es decir, que contienen archivos .llvm.o)
+SEARCH_DIRS = ["core", "drivers", "editor", "main", "modules", "platform", "scene", "servers", "thirdparty"]
+
+# Bitcode "crudo" (BC 0xC0DE) y bitcode con wrapper (0x0B17C0DE, little endian), lo mismo que reconoce `file`
+BITCODE_MAGICS = (b"BC\xc0\xde", b"\xde\xc0\x17\x0b")
+
+CHUNK_SIZE = 1 << 20
+
+def scan_objects(root, search_dirs):
+    objs = []
+    for d in search_dirs:
+        for dirpath, _, filenames in os.walk(os.path.join(root, d)):
+            objs.extend(os.path.relpath(os.path.join(dirpath, f), root) for f in filenames if f.endswith(".llvm.o"))
+    return sorted(objs)
+
+def inspect_object(path):
+    # Comprueba los bytes mágicos y calcula el hash en una sola lectura del archivo
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        head = f.read(CHUNK_SIZE)
+        is_bitcode = head[:4] in BITCODE_MAGICS
+        if is_bitcode:
+            while head:
+                digest.update(head)
+                head = f.read(CHUNK_SIZE)
+    return is_bitcode, digest.hexdigest() if is_bitcode else None
+
+def inspect_objects(root, objs, manifest, jobs):
+    """
+    Valida y calcula el hash de los objetos en paralelo. Los que no han cambiado de tamaño ni de fecha
+    desde la ejecución anterior reutilizan lo guardado en el manifiesto.
+    """
+    result = {}
+    pending = []
+    for obj in objs:
+        st = os.stat(os.path.join(root, obj))
+        previous = manifest.get(obj)
+        if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+            result[obj] = previous
+        else:
+            pending.append((obj, st))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        inspected = executor.map(lambda item: inspect_object(os.path.join(root, item[0])), pending)
+        for (obj, st), (is_bitcode, sha256) in zip(pending, inspected):
+            result[obj] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "bitcode": is_bitcode, "sha256": sha256}
+    return result, len(pending)
+
+def partition_key(obj, depth):
+    # Los primeros `depth` niveles de directorio (p. ej. modules/gdscript o thirdparty/harfbuzz)
+    parts = Path(obj).parent.parts
+    return "/".join(parts[:depth]) or "."
+
+def partition_hash(objs, objects):
+    digest = hashlib.sha256()
+    for obj in objs:
+        digest.update(f"{obj}\0{objects[obj]['sha256']}\n".encode())
+    return digest.hexdigest()
+
+def llvm_link(llvm_link_bin, inputs, output):
+    tmp = f"{output}.tmp"
+    result = subprocess.run([llvm_link_bin, *inputs, "-o", tmp], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if result.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False, result.stdout
+    os.replace(tmp, output)
+    return True, result.stdout
+
+def load_json(path, default):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return default
+
+def save_json(data, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Enlaza el bitcode de Godot (*.llvm.o) en un solo módulo, de forma incremental: valida los objetos "
+                    "en paralelo, enlaza cada partición (directorio) por separado con caché en disco y solo reenlaza "
+                    "las particiones que han cambiado."
+    )
+    parser.add_argument("--root", default=".", help="Carpeta raíz del código de Godot (por defecto, la actual).")
+    parser.add_argument("--dirs", nargs="+", default=SEARCH_DIRS, help="Directorios en los que buscar los *.llvm.o.")
+    parser.add_argument("--output", default="godot.bc", help="Bitcode global de salida.")
+    parser.add_argument("--cache", default=".link_bitcode_cache", help="Carpeta de la caché (relativa a --root).")
+    parser.add_argument("--depth", type=int, default=2, help="Niveles de directorio que definen una partición.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Procesos/hilos en paralelo.")
+    parser.add_argument("--llvm-link", default="llvm-link", help="Ejecutable de llvm-link.")
+    parser.add_argument("--force", action="store_true", help="Ignorar la caché y enlazarlo todo de nuevo.")
+    args = parser.parse_args()
+
+    root = args.root
+    cache = os.path.join(root, args.cache)
+    output = os.path.join(root, args.output)
+    Path(os.path.join(cache, "partitions")).mkdir(parents=True, exist_ok=True)
+    manifest_path = os.path.join(cache, "manifest.json")
+    manifest = {} if args.force else load_json(manifest_path, {})
+
+    print("Escaneando las siguientes carpetas para buscar LLVM bitcode:")
+    for d in args.dirs:
+        print(f"   - {d}/")
+
+    objs = scan_objects(root, args.dirs)
+    objects, inspected = inspect_objects(root, objs, manifest.get("objects", {}), args.jobs)
+    valid_objs = [obj for obj in objs if objects[obj]["bitcode"]]
+    for obj in objs:
+        if not objects[obj]["bitcode"]:
+            print(f"[!] Ignorado (no es bitcode): {obj}")
+
+    print(f"Encontrados {len(valid_objs)} archivos válidos en bitcode ({inspected} nuevos o modificados).")
+
+    if not valid_objs:
+        print("[ERROR] No hay nada que enlazar. ¿Has incluido el flag -emit-llvm en el ccflags del scons?")
+        sys.exit(1)
+
+    # Particiones: enlace parcial por directorio, reutilizado mientras no cambie ninguno de sus objetos
+    partitions = {}
+    for obj in valid_objs:
+        partitions.setdefault(partition_key(obj, args.depth), []).append(obj)
+
+    previous = {} if args.force else manifest.get("partitions", {})
+    metadata = []
+    to_link = []
+    for key in sorted(partitions):
+        members = partitions[key]
+        bitcode = os.path.join(cache, "partitions", ("_root" if key == "." else key.replace("/", "__")) + ".bc")
+        entry = {"name": key, "hash": partition_hash(members, objects), "bitcode": os.path.relpath(bitcode, root),
+                 "object_count": len(members), "objects": members}
+        metadata.append(entry)
+        if previous.get(key, {}).get("hash") != entry["hash"] or not os.path.exists(bitcode):
+            to_link.append((entry, bitcode))
+
+    print(f"{len(partitions)} particiones, {len(to_link)} por enlazar.")
+
+    def link_partition(item):
+        entry, bitcode = item
+        return llvm_link(args.llvm_link, [os.path.join(root, obj) for obj in entry["objects"]], bitcode)
+
+    failed = set()
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        for (entry, _), (ok, log) in zip(to_link, executor.map(link_partition, to_link)):
+            if ok:
+                print(f"   [OK] {entry['name']} ({entry['object_count']} objetos)")
+            else:
+                failed.add(entry["name"])
+                print(f"   [ERROR] {entry['name']}:\n{log}")
+
+    # Las particiones que han fallado no se guardan en el manifiesto, para reintentarlas la próxima vez
+    save_json({
+        "objects": objects,
+        "partitions": {entry["name"]: entry for entry in metadata if entry["name"] not in failed}
+    }, manifest_path)
+    if failed:
+        print("[ERROR] Algo falló al enlazar.")
+        sys.exit(1)
+
+    # Enlace final de las particiones, solo si alguna ha cambiado
+    final_hash = hashlib.sha256("".join(entry["hash"] for entry in metadata).encode()).hexdigest()
+    partitions_path = os.path.splitext(output)[0] + ".partitions.json"
+    previous_metadata = load_json(partitions_path, {})
+    if not args.force and os.path.exists(output) and previous_metadata.get("hash") == final_hash:
+        print(f"[OK] Sin cambios, el bitcode global ya está al día: {output}")
+        return
+
+    print(f"Enlazando en: {output}")
+    ok, log = llvm_link(args.llvm_link, [os.path.join(root, entry["bitcode"]) for entry in metadata], output)
+    if not ok:
+        print(log)
+        print("[ERROR] Algo falló al enlazar.")
+        sys.exit(1)
+
+    # Metadatos de las particiones del módulo, para las etapas posteriores (opt y codegen por partición)
+    save_json({"output": os.path.relpath(output, root), "hash": final_hash, "partitions": metadata}, partitions_path)
+    print(f"[OK] Bitcode global generado: {output}")
+    print(f"[OK] Metadatos de las particiones: {partitions_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import glob
+import json
+import os
+import queue
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Versión en Python de base_binaries_benchmark.sh, con las mismas opciones (--all|--benchmark, --dirs,
+# --repetitions y --strategy) y los mismos ficheros de salida, más:
+#   - tiempos en nanosegundos (perf_counter_ns) y CPU de usuario/sistema y RSS máximo de cada ejecución (wait4)
+#   - cada sesión escribe en su propia carpeta (results/<timestamp>/<binario>/...), para que una nueva sesión no
+#     sobrescriba los resultados de las anteriores (ni los borre del almacén de --store)
+#   - un manifiesto (results/<timestamp>/manifest.json) que permite reanudar la última sesión interrumpida con --resume
+#   - ejecución en paralelo con --jobs, opcionalmente fijando cada trabajador a sus propios núcleos (--pin)
+#   - volcado directo de cada resultado al almacén Parquet de base_binaries_benchmark_results (--store)
+
+RESULTS_DIR = "results"
+MANIFEST_NAME = "manifest.json"
+
+_LOG_LOCK = threading.Lock()
+
+def log_msg(msg, log_file):
+    with _LOG_LOCK:
+        print(msg, flush=True)
+        with open(log_file, "a") as f:
+            f.write(msg + "\n")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ejecuta godot-benchmarks con varios binarios base.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--all", action="store_true", help="Ejecuta todos los benchmarks disponibles")
+    mode.add_argument("--benchmark",
+                      help="Ejecuta solo el benchmark indicado (ej. animation/animation_tree/animation_tree_quads)")
+    parser.add_argument("--dirs", nargs="+", required=True, help="Directorios con binarios base a usar")
+    parser.add_argument("--repetitions", type=int, required=True, help="Número de repeticiones")
+    parser.add_argument("--strategy", required=True, choices=["by-binary", "round-robin"], help="Estrategia de repetición")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Ejecuciones simultáneas (por defecto 1, en serie como el script original)")
+    parser.add_argument("--pin", action="store_true",
+                        help="Fijar cada trabajador a un subconjunto propio de núcleos (con taskset)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continuar la última sesión, saltando las iteraciones que su manifiesto da por completadas")
+    parser.add_argument("--store", help="Dataset Parquet (ResultsStore) al que añadir cada resultado según termina")
+    parser.add_argument("--machine", default=socket.gethostname(), help="Nombre de la máquina en el almacén")
+    args = parser.parse_args()
+    if args.repetitions < 1:
+        parser.error("'--repetitions' requiere un número entero positivo")
+    if args.jobs < 1:
+        parser.error("'--jobs' requiere un número entero positivo")
+    if args.pin and shutil.which("taskset") is None:
+        parser.error("--pin necesita taskset (util-linux)")
+    return args
+
+def prepare_binaries(dirs, log_file):
+    binaries = {}
+    for d in dirs:
+        name = os.path.basename(os.path.normpath(d))
+        candidates = sorted(glob.glob(os.path.join(d, "*.out")))
+        binary = candidates[0] if candidates else None
+        if binary is None or not os.access(binary, os.X_OK):
+            log_msg(f"  ⚠️  Binario no encontrado o no ejecutable en '{d}'", log_file)
+            continue
+        binaries[name] = binary
+    return binaries
+
+def cpu_slots(jobs):
+    # Reparte los núcleos disponibles en `jobs` bloques contiguos y disjuntos
+    cpus = sorted(os.sched_getaffinity(0))
+    size = max(1, len(cpus) // jobs)
+    slots = queue.Queue()
+    for i in range(jobs):
+        block = cpus[i * size:(i + 1) * size] or cpus[-size:]
+        slots.put(",".join(map(str, block)))
+    return slots
+
+def latest_session():
+    # Las sesiones se nombran con su timestamp, así que la última es la mayor
+    sessions = sorted(d for d in os.listdir(RESULTS_DIR) if os.path.exists(os.path.join(RESULTS_DIR, d, MANIFEST_NAME)))
+    return sessions[-1] if sessions else None
+
+def run_one_benchmark(session_dir, binary, name, iteration, suffix, benchmark_args, cpus=None):
+    """
+    Ejecuta una iteración con un binario y mide el tiempo real en ns y el uso de recursos del proceso.
+    """
+    results_dir = os.path.join(session_dir, name)
+    os.makedirs(results_dir, exist_ok=True)
+    output_file = os.path.join(results_dir, f"results_{name}_{suffix}_iter{iteration}.json")
+    stdout_file = os.path.join(results_dir, f"stdout_{name}_{suffix}_iter{iteration}.txt")
+    stderr_file = os.path.join(results_dir, f"stderr_{name}_{suffix}_iter{iteration}.txt")
+
+    command = [binary, "--", *benchmark_args, f"--save-json={output_file}"]
+    if cpus is not None:
+        command = ["taskset", "-c", cpus, *command]
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    with open(stdout_file, "w") as out, open(stderr_file, "w") as err:
+        start = time.perf_counter_ns()
+        process = subprocess.Popen(command, stdout=out, stderr=err)
+        # wait4 en vez de wait(): devuelve también el rusage del proceso (taskset hace exec, mismo pid)
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall_ns = time.perf_counter_ns() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    return {
+        "binary": binary,
+        "output": output_file,
+        "started_at": started_at,
+        "returncode": process.returncode,
+        "success": process.returncode == 0 and os.path.exists(output_file),
+        "wall_ns": wall_ns,
+        "user_s": rusage.ru_utime,
+        "sys_s": rusage.ru_stime,
+        "max_rss_kb": rusage.ru_maxrss,
+        "cpus": cpus
+    }
+
+def main():
+    args = parse_args()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_file = os.path.join(RESULTS_DIR, f"benchmark_log_{timestamp}.txt")
+
+    binaries = prepare_binaries(args.dirs, log_file)
+    if not binaries:
+        print("Error: no se encontró ningún binario válido.")
+        sys.exit(1)
+
+    if args.benchmark:
+        suffix = re.sub(r"[^A-Za-z0-9_]", "", args.benchmark.replace("/", "_").replace(".", "_"))
+        benchmark_args = ["--run-benchmarks", f"--include-benchmarks={args.benchmark}"]
+    else:
+        suffix = "all"
+        benchmark_args = ["--run-benchmarks"]
+
+    session = latest_session() if args.resume else None
+    if args.resume and session is None:
+        print("Error: no hay ninguna sesión que reanudar en " + RESULTS_DIR)
+        sys.exit(1)
+    session = session or timestamp
+    session_dir = os.path.join(RESULTS_DIR, session)
+    os.makedirs(session_dir, exist_ok=True)
+    manifest_path = os.path.join(session_dir, MANIFEST_NAME)
+    manifest = {"runs": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    manifest_lock = threading.Lock()
+
+    def save_manifest():
+        tmp = f"{manifest_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, manifest_path)
+
+    # Orden de las ejecuciones según la estrategia
+    names = sorted(binaries)
+    if args.strategy == "by-binary":
+        tasks = [(name, i) for name in names for i in range(1, args.repetitions + 1)]
+    else:
+        tasks = [(name, i) for i in range(1, args.repetitions + 1) for name in names]
+
+    def run_key(name, i):
+        return f"{name}/{suffix}/iter{i}"
+
+    if args.resume:
+        done = {key for key, run in manifest["runs"].items() if run["success"] and os.path.exists(run["output"])}
+        skipped = [task for task in tasks if run_key(*task) in done]
+        tasks = [task for task in tasks if run_key(*task) not in done]
+    else:
+        skipped = []
+
+    log_msg("=== CONFIGURACIÓN DE LA EJECUCIÓN ===", log_file)
+    log_msg(f"Sesión:         {session_dir}", log_file)
+    log_msg(f"Benchmark:      {args.benchmark or 'ALL'}", log_file)
+    log_msg(f"Repeticiones:   {args.repetitions}", log_file)
+    log_msg(f"Estrategia:     {args.strategy}", log_file)
+    log_msg(f"Trabajadores:   {args.jobs}{' (fijados a núcleos)' if args.pin else ''}", log_file)
+    log_msg("Binarios:", log_file)
+    for name in names:
+        log_msg(f"  - {name} => {binaries[name]}", log_file)
+    if skipped:
+        log_msg(f"Reanudando: {len(skipped)} iteraciones ya completadas se saltan", log_file)
+    log_msg("=====================================", log_file)
+
+    store = None
+    if args.store:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_binaries_benchmark_results"))
+        from results_store import ResultsStore, parse_results_file
+        store = ResultsStore(args.store)
+
+    slots = cpu_slots(args.jobs) if args.pin else None
+    total_iters = len(tasks)
+    progress = {"completed": 0, "elapsed_ns": 0}
+
+    def execute(task):
+        name, i = task
+        cpus = slots.get() if slots is not None else None
+        try:
+            log_msg(f"  [{name}] Iteración {i}: ejecutando...", log_file)
+            run = run_one_benchmark(session_dir, binaries[name], name, i, suffix, benchmark_args, cpus)
+        finally:
+            if cpus is not None:
+                slots.put(cpus)
+
+        with manifest_lock:
+            manifest["runs"][run_key(name, i)] = run
+            save_manifest()
+            if store is not None and run["success"]:
+                # Cada resultado entra en el almacén según termina (se compacta al final)
+                store.add({run["output"]: parse_results_file(run["output"], args.machine, name, i)})
+            progress["completed"] += 1
+            progress["elapsed_ns"] += run["wall_ns"]
+            completed = progress["completed"]
+            eta = (total_iters - completed) * progress["elapsed_ns"] / completed / 1e9 / args.jobs
+
+        eta_pretty = f"~{int(eta // 60)}m {int(eta % 60)}s" if eta >= 60 else f"~{int(eta)}s"
+        status = "✔" if run["success"] else "✘"
+        log_msg(f"    {status} [{name}] Duración: {run['wall_ns'] / 1e9:.3f}s | CPU: {run['user_s'] + run['sys_s']:.3f}s | "
+                f"RSS máx: {run['max_rss_kb'] / 1024:.1f} MiB | Iteraciones hechas: {completed}/{total_iters} | "
+                f"ETA: {eta_pretty}", log_file)
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        list(executor.map(execute, tasks))
+
+    if store is not None:
+        store.compact()
+
+    failed = [key for key, run in manifest["runs"].items() if not run["success"]]
+    if failed:
+        log_msg(f"⚠️  {len(failed)} iteraciones fallidas (se repiten con --resume): {', '.join(failed)}", log_file)
+
+if __name__ == "__main__":
+    main()
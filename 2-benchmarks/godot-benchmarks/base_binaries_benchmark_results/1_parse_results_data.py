@@ -1,72 +1,38 @@
 import argparse
 import os
-import json
-import pandas as pd
-import re
 
-def extract_info_from_path(file_path):
-    parts = file_path.split(os.sep)
-    machine = parts[-3]
-    version = parts[-2]
-    filename = os.path.basename(file_path)
-    iter_match = re.search(r'iter(\d+)', filename)
-    iteration = int(iter_match.group(1)) if iter_match else None
-    return machine, version, iteration
+from results_store import DATASET_NAME, ResultsStore
 
-def load_benchmark_file(filepath):
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    results = []
-    for bench in data.get("benchmarks", []):
-        entry = {
-            "category": bench.get("category"),
-            "benchmark": bench.get("name"),
-            "render_cpu": bench["results"].get("render_cpu"),
-            "render_gpu": bench["results"].get("render_gpu"),
-            "time": bench["results"].get("time"),
-            "idle": bench["results"].get("idle"),
-            "physics": bench["results"].get("physics"),
-        }
-        results.append(entry)
-    return results
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingiere de forma incremental los archivos JSON de resultados de godot-benchmarks en un dataset Parquet.")
+    parser.add_argument("--root", required=True, help="Directorio raíz que contiene los resultados JSON de los benchmarks")
+    parser.add_argument("--store", help=f"Directorio del dataset Parquet (por defecto <root>/ANALYSIS/{DATASET_NAME})")
+    parser.add_argument("--jobs", type=int, default=None, help="Procesos para parsear los JSON en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument("--csv", action="store_true", help="Exporta además el CSV unificado (ANALYSIS/parsed_results_data.csv) completo")
+    parser.add_argument("--compact", action="store_true", help="Reescribe el dataset en un único fichero Parquet tras la ingesta")
+    args = parser.parse_args()
 
-def collect_all_benchmarks(root_path):
-    all_data = []
+    output_dir = os.path.join(args.root, "ANALYSIS")
+    store = ResultsStore(args.store or os.path.join(output_dir, DATASET_NAME))
 
-    for dirpath, _, filenames in os.walk(root_path):
-        for filename in filenames:
-            if filename.startswith("results_") and filename.endswith(".json"):
-                filepath = os.path.join(dirpath, filename)
-                machine, version, iteration = extract_info_from_path(filepath)
-                try:
-                    benchmarks = load_benchmark_file(filepath)
-                    for bench in benchmarks:
-                        bench["machine"] = machine
-                        bench["version"] = version
-                        bench["iteration"] = iteration
-                        all_data.append(bench)
-                except Exception as e:
-                    print(f"Error al leer {filepath}: {e}")
+    new_files, new_rows, errors, removed_files = store.ingest(args.root, jobs=args.jobs)
+    for filepath, error in errors.items():
+        print(f"Error al leer {filepath}: {error}")
+    print(f"{new_files} archivos nuevos o modificados, {new_rows} filas añadidas.")
+    if removed_files:
+        print(f"{removed_files} archivos ya no existen: sus filas se han eliminado.")
 
-    df = pd.DataFrame(all_data)
+    if args.compact:
+        store.compact()
 
+    df = store.load(columns=["benchmark", "version"])
     if not df.empty:
-        counts = df.groupby("version")["benchmark"].nunique()
+        counts = df.groupby("version", observed=True)["benchmark"].nunique()
         print("Número de benchmarks únicos por versión:")
         print(counts)
+    print(f"{len(df)} filas en el dataset {store.path}")
 
-    return df
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Parsea los archivos JSON de resultados de godot-benchmarks y genera un CSV unificado.")
-    parser.add_argument("--root", required=True, help="Directorio raíz que contiene los resultados JSON de los benchmarks")
-    args = parser.parse_args()
-
-    df = collect_all_benchmarks(args.root)
-    print(f"{len(df)} filas cargadas.")
-
-    output_dir = os.path.join(args.root, "ANALYSIS")
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "parsed_results_data.csv")
-    df.to_csv(output_path, index=False)
-    print(f"Archivo exportado a {output_path}")
+    if args.csv:
+        output_path = os.path.join(output_dir, "parsed_results_data.csv")
+        store.export_csv(output_path)
+        print(f"Archivo exportado a {output_path}")
@@ -4,19 +4,19 @@ import argparse
 import logging
 import json
 
-import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from results_engine import AVAILABLE_STATISTICS as AVAILABLE_STATS
+from results_engine import load_and_filter, load_dataset, remove_outliers, split_list
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 sns.set_theme(style="whitegrid")
 
-AVAILABLE_STATS = ["time", "render_cpu", "render_gpu", "idle", "physics"]
-
 def validate_args(args):
-    if not os.path.isfile(args.csv):
-        logging.error(f"El archivo CSV no existe: {args.csv}")
+    if not os.path.exists(args.csv):
+        logging.error(f"El dataset no existe: {args.csv}")
         exit(1)
     stats = [s.strip() for s in args.statistic.split(",")]
     invalid = [s for s in stats if s not in AVAILABLE_STATS]
@@ -28,28 +28,6 @@ def validate_args(args):
         logging.error("Debes especificar al menos una versión en --versions.")
         exit(1)
 
-def load_and_filter(df, args):
-    stats = [s.strip() for s in args.statistic.split(",")]
-    df = df.dropna(subset=stats)
-    if args.machines:
-        machines = [m.strip() for m in args.machines.split(",")]
-        df = df[df["machine"].isin(machines)]
-    versions = [v.strip() for v in args.versions.split(",")]
-    df = df[df["version"].isin(versions)]
-    df["version"] = pd.Categorical(df["version"], categories=versions, ordered=True)
-    logging.info(f"Filtrado final: {len(df)} filas.")
-    return df, versions
-
-def remove_outliers(df, stat):
-    logging.info(f"Eliminando outliers en '{stat}'…")
-    kept = []
-    for (_, _), group in df.groupby(["benchmark", "version"]):
-        q1, q3 = group[stat].quantile([0.25, 0.75])
-        iqr = q3 - q1
-        mask = group[stat].between(q1 - 1.5*iqr, q3 + 1.5*iqr)
-        kept.append(group[mask])
-    return pd.concat(kept, ignore_index=True) if kept else df.iloc[0:0]
-
 def generate_summary(df, stat, outpath):
     summary = df.groupby(["benchmark","version"], observed=False)[stat]\
                 .agg(['mean','std','count']).reset_index()
@@ -196,8 +174,10 @@ def main():
         logging.getLogger().setLevel(logging.DEBUG)
     validate_args(args)
 
-    df = pd.read_csv(args.csv)
-    df, versions = load_and_filter(df, args)
+    stats = [s.strip() for s in args.statistic.split(",")]
+    versions = split_list(args.versions)
+    df = load_dataset(args.csv, stats)
+    df = load_and_filter(df, stats, args.machines, args.versions, ordered_versions=True)
     if df.empty:
         logging.warning("No hay datos tras filtrado")
         return
@@ -205,7 +185,6 @@ def main():
         df["machine"] = "ALL"
 
     base = os.path.dirname(args.csv)
-    stats = [s.strip() for s in args.statistic.split(",")]
     for stat in stats:
         out_base = os.path.join(base, f"plots_{stat}")
         os.makedirs(out_base, exist_ok=True)
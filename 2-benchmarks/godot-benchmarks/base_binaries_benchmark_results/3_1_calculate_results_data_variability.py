@@ -4,22 +4,19 @@ import argparse
 import logging
 import pandas as pd
 
-def setup_logging(debug: bool):
-    level = logging.DEBUG if debug else logging.INFO
-    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
-
-AVAILABLE_STATISTICS = ["time", "render_cpu", "render_gpu", "idle", "physics"]
+from results_engine import (AVAILABLE_STATISTICS, dataset_columns, load_and_filter,
+                            load_dataset, remove_outliers, setup_logging)
 
 def validate_args(args):
-    if not os.path.isfile(args.csv):
-        logging.error(f"El archivo CSV no existe: {args.csv}")
+    if not os.path.exists(args.csv):
+        logging.error(f"El dataset no existe: {args.csv}")
         exit(1)
     if args.statistic not in AVAILABLE_STATISTICS:
         logging.error(
             f"Estadística no válida: {args.statistic}. Elige una de: {', '.join(AVAILABLE_STATISTICS)}"
         )
         exit(1)
-    cols = pd.read_csv(args.csv, nrows=0).columns
+    cols = dataset_columns(args.csv)
     missing = [c for c in ["benchmark", "version", args.statistic] if c not in cols]
     if missing:
         logging.error(f"Faltan columnas en el CSV: {missing}")
@@ -29,39 +26,8 @@ def validate_args(args):
         exit(1)
     logging.debug("Argumentos validados correctamente.")
 
-def load_and_filter(df: pd.DataFrame, args):
-    df = df.dropna(subset=[args.statistic])
-    if args.machines:
-        machines = [m.strip() for m in args.machines.split(",")]
-        df = df[df["machine"].isin(machines)]
-        logging.debug(f"Filtrado por máquinas: {machines}")
-    if args.versions:
-        versions = [v.strip() for v in args.versions.split(",")]
-        df = df[df["version"].isin(versions)]
-        logging.debug(f"Filtrado por versiones: {versions}")
-    logging.info(f"Filtrado final: {len(df)} filas.")
-    return df
-
-def remove_outliers(df: pd.DataFrame, stat: str) -> pd.DataFrame:
-    logging.info(f"Eliminando outliers (IQR) en '{stat}'…")
-    filtered = []
-    total_removed = 0
-    for (bench, ver), group in df.groupby(["benchmark", "version"]):
-        q1 = group[stat].quantile(0.25)
-        q3 = group[stat].quantile(0.75)
-        iqr = q3 - q1
-        mask = group[stat].between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
-        removed = (~mask).sum()
-        if removed:
-            logging.debug(f"  • {bench} ({ver}): {removed} outliers eliminados")
-            total_removed += removed
-        filtered.append(group[mask])
-    result = pd.concat(filtered, ignore_index=True) if filtered else df.iloc[0:0]
-    logging.info(f"Total de outliers eliminados: {total_removed}")
-    return result
-
 def compute_variability(df: pd.DataFrame, stat: str) -> pd.DataFrame:
-    means = df.groupby(["benchmark", "version"])[stat].mean().unstack(fill_value=0)
+    means = df.groupby(["benchmark", "version"], observed=True)[stat].mean().unstack(fill_value=0)
     abs_var = means.var(axis=1, ddof=0)
     rel_var = abs_var / (means.mean(axis=1) ** 2).replace(0, float("nan"))
     return pd.DataFrame({
@@ -111,9 +77,9 @@ def main():
     setup_logging(args.debug)
     validate_args(args)
 
-    df = pd.read_csv(args.csv)
+    df = load_dataset(args.csv, [args.statistic])
 
-    df = load_and_filter(df, args)
+    df = load_and_filter(df, [args.statistic], args.machines, args.versions)
     if df.empty:
         logging.warning("No quedan datos tras aplicar los filtros. Saliendo.")
         return
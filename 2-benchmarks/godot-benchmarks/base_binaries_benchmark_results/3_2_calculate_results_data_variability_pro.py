@@ -4,20 +4,16 @@ import argparse
 import logging
 
 import pandas as pd
-import numpy as np
-from scipy import stats
-from statsmodels.stats.multitest import multipletests
 
-def setup_logging(debug: bool):
-    level = logging.DEBUG if debug else logging.INFO
-    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+from results_engine import (AVAILABLE_STATISTICS, compute_variability, dataset_columns,
+                            load_and_filter, load_dataset, perform_anova, perform_posthoc,
+                            permutation_anova, remove_outliers, setup_logging)
 
-AVAILABLE_STATISTICS = ["time", "render_cpu", "render_gpu", "idle", "physics"]
 VAR_METHODS = ["variance", "coef_var", "robust"]
 
 def validate_args(args):
-    if not os.path.isfile(args.csv):
-        logging.error(f"El archivo CSV no existe: {args.csv}")
+    if not os.path.exists(args.csv):
+        logging.error(f"El dataset no existe: {args.csv}")
         exit(1)
     if args.statistic not in AVAILABLE_STATISTICS:
         logging.error(
@@ -34,73 +30,19 @@ def validate_args(args):
     if args.top < 1:
         logging.error(f"--top debe ser un entero positivo, no {args.top}")
         exit(1)
-    cols = pd.read_csv(args.csv, nrows=0).columns
+    if args.permutations < 0:
+        logging.error(f"--permutations no puede ser negativo, no {args.permutations}")
+        exit(1)
+    if (args.posthoc_reference or args.permutations) and not args.significance:
+        logging.error("--posthoc-reference y --permutations requieren --significance")
+        exit(1)
+    cols = dataset_columns(args.csv)
     missing = [c for c in ["benchmark", "version", args.statistic] if c not in cols]
     if missing:
         logging.error(f"Faltan columnas en el CSV: {missing}")
         exit(1)
     logging.debug("Argumentos validados correctamente.")
 
-def load_and_filter(df, args):
-    df = df.dropna(subset=[args.statistic])
-    if args.machines:
-        machines = [m.strip() for m in args.machines.split(",")]
-        df = df[df["machine"].isin(machines)]
-        logging.debug(f"Filtrado por máquinas: {machines}")
-    if args.versions:
-        versions = [v.strip() for v in args.versions.split(",")]
-        df = df[df["version"].isin(versions)]
-        logging.debug(f"Filtrado por versiones: {versions}")
-    logging.info(f"Filtrado final: {len(df)} filas.")
-    return df
-
-def remove_outliers(df, stat):
-    logging.info(f"Eliminando outliers (IQR) en '{stat}'…")
-    filtered = []
-    total_removed = 0
-    for (bench, ver), group in df.groupby(["benchmark", "version"]):
-        q1, q3 = group[stat].quantile([0.25, 0.75])
-        iqr = q3 - q1
-        mask = group[stat].between(q1 - 1.5*iqr, q3 + 1.5*iqr)
-        removed = (~mask).sum()
-        if removed:
-            logging.debug(f"  • {bench} ({ver}): {removed} outliers eliminados")
-            total_removed += removed
-        filtered.append(group[mask])
-    result = pd.concat(filtered, ignore_index=True) if filtered else df.iloc[0:0]
-    logging.info(f"Total de outliers eliminados: {total_removed}")
-    return result
-
-def compute_variability(df, stat, method, weight):
-    pivot = df.groupby(["benchmark", "version"])[stat].mean().unstack()
-    pivot = pivot.dropna(axis=0)  # solo benchmarks presentes en todas las versiones
-    if method == "variance":
-        var = pivot.var(axis=1, ddof=0)
-    elif method == "coef_var":
-        var = pivot.std(axis=1, ddof=0) / pivot.mean(axis=1)
-    else:  # robust = MAD/median
-        median = pivot.median(axis=1)
-        mad = pivot.apply(lambda row: np.median(np.abs(row - np.median(row))), axis=1)
-        var = mad / median.replace({0: np.nan})
-    if weight:
-        var = var * pivot.mean(axis=1)
-    return pivot, var
-
-def perform_anova(df, stat, alpha):
-    pvals = {}
-    for bench, group in df.groupby("benchmark"):
-        data = [g[stat].values for _, g in group.groupby("version")]
-        p = stats.f_oneway(*data)[1] if len(data) > 1 else np.nan
-        pvals[bench] = p
-    benches = list(pvals.keys())
-    pvalues = np.array([pvals[b] for b in benches], dtype=float)
-    mask = ~np.isnan(pvalues)
-    adj = np.full_like(pvalues, np.nan)
-    if mask.sum() > 0:
-        _, adj_p, _, _ = multipletests(pvalues[mask], alpha=alpha, method="fdr_bh")
-        adj[mask] = adj_p
-    return pd.Series(pvalues, index=benches), pd.Series(adj, index=benches)
-
 def main():
     parser = argparse.ArgumentParser(
         description="Detecta benchmarks con alta variabilidad entre versiones de Godot."
@@ -141,6 +83,22 @@ def main():
         "--alpha", type=float, default=0.05,
         help="Nivel de significancia para ANOVA (FDR)."
     )
+    parser.add_argument(
+        "--posthoc-reference",
+        help="Versión de referencia (p. ej. O3) para comparar cada versión con t-tests de Welch."
+    )
+    parser.add_argument(
+        "--permutations", type=int, default=0,
+        help="Permutaciones por benchmark para el test de permutación del ANOVA (0 para no hacerlo)."
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None,
+        help="Procesos para los tests de permutación (por defecto, todos los núcleos)."
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Semilla de los tests de permutación."
+    )
     parser.add_argument(
         "--weight", action="store_true",
         help="Ponderar variabilidad por media global."
@@ -154,8 +112,8 @@ def main():
     setup_logging(args.debug)
     validate_args(args)
 
-    df = pd.read_csv(args.csv)
-    df = load_and_filter(df, args)
+    df = load_dataset(args.csv, [args.statistic])
+    df = load_and_filter(df, [args.statistic], args.machines, args.versions)
     if df.empty:
         logging.warning("No quedan datos tras el filtrado.")
         return
@@ -170,19 +128,23 @@ def main():
             logging.error("Tras eliminar outliers no quedan datos.")
             return
 
-    pivot, var_series = compute_variability(
-        df, args.statistic, args.method, args.weight
-    )
+    pivot, metrics = compute_variability(df, args.statistic, args.weight)
+    var_series = metrics[args.method]
     result = pd.DataFrame({
         "benchmark": var_series.index,
         "variability": var_series.values
     })
 
     if args.significance:
-        pvals, adj_p = perform_anova(df, args.statistic, args.alpha)
-        result["p_value"] = result["benchmark"].map(pvals)
-        result["p_adj"] = result["benchmark"].map(adj_p)
+        anova = perform_anova(df, args.statistic, args.alpha)
+        result["p_value"] = result["benchmark"].map(anova["p_value"])
+        result["p_adj"] = result["benchmark"].map(anova["p_adj"])
         result["significant"] = result["p_adj"] < args.alpha
+        if args.permutations:
+            perm = permutation_anova(df, args.statistic, args.permutations,
+                                     args.jobs, args.seed, args.alpha)
+            result["perm_p_value"] = result["benchmark"].map(perm["perm_p_value"])
+            result["perm_p_adj"] = result["benchmark"].map(perm["perm_p_adj"])
 
     result = result.sort_values("variability", ascending=False).reset_index(drop=True)
 
@@ -201,5 +163,23 @@ def main():
     result.to_csv(outname, index=False)
     logging.info(f"Guardado resultado en: {outname}")
 
+    if args.significance and args.posthoc_reference:
+        try:
+            posthoc = perform_posthoc(df, args.statistic, args.posthoc_reference, args.alpha)
+        except ValueError as e:
+            logging.error(str(e))
+            return
+        posthoc = posthoc[posthoc["benchmark"].isin(result["benchmark"])]
+        logging.info(
+            f"Comparaciones significativas frente a {args.posthoc_reference}: "
+            f"{int(posthoc['significant'].sum())} de {len(posthoc)}"
+        )
+        posthoc_name = os.path.join(
+            base_dir,
+            f"posthoc_{args.statistic}_vs_{args.posthoc_reference}_{fuse_tag}.csv"
+        )
+        posthoc.to_csv(posthoc_name, index=False)
+        logging.info(f"Guardadas comparaciones post-hoc en: {posthoc_name}")
+
 if __name__ == "__main__":
     main()
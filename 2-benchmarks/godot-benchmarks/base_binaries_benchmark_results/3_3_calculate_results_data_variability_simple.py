@@ -3,17 +3,12 @@ import os
 import argparse
 import logging
 
-import pandas as pd
-
-def setup_logging(debug: bool):
-    level = logging.DEBUG if debug else logging.INFO
-    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
-
-AVAILABLE_STATISTICS = ["time", "render_cpu", "render_gpu", "idle", "physics"]
+from results_engine import (AVAILABLE_STATISTICS, compute_variability, dataset_columns,
+                            load_and_filter, load_dataset, remove_outliers, setup_logging)
 
 def validate_args(args):
-    if not os.path.isfile(args.csv):
-        logging.error(f"El archivo CSV no existe: {args.csv}")
+    if not os.path.exists(args.csv):
+        logging.error(f"El dataset no existe: {args.csv}")
         exit(1)
     if args.statistic not in AVAILABLE_STATISTICS:
         logging.error(
@@ -21,7 +16,7 @@ def validate_args(args):
             f"Elige una de: {', '.join(AVAILABLE_STATISTICS)}"
         )
         exit(1)
-    cols = pd.read_csv(args.csv, nrows=0).columns
+    cols = dataset_columns(args.csv)
     required = ["benchmark", "version", args.statistic]
     missing = [c for c in required if c not in cols]
     if missing:
@@ -32,40 +27,6 @@ def validate_args(args):
         exit(1)
     logging.debug("Argumentos validados correctamente.")
 
-def load_and_filter(df, args):
-    df = df.dropna(subset=[args.statistic])
-    if args.machines:
-        machines = [m.strip() for m in args.machines.split(",")]
-        df = df[df["machine"].isin(machines)]
-        logging.debug(f"Filtrado por máquinas: {machines}")
-    if args.versions:
-        versions = [v.strip() for v in args.versions.split(",")]
-        df = df[df["version"].isin(versions)]
-        logging.debug(f"Filtrado por versiones: {versions}")
-    logging.info(f"Filtrado final: {len(df)} filas.")
-    return df
-
-def remove_outliers(df, stat):
-    logging.info(f"Eliminando outliers (IQR) en '{stat}'…")
-    kept = []
-    for (bench, ver), group in df.groupby(["benchmark", "version"]):
-        q1, q3 = group[stat].quantile([0.25, 0.75])
-        iqr = q3 - q1
-        mask = group[stat].between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
-        removed = (~mask).sum()
-        if removed:
-            logging.debug(f"  • {bench} ({ver}): {removed} outliers eliminados")
-        kept.append(group[mask])
-    return pd.concat(kept, ignore_index=True) if kept else df.iloc[0:0]
-
-def compute_relative_range(df, stat):
-    pivot = df.groupby(["benchmark", "version"])[stat].mean().unstack()
-    pivot = pivot.dropna(axis=0)
-    absolute = pivot.max(axis=1) - pivot.min(axis=1)
-    mean_all = pivot.mean(axis=1)
-    relative = absolute / mean_all
-    return relative
-
 def main():
     parser = argparse.ArgumentParser(
         description="Detecta benchmarks con mayor variación relativa entre versiones."
@@ -92,8 +53,8 @@ def main():
     setup_logging(args.debug)
     validate_args(args)
 
-    df = pd.read_csv(args.csv)
-    df = load_and_filter(df, args)
+    df = load_dataset(args.csv, [args.statistic])
+    df = load_and_filter(df, [args.statistic], args.machines, args.versions)
     if df.empty:
         logging.warning("No quedan datos tras el filtrado.")
         return
@@ -108,7 +69,8 @@ def main():
             logging.error("Tras eliminar outliers no quedan datos.")
             return
 
-    rel = compute_relative_range(df, args.statistic)
+    _, metrics = compute_variability(df, args.statistic)
+    rel = metrics["relative_range"]
     result = rel.sort_values(ascending=False).head(args.top).to_frame(name="relative_variation")
 
     logging.info(f"Top {args.top} benchmarks por variación relativa en '{args.statistic}':")
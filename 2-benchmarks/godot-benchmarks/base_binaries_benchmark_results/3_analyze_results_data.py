@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import logging
+
+from results_engine import (AVAILABLE_STATISTICS, MISSING_POLICIES, compute_variability, dataset_columns,
+                            load_and_filter, load_dataset, perform_anova, perform_posthoc,
+                            permutation_anova, remove_outliers, setup_logging, split_list)
+
+VARIABILITY_METRICS = ["variance", "relative_variance", "coef_var", "robust",
+                       "relative_range", "uniformity", "score"]
+
+def validate_args(args):
+    if not os.path.exists(args.data):
+        logging.error(f"El dataset no existe: {args.data}")
+        exit(1)
+    stats = split_list(args.statistic)
+    invalid = [s for s in stats if s not in AVAILABLE_STATISTICS]
+    if not stats or invalid:
+        logging.error(
+            f"Estadísticas no válidas: {invalid}. Elige de: {', '.join(AVAILABLE_STATISTICS)}"
+        )
+        exit(1)
+    cols = dataset_columns(args.data)
+    missing = [c for c in ["benchmark", "version"] + stats if c not in cols]
+    if missing:
+        logging.error(f"Faltan columnas en el dataset: {missing}")
+        exit(1)
+    if args.top < 1:
+        logging.error(f"--top debe ser un entero positivo, no {args.top}")
+        exit(1)
+    logging.debug("Argumentos validados correctamente.")
+
+def output_path(args, stat, name):
+    base_dir = os.path.dirname(os.path.normpath(args.data))
+    fuse_tag = "fused" if args.fuse else "by_machine"
+    return os.path.join(base_dir, f"{name}_{stat}_{fuse_tag}.csv")
+
+def run_variability(df, stat, args):
+    _, metrics = compute_variability(df, stat, args.weight, args.missing)
+    result = metrics.sort_values(args.sort_by, ascending=False).reset_index()
+    logging.info(f"Top {args.top} benchmarks por {args.sort_by} en '{stat}':")
+    print(result.head(args.top).to_string(index=False))
+    outname = output_path(args, stat, "variability_all")
+    result.to_csv(outname, index=False)
+    logging.info(f"Resultado guardado en: {outname}")
+
+def run_summary(df, stat, args):
+    summary = df.groupby(["benchmark", "version"], observed=True)[stat]\
+                .agg(["mean", "std", "median", "min", "max", "count"]).reset_index()
+    print(summary.head(args.top).to_string(index=False))
+    outname = output_path(args, stat, "summary")
+    summary.to_csv(outname, index=False)
+    logging.info(f"Tabla resumen guardada en: {outname}")
+
+def run_anova(df, stat, args):
+    result = perform_anova(df, stat, args.alpha)
+    result["significant"] = result["p_adj"] < args.alpha
+    if args.permutations:
+        result = result.join(permutation_anova(df, stat, args.permutations, args.jobs, args.seed, args.alpha))
+    result = result.sort_values("f_stat", ascending=False).reset_index()
+    logging.info(f"Benchmarks con diferencias significativas entre versiones en '{stat}': "
+                 f"{int(result['significant'].sum())} de {len(result)}")
+    print(result.head(args.top).to_string(index=False))
+    outname = output_path(args, stat, "anova")
+    result.to_csv(outname, index=False)
+    logging.info(f"Resultado guardado en: {outname}")
+
+    if args.posthoc_reference:
+        try:
+            posthoc = perform_posthoc(df, stat, args.posthoc_reference, args.alpha)
+        except ValueError as e:
+            logging.error(str(e))
+            return
+        outname = output_path(args, stat, f"posthoc_vs_{args.posthoc_reference}")
+        posthoc.to_csv(outname, index=False)
+        logging.info(f"Comparaciones post-hoc guardadas en: {outname}")
+
+COMMANDS = {
+    "variability": run_variability,
+    "summary": run_summary,
+    "anova": run_anova,
+}
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--data", required=True,
+                        help="Dataset Parquet (ANALYSIS/parsed_results_data.parquet) o CSV parseado.")
+    common.add_argument("--statistic", required=True,
+                        help=f"Estadísticas separadas por coma ({', '.join(AVAILABLE_STATISTICS)}).")
+    common.add_argument("--top", type=int, default=10, help="Top N benchmarks a mostrar.")
+    common.add_argument("--machines", help="Máquinas a incluir, separadas por coma.")
+    common.add_argument("--versions", help="Versiones a incluir, separadas por coma.")
+    common.add_argument("--remove-outliers", action="store_true",
+                        help="Eliminar outliers (IQR) antes de calcular.")
+    common.add_argument("--fuse", action="store_true", help="Fusionar máquinas en 'ALL'.")
+    common.add_argument("--debug", action="store_true", help="Mostrar logs DEBUG para más detalles.")
+
+    parser = argparse.ArgumentParser(
+        description="Motor de análisis de resultados de godot-benchmarks: carga el dataset una vez y ejecuta el análisis pedido."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    variability = subparsers.add_parser(
+        "variability", parents=[common],
+        help="Todas las métricas de variabilidad entre versiones (3_1 a 3_4) en una sola pasada."
+    )
+    variability.add_argument("--sort-by", default="coef_var", choices=VARIABILITY_METRICS,
+                             help="Métrica por la que ordenar.")
+    variability.add_argument("--weight", action="store_true",
+                             help="Ponderar variance, coef_var y robust por la media global.")
+    variability.add_argument("--missing", default="drop", choices=MISSING_POLICIES,
+                             help="Benchmarks que faltan en alguna versión: 'drop' los descarta (como 3_2 a 3_4) y 'zero' "
+                                  "toma su media como 0 en esas versiones (como 3_1, para reproducir su variance y "
+                                  "relative_variance). Por defecto 'drop'.")
+    subparsers.add_parser(
+        "summary", parents=[common],
+        help="Media, desviación, mediana, mínimo, máximo y número de repeticiones por benchmark y versión."
+    )
+    anova = subparsers.add_parser(
+        "anova", parents=[common],
+        help="ANOVA vectorizado entre versiones, con post-hoc frente a una referencia y tests de permutación opcionales."
+    )
+    anova.add_argument("--alpha", type=float, default=0.05, help="Nivel de significancia (FDR).")
+    anova.add_argument("--posthoc-reference",
+                       help="Versión de referencia (p. ej. O3) para los t-tests de Welch.")
+    anova.add_argument("--permutations", type=int, default=0,
+                       help="Permutaciones por benchmark (0 para no hacer el test de permutación).")
+    anova.add_argument("--jobs", type=int, default=None, help="Procesos para los tests de permutación.")
+    anova.add_argument("--seed", type=int, default=None, help="Semilla de los tests de permutación.")
+    args = parser.parse_args()
+
+    setup_logging(args.debug)
+    validate_args(args)
+
+    stats = split_list(args.statistic)
+    data = load_dataset(args.data, stats)
+    if args.fuse:
+        data["machine"] = "ALL"
+        logging.info("Máquinas fusionadas en 'ALL'.")
+
+    for stat in stats:
+        df = load_and_filter(data, [stat], args.machines, args.versions)
+        if df.empty:
+            logging.warning(f"No quedan datos de '{stat}' tras el filtrado.")
+            continue
+        if args.remove_outliers:
+            df = remove_outliers(df, stat)
+            if df.empty:
+                logging.error(f"Tras eliminar outliers no quedan datos de '{stat}'.")
+                continue
+        COMMANDS[args.command](df, stat, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+from results_store import SCHEMA, ResultsStore
+
+# Funciones comunes a los scripts de análisis (2_x y 3_x): carga del dataset, filtrado,
+# eliminación de outliers, métricas de variabilidad y contrastes de significancia entre versiones.
+
+AVAILABLE_STATISTICS = ["time", "render_cpu", "render_gpu", "idle", "physics"]
+KEY_COLUMNS = ["category", "benchmark", "machine", "version", "iteration"]
+
+def setup_logging(debug: bool):
+    level = logging.DEBUG if debug else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s: %(message)s")
+
+def split_list(value):
+    return [v.strip() for v in value.split(",")] if value else []
+
+def dataset_columns(path):
+    """
+    Columnas disponibles en el dataset, sin leer los datos.
+    Acepta el directorio Parquet generado por 1_parse_results_data.py, un fichero .parquet o el CSV antiguo.
+    """
+    if os.path.isdir(path):
+        return [field.name for field in SCHEMA]
+    if path.endswith(".parquet"):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def load_dataset(path, statistics=None):
+    """
+    Carga el dataset una sola vez. Con Parquet solo se leen (mapeadas en memoria) las columnas
+    necesarias, y máquina, versión y benchmark llegan como categóricas.
+
+    :param path: Directorio Parquet, fichero .parquet o CSV.
+    :param statistics: Estadísticas que se van a analizar (None para todas).
+    """
+    available = dataset_columns(path)
+    columns = [c for c in KEY_COLUMNS + (statistics or AVAILABLE_STATISTICS) if c in available]
+    if os.path.isdir(path):
+        df = ResultsStore(path).load(columns=columns)
+    elif path.endswith(".parquet"):
+        df = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    logging.debug(f"Cargadas {len(df)} filas de {path} (columnas: {columns})")
+    return df
+
+def load_and_filter(df, statistics, machines=None, versions=None, ordered_versions=False):
+    """
+    Descarta filas sin las estadísticas indicadas y filtra por máquinas y versiones (listas separadas por coma).
+    Con ordered_versions la columna version pasa a ser categórica ordenada según --versions.
+    """
+    df = df.dropna(subset=statistics)
+    machines = split_list(machines)
+    if machines:
+        df = df[df["machine"].isin(machines)]
+        logging.debug(f"Filtrado por máquinas: {machines}")
+    versions = split_list(versions)
+    if versions:
+        df = df[df["version"].isin(versions)]
+        logging.debug(f"Filtrado por versiones: {versions}")
+    df = df.copy()
+    # Categorías en orden alfabético, igual que al agrupar columnas de texto leídas del CSV
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = df[column].cat.remove_unused_categories().cat.categories
+            df[column] = df[column].cat.set_categories(sorted(categories))
+    if ordered_versions:
+        df["version"] = pd.Categorical(df["version"], categories=versions, ordered=True)
+    logging.info(f"Filtrado final: {len(df)} filas.")
+    return df
+
+def remove_outliers(df, stat):
+    """
+    Elimina outliers por el criterio IQR dentro de cada grupo (benchmark, versión).
+    Los cuartiles se calculan con groupby().transform, sin iterar los grupos en Python.
+    """
+    logging.info(f"Eliminando outliers (IQR) en '{stat}'…")
+    keys = [df["benchmark"], df["version"]]
+    grouped = df[stat].groupby(keys, observed=True, sort=False)
+    q1 = grouped.transform("quantile", 0.25)
+    q3 = grouped.transform("quantile", 0.75)
+    iqr = q3 - q1
+    mask = df[stat].between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+    removed = ~mask
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        per_group = removed.groupby(keys, observed=True).sum()
+        for (bench, ver), count in per_group[per_group > 0].items():
+            logging.debug(f"  • {bench} ({ver}): {count} outliers eliminados")
+    logging.info(f"Total de outliers eliminados: {int(removed.sum())}")
+    return df[mask].reset_index(drop=True)
+
+MISSING_POLICIES = ["drop", "zero"]
+
+def version_means(df, stat, missing="drop"):
+    """
+    Media de la estadística por benchmark (filas) y versión (columnas).
+
+    :param missing: Qué hacer con los benchmarks que faltan en alguna versión: 'drop' los descarta (como 3_2 a 3_4)
+        y 'zero' toma su media como 0 en esas versiones (como 3_1).
+    """
+    if missing not in MISSING_POLICIES:
+        raise ValueError(f"Política de ausentes desconocida {missing!r}, se esperaba una de {MISSING_POLICIES}")
+    means = df.groupby(["benchmark", "version"], observed=True)[stat].mean()
+    if missing == "zero":
+        return means.unstack(fill_value=0)
+    return means.unstack().dropna(axis=0)
+
+def compute_variability(df, stat, weight=False, missing="drop"):
+    """
+    Calcula todas las métricas de variabilidad entre versiones a partir de una única agregación:
+
+    - variance, relative_variance: varianza (ddof=0) de las medias por versión, absoluta y relativa a la media al cuadrado.
+    - coef_var: coeficiente de variación de las medias por versión.
+    - robust: MAD/mediana de las medias por versión.
+    - relative_range: (máx - mín) / media.
+    - uniformity, score: uniformidad de los saltos entre versiones adyacentes (1 - CV de los saltos) y relative_range * uniformity.
+
+    :param weight: Pondera variance, coef_var y robust por la media global del benchmark.
+    :param missing: Benchmarks ausentes en alguna versión (ver version_means): 'drop' (3_2 a 3_4) o 'zero' (3_1).
+    """
+    pivot = version_means(df, stat, missing)
+    values = pivot.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = values.mean(axis=1)
+        std = values.std(axis=1, ddof=0)
+        variance = std ** 2
+        median = np.median(values, axis=1)
+        mad = np.median(np.abs(values - median[:, None]), axis=1)
+        relative_range = (values.max(axis=1) - values.min(axis=1)) / mean
+
+        diffs = np.abs(np.diff(values, axis=1))
+        mean_diff = diffs.mean(axis=1) if diffs.shape[1] else np.full(len(values), np.nan)
+        std_diff = diffs.std(axis=1, ddof=0) if diffs.shape[1] else np.full(len(values), np.nan)
+        uniformity = 1 - std_diff / np.where(mean_diff == 0, np.nan, mean_diff)
+
+        result = pd.DataFrame({
+            "mean": mean,
+            "variance": variance,
+            "relative_variance": variance / np.where(mean == 0, np.nan, mean ** 2),
+            "coef_var": std / mean,
+            "robust": mad / np.where(median == 0, np.nan, median),
+            "relative_range": relative_range,
+            "uniformity": uniformity,
+            "score": relative_range * uniformity,
+        }, index=pivot.index)
+    if weight:
+        for column in ["variance", "coef_var", "robust"]:
+            result[column] = result[column] * result["mean"]
+    return pivot, result
+
+def group_moments(df, stat):
+    """
+    Tamaño, media y varianza muestral (ddof=1) de cada grupo (benchmark, versión) en una sola agregación.
+    Devuelve tres matrices alineadas (benchmarks x versiones); los grupos vacíos tienen n=0 y media NaN.
+    """
+    moments = df.groupby(["benchmark", "version"], observed=True)[stat].agg(["count", "mean", "var"])
+    n = moments["count"].unstack(fill_value=0)
+    mean = moments["mean"].unstack().reindex_like(n)
+    var = moments["var"].unstack().reindex_like(n)
+    return n, mean, var
+
+def adjust_pvalues(pvalues, alpha, method="fdr_bh"):
+    """
+    Corrige p-values por comparaciones múltiples (Benjamini-Hochberg por defecto), ignorando los NaN.
+    """
+    pvalues = np.asarray(pvalues, dtype=float)
+    adjusted = np.full_like(pvalues, np.nan)
+    mask = ~np.isnan(pvalues)
+    if mask.any():
+        adjusted[mask] = multipletests(pvalues[mask], alpha=alpha, method=method)[1]
+    return adjusted
+
+def perform_anova(df, stat, alpha=0.05):
+    """
+    ANOVA de un factor (versión) para todos los benchmarks a la vez, equivalente a scipy.stats.f_oneway
+    por benchmark. Las sumas de cuadrados entre y dentro de grupos salen de las medias y varianzas
+    por grupo, así que el coste en Python no crece con el número de iteraciones ni de versiones.
+
+    :return: DataFrame indexado por benchmark con f_stat, df_between, df_within, p_value y p_adj.
+    """
+    n, mean, var = group_moments(df, stat)
+    counts = n.to_numpy(dtype=float)
+    means = mean.to_numpy(dtype=float)
+    ss_groups = np.nan_to_num(var.to_numpy(dtype=float)) * np.maximum(counts - 1, 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total = counts.sum(axis=1)
+        k = (counts > 0).sum(axis=1)
+        grand_mean = np.nansum(counts * means, axis=1) / total
+        ss_between = np.nansum(counts * (means - grand_mean[:, None]) ** 2, axis=1)
+        ss_within = ss_groups.sum(axis=1)
+        df_between = k - 1
+        df_within = total - k
+        f_stat = (ss_between / df_between) / (ss_within / df_within)
+        # Sin varianza dentro de los grupos: F infinito si las medias difieren, indefinido si no
+        f_stat = np.where(ss_within == 0, np.where(ss_between > 0, np.inf, np.nan), f_stat)
+        f_stat = np.where((df_between > 0) & (df_within > 0), f_stat, np.nan)
+    p_value = stats.f.sf(f_stat, df_between, df_within)
+
+    return pd.DataFrame({
+        "f_stat": f_stat,
+        "df_between": df_between,
+        "df_within": df_within,
+        "p_value": p_value,
+        "p_adj": adjust_pvalues(p_value, alpha),
+    }, index=n.index)
+
+def perform_posthoc(df, stat, reference, alpha=0.05):
+    """
+    Compara cada versión con la de referencia (p. ej. O3) en todos los benchmarks a la vez mediante
+    t-tests de Welch (scipy.stats.ttest_ind con equal_var=False), con corrección BH sobre todas las comparaciones.
+
+    :param reference: Versión de referencia.
+    :return: DataFrame largo (benchmark, version) con la diferencia de medias, la diferencia relativa, t, grados de libertad y p-values.
+    """
+    n, mean, var = group_moments(df, stat)
+    if reference not in n.columns:
+        raise ValueError(f"La versión de referencia '{reference}' no está en los datos")
+    others = [v for v in n.columns if v != reference]
+    n_ref, mean_ref, var_ref = (m[[reference]].to_numpy(dtype=float) for m in (n, mean, var))
+    n_v, mean_v, var_v = (m[others].to_numpy(dtype=float) for m in (n, mean, var))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        se_ref = var_ref / n_ref
+        se_v = var_v / n_v
+        se = se_v + se_ref
+        diff = mean_v - mean_ref
+        t_stat = diff / np.sqrt(se)
+        dof = se ** 2 / (se_v ** 2 / (n_v - 1) + se_ref ** 2 / (n_ref - 1))
+        p_value = 2 * stats.t.sf(np.abs(t_stat), dof)
+        relative_diff = diff / mean_ref
+
+    result = pd.DataFrame({
+        "benchmark": np.repeat(n.index.to_numpy(), len(others)),
+        "version": np.tile(np.asarray(others, dtype=object), len(n.index)),
+        "reference": reference,
+        "mean_diff": diff.ravel(),
+        "relative_diff": relative_diff.ravel(),
+        "t_stat": t_stat.ravel(),
+        "dof": dof.ravel(),
+        "p_value": p_value.ravel(),
+    })
+    result["p_adj"] = adjust_pvalues(result["p_value"], alpha)
+    result["significant"] = result["p_adj"] < alpha
+    return result
+
+def _permutation_pvalue(values, codes, permutations, seed, batch_size=1000):
+    """
+    p-value de permutación del F de un benchmark barajando las etiquetas de versión.
+    Con los tamaños de grupo fijos, F es monótono en sum_k S_k^2 / n_k (S_k = suma del grupo k),
+    así que basta con las sumas por grupo de cada permutación, calculadas en bloque con bincount.
+    """
+    rng = np.random.default_rng(seed)
+    k = codes.max() + 1
+    sizes = np.bincount(codes, minlength=k)
+    valid = sizes > 0
+    if valid.sum() < 2:
+        return np.nan
+
+    def between(group_sums):
+        return (group_sums[..., valid] ** 2 / sizes[valid]).sum(axis=-1)
+
+    observed = between(np.bincount(codes, weights=values, minlength=k))
+    exceed = 0
+    done = 0
+    while done < permutations:
+        batch = min(batch_size, permutations - done)
+        shuffled = rng.permuted(np.broadcast_to(codes, (batch, len(codes))), axis=1)
+        offsets = shuffled + k * np.arange(batch)[:, None]
+        sums = np.bincount(offsets.ravel(), weights=np.tile(values, batch), minlength=k * batch)
+        exceed += int((between(sums.reshape(batch, k)) >= observed * (1 - 1e-12)).sum())
+        done += batch
+    return (exceed + 1) / (permutations + 1)
+
+def permutation_anova(df, stat, permutations, jobs=None, seed=None, alpha=0.05):
+    """
+    Test de permutación del ANOVA por benchmark, repartiendo los benchmarks entre un pool de procesos.
+
+    :param permutations: Número de permutaciones por benchmark.
+    :param jobs: Procesos del pool (por defecto, todos los núcleos).
+    :param seed: Semilla para que los resultados sean reproducibles.
+    :return: DataFrame indexado por benchmark con perm_p_value y perm_p_adj.
+    """
+    grouped = df.groupby("benchmark", observed=True)
+    benchmarks = list(grouped.groups.keys())
+    tasks = []
+    for _, group in grouped:
+        codes = pd.factorize(group["version"], sort=True)[0]
+        tasks.append((group[stat].to_numpy(dtype=float), codes))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+
+    logging.info(f"Tests de permutación ({permutations} permutaciones, {len(tasks)} benchmarks)…")
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pvalues = list(executor.map(
+            _permutation_pvalue,
+            [values for values, _ in tasks], [codes for _, codes in tasks],
+            [permutations] * len(tasks), seeds,
+            chunksize=max(1, len(tasks) // (4 * (jobs or os.cpu_count() or 1))),
+        ))
+    pvalues = np.asarray(pvalues, dtype=float)
+    return pd.DataFrame({
+        "perm_p_value": pvalues,
+        "perm_p_adj": adjust_pvalues(pvalues, alpha),
+    }, index=pd.Index(benchmarks, name="benchmark"))
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Almacén columnar (Parquet) de los resultados de godot-benchmarks.
+# Cada ingesta añade un fichero "part-*.parquet" con las filas nuevas; el manifiesto recuerda qué
+# ficheros JSON se han ingerido ya (ruta, mtime, tamaño y hash del contenido) para no volver a leerlos.
+# Las filas se identifican por la ruta del fichero del que salen (columna source): dos ficheros con el mismo
+# contenido en rutas distintas son filas distintas, porque la máquina y la versión salen de la ruta.
+
+STAT_COLUMNS = ["render_cpu", "render_gpu", "time", "idle", "physics"]
+CATEGORICAL_COLUMNS = ["category", "benchmark", "machine", "version"]
+DATASET_NAME = "parsed_results_data.parquet"
+MANIFEST_NAME = "_ingested_files.json"
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema(
+    [("category", _CATEGORY), ("benchmark", _CATEGORY)]
+    + [(stat, pa.float64()) for stat in STAT_COLUMNS]
+    + [("machine", _CATEGORY), ("version", _CATEGORY), ("iteration", pa.int32()), ("source", pa.string())]
+)
+
+def extract_info_from_path(file_path):
+    parts = file_path.split(os.sep)
+    machine = parts[-3]
+    version = parts[-2]
+    filename = os.path.basename(file_path)
+    iter_match = re.search(r'iter(\d+)', filename)
+    iteration = int(iter_match.group(1)) if iter_match else None
+    return machine, version, iteration
+
+def load_benchmark_file(filepath):
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+    results = []
+    for bench in data.get("benchmarks", []):
+        entry = {
+            "category": bench.get("category"),
+            "benchmark": bench.get("name"),
+            "render_cpu": bench["results"].get("render_cpu"),
+            "render_gpu": bench["results"].get("render_gpu"),
+            "time": bench["results"].get("time"),
+            "idle": bench["results"].get("idle"),
+            "physics": bench["results"].get("physics"),
+        }
+        results.append(entry)
+    return results
+
+def file_digest(filepath):
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def file_signature(filepath):
+    st = os.stat(filepath)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def parse_results_file(filepath, machine=None, version=None, iteration=None):
+    """
+    Lee un results_*.json y devuelve (firma, hash, filas, error). Pensada para ejecutarse en un pool de procesos.
+    La columna source de las filas es la ruta absoluta del fichero.
+    Si no se indican máquina, versión o iteración, se deducen de la ruta (<maquina>/<version>/results_*_iterN.json).
+    """
+    signature = file_signature(filepath)
+    digest = file_digest(filepath)
+    path_machine, path_version, path_iteration = extract_info_from_path(filepath)
+    try:
+        rows = load_benchmark_file(filepath)
+    except Exception as e:
+        return signature, digest, [], str(e)
+    for row in rows:
+        row["machine"] = machine or path_machine
+        row["version"] = version or path_version
+        row["iteration"] = iteration if iteration is not None else path_iteration
+        row["source"] = os.path.abspath(filepath)
+    return signature, digest, rows, None
+
+class ResultsStore:
+    """
+    Dataset Parquet incremental con los resultados de godot-benchmarks.
+
+    :param path: Directorio del dataset (se crea si no existe).
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.manifest_path = self.path / MANIFEST_NAME
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"files": {}}
+
+    def _save_manifest(self):
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def parts(self):
+        return sorted(self.path.glob("part-*.parquet"))
+
+    def is_ingested(self, filepath):
+        known = self.manifest["files"].get(os.path.abspath(filepath))
+        if known is None:
+            return False
+        signature = file_signature(filepath)
+        return known["mtime_ns"] == signature["mtime_ns"] and known["size"] == signature["size"]
+
+    def _write_part(self, rows):
+        table = pa.Table.from_pylist(rows, schema=SCHEMA)
+        name = f"part-{time.strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(table, self.path / name)
+        return name
+
+    def _drop_sources(self, sources):
+        # Reescribe solo los ficheros part que contienen filas de un fichero JSON que ha cambiado o desaparecido
+        sources = pa.array(sorted(sources))
+        for part in self.parts():
+            part_sources = pq.read_table(part, columns=["source"])["source"]
+            keep = pc.invert(pc.is_in(part_sources, value_set=sources))
+            if pc.all(keep).as_py():
+                continue
+            table = pq.read_table(part, schema=SCHEMA).filter(keep)
+            if table.num_rows:
+                pq.write_table(table, part)
+            else:
+                part.unlink()
+
+    def _stale_sources(self, entries):
+        # Fuentes de las filas de los ficheros dados: su ruta y, en almacenes antiguos (filas identificadas por el hash),
+        # su hash si ningún otro fichero conocido comparte ese contenido
+        keys = {key for key, _ in entries}
+        shared = {entry["sha1"] for key, entry in self.manifest["files"].items() if key not in keys}
+        return keys | {entry["sha1"] for _, entry in entries if entry["sha1"] not in shared}
+
+    def add(self, results):
+        """
+        Registra ficheros ya parseados con parse_results_file y añade sus filas como un nuevo fichero part.
+        Las filas anteriores de un fichero cuyo contenido ha cambiado se eliminan.
+
+        :param results: Diccionario {ruta: (firma, hash, filas, error)}.
+        :return: Número de filas añadidas.
+        """
+        rows = []
+        stale = []
+        files = self.manifest["files"]
+        for filepath, (signature, digest, file_rows, error) in results.items():
+            if error is not None:
+                continue
+            key = os.path.abspath(filepath)
+            previous = files.get(key)
+            if previous is not None:
+                if previous["sha1"] == digest:
+                    files[key] = {**signature, "sha1": digest}
+                    continue    # Mismo contenido ya ingerido desde esta ruta (solo ha cambiado el mtime)
+                stale.append((key, previous))
+            files[key] = {**signature, "sha1": digest}
+            for row in file_rows:
+                row["source"] = key
+            rows.extend(file_rows)
+
+        if stale:
+            self._drop_sources(self._stale_sources(stale))
+        if rows:
+            self._write_part(rows)
+        self._save_manifest()
+        return len(rows)
+
+    def remove_missing(self, root_path):
+        """
+        Elimina las filas de los ficheros ingeridos bajo root_path que ya no existen.
+
+        :return: Número de ficheros eliminados.
+        """
+        root = os.path.join(os.path.abspath(root_path), "")
+        files = self.manifest["files"]
+        missing = [(key, entry) for key, entry in files.items() if key.startswith(root) and not os.path.exists(key)]
+        if missing:
+            self._drop_sources(self._stale_sources(missing))
+            for key, _ in missing:
+                del files[key]
+            self._save_manifest()
+        return len(missing)
+
+    def ingest(self, root_path, jobs=None):
+        """
+        Ingiere todos los results_*.json nuevos o modificados bajo root_path, parseándolos en paralelo, y elimina las filas
+        de los que se han borrado.
+
+        :return: (ficheros nuevos o modificados, filas añadidas, errores {ruta: mensaje}, ficheros eliminados).
+        """
+        removed = self.remove_missing(root_path)
+        pending = []
+        for dirpath, _, filenames in os.walk(root_path):
+            for filename in filenames:
+                if filename.startswith("results_") and filename.endswith(".json"):
+                    filepath = os.path.join(dirpath, filename)
+                    if not self.is_ingested(filepath):
+                        pending.append(filepath)
+        if not pending:
+            return 0, 0, {}, removed
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = dict(zip(pending, executor.map(parse_results_file, pending, chunksize=16)))
+
+        errors = {path: result[3] for path, result in results.items() if result[3] is not None}
+        added = self.add(results)
+        return len(pending), added, errors, removed
+
+    def load(self, columns=None):
+        """
+        Carga el dataset como DataFrame (lectura columnar mapeada en memoria).
+        Máquina, versión, benchmark y categoría se devuelven como columnas categóricas.
+        """
+        parts = self.parts()
+        if not parts:
+            return pd.DataFrame(columns=columns or [field.name for field in SCHEMA if field.name != "source"])
+        table = pa.concat_tables(
+            [pq.read_table(part, columns=columns, memory_map=True) for part in parts]
+        ).unify_dictionaries()
+        return table.to_pandas()
+
+    def compact(self):
+        """
+        Reescribe todos los ficheros part en uno solo.
+        """
+        parts = self.parts()
+        if len(parts) < 2:
+            return
+        table = pa.concat_tables([pq.read_table(part, schema=SCHEMA) for part in parts]).unify_dictionaries()
+        name = f"part-{time.strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        pq.write_table(table.combine_chunks(), self.path / name)
+        for part in parts:
+            part.unlink()
+
+    def export_csv(self, output_path):
+        df = self.load(columns=[field.name for field in SCHEMA if field.name != "source"])
+        df.to_csv(output_path, index=False)
+        return len(df)
@@ -0,0 +1,332 @@
+import argparse
+import contextlib
+from datetime import datetime
+import glob
+import json
+import os
+from pathlib import Path
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Iterator
+
+import numpy as np
+
+from custom.jmetal.util import FitnessArchive, IntervalUtils, LlvmUtils, PassRegistry
+
+"""
+.. module:: benchmark_framework
+   :platform: Unix
+   :synopsis: Micro and macro benchmarks of the hot paths of the optimization framework, stored per commit.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+RESULTS_DIR = './data/framework_benchmarks'
+RESULTS_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '2-benchmarks', 'godot-benchmarks',
+                                  'base_binaries_benchmark_results')
+N_PASSES_IN_SOLUTION = 30
+LOOKUPS = 1000
+
+# A case is (name, function, calls per measurement); every group yields its cases after preparing their data
+Case = tuple[str, Callable[[], object], int]
+
+
+@contextlib.contextmanager
+def working_directory(path: str) -> Iterator[None]:
+    # The algorithms and the problem write their ./data files relative to the working directory
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def random_archive(n: int, rng: np.random.Generator) -> FitnessArchive:
+    passes = rng.integers(0, len(PassRegistry.get('legacy-o1')), size=(n, N_PASSES_IN_SOLUTION), dtype=np.uint8)
+    return FitnessArchive(passes, rng.uniform(1.0, 5.0, size=n))
+
+
+def archive_cases(sizes: list[int], workdir: str) -> Iterator[Case]:
+    """
+    Lookups and inserts in the JSON fitness archive of LlvmRuntimeProblem ({"[1, 2, ...]": fitness}, rewritten after every
+    evaluation) and in the binary FitnessArchive (genome bytes keys, .farc file).
+    """
+    rng = np.random.default_rng(0)
+    registry = PassRegistry.get('legacy-o1')
+    for n in sizes:
+        archive = random_archive(n, rng)
+        json_archive = archive.to_dict()
+        table = archive.lookup_table()
+        rows = archive.passes[rng.integers(0, n, size=LOOKUPS // 2)].tolist()
+        queries = rows + random_archive(LOOKUPS - len(rows), rng).passes.tolist()   # Half hits, half misses
+        json_path = os.path.join(workdir, f'fitness-{n}.json')
+        farc_path = os.path.join(workdir, f'fitness-{n}.farc')
+
+        def json_insert(json_archive=json_archive, json_path=json_path):
+            json_archive[str([random.randrange(len(registry)) for _ in range(N_PASSES_IN_SOLUTION)])] = 1.0
+            with open(json_path, 'w') as f:
+                json.dump(json_archive, f, indent=2)
+
+        yield f'archive.json_lookup_x{LOOKUPS}[n={n}]', lambda: [json_archive.get(str(q)) for q in queries], 1
+        yield f'archive.genome_lookup_x{LOOKUPS}[n={n}]', \
+            lambda: [table.get(registry.encode_genome(q)) for q in queries], 1
+        yield f'archive.json_insert[n={n}]', json_insert, 1
+        yield f'archive.farc_save[n={n}]', lambda: archive.save(farc_path), 1
+        yield f'archive.farc_load[n={n}]', lambda: FitnessArchive.load(farc_path).lookup_table(), 1
+
+
+def stats_cases(sizes: list[int], workdir: str) -> Iterator[Case]:
+    """
+    Rewriting the stats file of GodotRuntimeFitnessFunction after an evaluation, with as many entries as evaluations done.
+    """
+    entry = {
+        'opt': {'success': True, 'output': 'warning: loop not unrolled\n' * 20, 'duration': 133.3,
+                'pass_manager': 'legacy', 'arguments': ['-instcombine'] * N_PASSES_IN_SOLUTION},
+        'clang': {'success': True, 'output': '', 'duration': 337.2},
+        'benchmark': {'success': True, 'output': 'Godot Engine\n' * 20, 'duration': 44.7,
+                      'benchmarks': ['animation/animation_tree/animation_tree_quads'], 'aggregation': 'geomean',
+                      'results': {f'execution_{i}': {'animation/animation_tree/animation_tree_quads': {
+                          'render_cpu': 2.3, 'render_gpu': 0.1, 'idle': 0.2, 'physics': 0.0, 'time': 5000}}
+                          for i in range(1, 6)},
+                      'counters': None},
+        'tool_cpu_seconds': 480.0,
+        'fitness_value': 2.295
+    }
+    for n in [size for size in (100, 1000, 10000) if size <= max(sizes)]:
+        stats = {str(list(range(i, i + N_PASSES_IN_SOLUTION))): entry for i in range(n)}
+        stats_path = os.path.join(workdir, f'fitness_stats-{n}.json')
+
+        def write(stats=stats, stats_path=stats_path):
+            with open(stats_path, 'w') as f:
+                json.dump(stats, f, indent=2)
+
+        yield f'stats.write[evaluations={n}]', write, 1
+
+
+def interval_cases(sizes: list[int], workdir: str) -> Iterator[Case]:
+    rng = np.random.default_rng(0)
+    for n in (5, 30):
+        runtimes = rng.normal(2.3, 0.05, size=n)
+        yield f'interval.make_interval[n={n}]', lambda runtimes=runtimes: IntervalUtils.make_interval(runtimes, rng=0), 10
+
+
+def llvm_utils_cases(sizes: list[int], workdir: str) -> Iterator[Case]:
+    rng = np.random.default_rng(0)
+    names = LlvmUtils.get_passes()
+    lines = 10000
+    input_path = os.path.join(workdir, 'names.csv')
+    with open(input_path, 'w') as f:
+        for _ in range(lines):
+            f.write(','.join(names[i] for i in rng.integers(0, len(names), N_PASSES_IN_SOLUTION)) + f',{rng.uniform(1, 5)}\n')
+    yield 'llvm_utils.get_passes', LlvmUtils.get_passes, 100
+    yield f'llvm_utils.encode[lines={lines}]', lambda: LlvmUtils.encode(input_path, os.path.join(workdir, 'indexes.csv')), 1
+
+
+def algorithm_cases(sizes: list[int], workdir: str) -> Iterator[Case]:
+    """
+    Overhead of the algorithms, the problem and its archive per evaluation, with a fitness function that costs nothing.
+    """
+    from jmetal.util.neighborhood import L5
+    from jmetal.util.termination_criterion import StoppingByEvaluations
+
+    from custom.jmetal.algorithm.single_objective import CellularGeneticAlgorithm, SimulatedAnnealing
+    from custom.jmetal.fitness_function import DummyFitnessFunction
+    from custom.jmetal.operator import IntegerNPointCrossover, IntegerResetMutation, NoveltyFilter
+    from custom.jmetal.problem.single_objective import LlvmRuntimeProblem
+
+    evaluations = 200
+
+    def run(algorithm_choice: str):
+        with working_directory(workdir):
+            timestamp = f'{algorithm_choice}-{time.perf_counter_ns()}'
+            problem = LlvmRuntimeProblem(N_PASSES_IN_SOLUTION, DummyFitnessFunction(delay=0), '', timestamp)
+            novelty = NoveltyFilter(problem.fitness_archive)
+            mutation = IntegerResetMutation(probability=0.1, novelty=novelty)
+            if algorithm_choice == 'cga':
+                algorithm = CellularGeneticAlgorithm(timestamp, problem, 9, L5(rows=3, columns=3), mutation,
+                                                     IntegerNPointCrossover(1.0, novelty=novelty),
+                                                     termination_criterion=StoppingByEvaluations(evaluations))
+            else:
+                algorithm = SimulatedAnnealing(timestamp, problem, mutation, StoppingByEvaluations(evaluations))
+            algorithm.run()
+
+    yield f'algorithm.cga_run[evaluations={evaluations}]', lambda: run('cga'), 1
+    yield f'algorithm.sa_run[evaluations={evaluations}]', lambda: run('sa'), 1
+
+
+def results_cases(sizes: list[int], workdir: str) -> Iterator[Case]:
+    """
+    Ingestion of godot-benchmarks JSON files into the Parquet store and the variability metrics, on synthetic data of the
+    size of a base binaries campaign (3 machines x 12 versions x 10 iterations x 100 benchmarks).
+    """
+    sys.path.insert(0, os.path.abspath(RESULTS_STORE_PATH))
+    import pandas as pd
+    from results_engine import compute_variability
+    from results_store import ResultsStore
+
+    rng = np.random.default_rng(0)
+    machines, versions, iterations, benchmarks = 3, 12, 10, 100
+    root = os.path.join(workdir, 'results')
+    for m in range(machines):
+        for v in range(versions):
+            folder = os.path.join(root, f'machine{m}', f'version{v}')
+            Path(folder).mkdir(parents=True, exist_ok=True)
+            for i in range(1, iterations + 1):
+                with open(os.path.join(folder, f'results_version{v}_all_iter{i}.json'), 'w') as f:
+                    json.dump({'benchmarks': [{'category': f'Category {b // 10}', 'name': f'Benchmark {b}',
+                                               'results': {'render_cpu': float(rng.uniform(1, 10)),
+                                                           'render_gpu': float(rng.uniform(0, 1)),
+                                                           'time': int(rng.integers(1000, 9000))}}
+                                              for b in range(benchmarks)]}, f)
+
+    def ingest():
+        store = ResultsStore(tempfile.mkdtemp(dir=workdir))
+        store.ingest(root, jobs=1)
+        return store
+
+    rows = machines * versions * iterations * benchmarks
+    df = pd.DataFrame({
+        'benchmark': pd.Categorical(rng.integers(0, benchmarks, rows).astype(str)),
+        'version': pd.Categorical(rng.integers(0, versions, rows).astype(str)),
+        'render_cpu': rng.uniform(1, 10, rows)
+    })
+    yield f'results.ingest[files={machines * versions * iterations}]', ingest, 1
+    yield f'results.variability[rows={rows}]', lambda: compute_variability(df, 'render_cpu'), 1
+
+
+GROUPS = {
+    'archive': archive_cases,
+    'stats': stats_cases,
+    'interval': interval_cases,
+    'llvm_utils': llvm_utils_cases,
+    'algorithm': algorithm_cases,
+    'results': results_cases
+}
+
+
+def measure(function: Callable[[], object], number: int, repeat: int) -> dict:
+    """
+    Seconds per call of every repetition (number calls each), with the minimum and the median.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {'min': min(timings), 'median': statistics.median(timings), 'timings': timings, 'number': number}
+
+
+def git(*arguments: str) -> str:
+    return subprocess.run(['git', *arguments], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+
+
+def git_revision() -> tuple[str, bool]:
+    try:
+        return git('rev-parse', 'HEAD'), bool(git('status', '--porcelain', '--untracked-files=no'))
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown', False
+
+
+def find_baseline(reference: str) -> str:
+    """
+    Results file to compare with: a path, or the latest results of a commit (any git ref: hash, HEAD~1, main...) run on a
+    clean tree (the -dirty results of the commit are not a baseline of it).
+    """
+    if os.path.isfile(reference):
+        return reference
+    try:
+        commit = git('rev-parse', '--verify', f'{reference}^{{commit}}')
+    except (OSError, subprocess.SubprocessError):
+        raise ValueError(f'{reference} is neither a results file nor a git commit')
+    candidates = sorted(glob.glob(os.path.join(RESULTS_DIR, f'benchmarks-*-{commit[:10]}.json')))
+    if not candidates:
+        raise ValueError(f'No results of {reference} ({commit[:10]}) in {RESULTS_DIR}')
+    return candidates[-1]
+
+
+def run_benchmarks(groups: list[str], sizes: list[int], repeat: int, name_filter: str = None) -> dict:
+    results = dict()
+    with tempfile.TemporaryDirectory(prefix='benchmark_framework_') as workdir:
+        for group in groups:
+            try:
+                for name, function, number in GROUPS[group](sizes, workdir):
+                    if name_filter and name_filter not in name:
+                        continue
+                    results[name] = measure(function, number, repeat)
+                    print(f'{name:50} {results[name]["median"] * 1e3:12.3f} ms (min {results[name]["min"] * 1e3:.3f} ms)',
+                          flush=True)
+            except ImportError as e:
+                print(f'{group}: skipped ({e})', file=sys.stderr)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the optimization framework and store the '
+                                                 'results per commit, to compare them across commits.')
+    parser.add_argument('--groups', default=','.join(GROUPS), help=f'Comma-separated groups (default: {",".join(GROUPS)})')
+    parser.add_argument('--filter', help='Only run the cases whose name contains this text')
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Archive sizes (default: 10^4, 10^5 and 10^6)')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions of every case (default: 5)')
+    parser.add_argument('--quick', action='store_true', help='Only the smallest archive size and 3 repetitions')
+    parser.add_argument('--compare', help='Results file or commit to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Median ratio above which a case is reported as a regression (default: 1.2)')
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.groups.split(',') if group.strip()]
+    unknown = [group for group in groups if group not in GROUPS]
+    if unknown:
+        parser.error(f'Unknown groups {unknown}, expected some of {list(GROUPS)}')
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    repeat = args.repeat
+    if args.quick:
+        sizes, repeat = sizes[:1], min(repeat, 3)
+
+    # Resolved before running, so that the results of this run are never their own baseline
+    baseline_file = None
+    if args.compare:
+        try:
+            baseline_file = find_baseline(args.compare)
+        except ValueError as e:
+            parser.error(str(e))
+
+    commit, dirty = git_revision()
+    results = run_benchmarks(groups, sizes, repeat, args.filter)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    Path(RESULTS_DIR).mkdir(parents=True, exist_ok=True)
+    results_file = os.path.join(RESULTS_DIR, f'benchmarks-{timestamp}-{commit[:10]}{"-dirty" if dirty else ""}.json')
+    with open(results_file, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': timestamp,
+            'machine': socket.gethostname(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'repeat': repeat,
+            'results': results
+        }, f, indent=2)
+    print(f'Results saved to {results_file}')
+
+    if baseline_file is not None:
+        with open(baseline_file, 'r') as f:
+            baseline = json.load(f)
+        print(f'\nCompared with {baseline["commit"][:10]} ({baseline_file}):')
+        regressions = 0
+        for name, result in results.items():
+            if name not in baseline['results']:
+                continue
+            ratio = result['median'] / baseline['results'][name]['median']
+            flag = 'REGRESSION' if ratio > args.threshold else ('improvement' if ratio < 1 / args.threshold else '')
+            regressions += flag == 'REGRESSION'
+            print(f'{name:50} {ratio:8.2f}x {flag}')
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,68 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from custom.jmetal.util import PassRegistry
+from custom.jmetal.util.newpm_pipeline import build_pipeline
+
+"""
+.. module:: check_newpm_pipelines
+   :platform: Unix
+   :synopsis: Checks that opt parses the New PM pipelines built from the NewPM pass catalogue.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+# Smallest module opt accepts: the check is about parsing the pipeline, not about what the passes do
+EMPTY_MODULE = 'define void @f() {\n  ret void\n}\n'
+
+def check_pipelines(opt: str = 'opt', samples: int = 200, n_passes: int = 30, seed: int = 0,
+                    jobs: int = os.cpu_count()) -> list[tuple[str, str]]:
+    """
+    Runs opt -disable-output over the pipeline of every single pass of the NewPM catalogue and of random sequences of
+    passes, as the search builds them (build_pipeline), and returns the ones opt rejects.
+
+    :param opt: opt executable.
+    :param samples: Random sequences to check.
+    :param n_passes: Passes in every random sequence.
+    :param seed: Seed of the random sequences.
+    :param jobs: opt processes at the same time.
+    :return: (pipeline, error message of opt) of every rejected pipeline.
+    """
+    registry = PassRegistry.get('newpm')
+    passes = [name for name in registry.names if name]
+    rng = random.Random(seed)
+    sequences = [[name] for name in passes] + [rng.choices(passes, k=n_passes) for _ in range(samples)]
+    pipelines = list(dict.fromkeys(build_pipeline(sequence, registry) for sequence in sequences))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        module = os.path.join(workdir, 'empty.ll')
+        with open(module, 'w') as f:
+            f.write(EMPTY_MODULE)
+
+        def check(pipeline: str) -> tuple[str, str] | None:
+            result = subprocess.run([opt, '-disable-output', f'-passes={pipeline}', module],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            return None if result.returncode == 0 else (pipeline, result.stderr.strip())
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return [failure for failure in executor.map(check, pipelines) if failure is not None]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that opt parses the pipeline of every NewPM pass and of random '
+                                                 'sequences of them.')
+    parser.add_argument('--opt', default='opt', help='opt executable (default: opt)')
+    parser.add_argument('--samples', type=int, default=200, help='Random sequences to check (default: 200)')
+    parser.add_argument('--passes', type=int, default=30, help='Passes in every random sequence (default: 30)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random sequences (default: 0)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='opt processes at the same time')
+    args = parser.parse_args()
+
+    failures = check_pipelines(args.opt, args.samples, args.passes, args.seed, args.jobs)
+    for pipeline, error in failures:
+        print(f'{pipeline}\n    {error}')
+    print(f'{len(failures)} pipelines rejected by {args.opt}')
+    sys.exit(1 if failures else 0)
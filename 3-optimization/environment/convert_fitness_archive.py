@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from custom.jmetal.util import PassRegistry
+from custom.jmetal.util.fitness_archive import ARCHIVE_SUFFIX, MERGE_POLICIES, merge_archives, write_archive
+
+def convert_fitness_archive(inputs: list[str], output: str, policy: str = 'last', flavour: str = 'legacy-o1',
+                            names: bool = False) -> int:
+    """
+    Converts one or more fitness archives into another format, merging them if there are several.
+    Formats are chosen by extension: binary (.farc), JSON fitness_archive (.json) or legacy LlvmUtils CSV (anything else).
+
+    :param inputs: Paths of the archives to read.
+    :param output: Path of the archive to write.
+    :param policy: How to resolve solutions present in several archives (last, first, min, max or mean).
+    :param flavour: Pass catalogue the indexes refer to (legacy-o1, legacy-all or newpm).
+    :param names: Write pass names instead of indexes (legacy CSV output only).
+    :return: Number of solutions written.
+    """
+    archive = merge_archives(inputs, policy, flavour)
+    write_archive(archive, output, names)
+    return len(archive)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert and merge fitness archives (binary ' + ARCHIVE_SUFFIX +
+                                                 ', JSON fitness_archive or legacy CSV).')
+    parser.add_argument('inputs', nargs='+', help='Archives to read (merged in the given order)')
+    parser.add_argument('-o', '--output', required=True, help='Archive to write; the extension selects the format')
+    parser.add_argument('--policy', default='last', choices=MERGE_POLICIES,
+                        help='Fitness kept for solutions present in several archives (default: the last one)')
+    parser.add_argument('--flavour', default='legacy-o1', choices=PassRegistry.FLAVOURS,
+                        help='Pass catalogue the indexes refer to')
+    parser.add_argument('--names', action='store_true', help='Write pass names instead of indexes (legacy CSV output)')
+    args = parser.parse_args()
+
+    try:
+        count = convert_fitness_archive(args.inputs, args.output, args.policy, args.flavour, args.names)
+    except ValueError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+    print(f'{count} solutions written to {args.output}')
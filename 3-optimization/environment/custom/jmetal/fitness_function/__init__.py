@@ -1,3 +1,6 @@
 from .fitness_function import FitnessFunction
 from .dummy_fitness_function import DummyFitnessFunction
-from .godot_runtime_fitness_function import GodotRuntimeFitnessFunction
\ No newline at end of file
+from .godot_runtime_fitness_function import GodotRuntimeFitnessFunction
+from .godot_multi_objective_fitness_function import GodotMultiObjectiveFitnessFunction
+from .simulated_fitness_function import SimulatedFitnessFunction
+from .replay_fitness_function import ReplayFitnessFunction
\ No newline at end of file
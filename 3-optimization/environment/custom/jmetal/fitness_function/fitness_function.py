@@ -1,5 +1,7 @@
 from abc import abstractmethod
 
+from custom.jmetal.util import PassRegistry, TraceRecorder
+
 """
 .. module:: fitness_function
    :platform: Unix, Windows
@@ -11,9 +13,14 @@ class FitnessFunction():
     """
     Base class for fitness functions in the JMetal framework.
     This class is intended to be extended by specific fitness functions.
+    Tracing is disabled by default; subclasses may replace the tracer with an enabled TraceRecorder.
+    Solutions are lists of indexes into pass_registry (the -O1 legacy passes unless a subclass chooses another catalogue).
+    Subclasses that run external tools add the CPU time they spend to tool_cpu_seconds (used by StoppingByToolCpuTime).
     """
     def __init__(self):
-        pass
+        self.tracer = TraceRecorder()
+        self.pass_registry = PassRegistry.get('legacy-o1')
+        self.tool_cpu_seconds = 0.0
 
     @abstractmethod
     def calculate(self, solution_variables: list) -> object:
@@ -22,6 +29,12 @@ class FitnessFunction():
         This method should be implemented by subclasses.
         """
         raise NotImplementedError("Subclasses should implement this method.")
+
+    def predict_compile_time(self, solution_variables: list) -> float | None:
+        """
+        Predicted time to build a solution before evaluating it, or None if unknown (the default).
+        """
+        return None
     
     @abstractmethod
     def name(self) -> str:
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+from typing import List
+
+from custom.jmetal.fitness_function.godot_runtime_fitness_function import GodotRuntimeFitnessFunction
+from custom.jmetal.util.evaluator import worker_slot
+from custom.jmetal.util.pass_cost_model import PassCostModel
+
+"""
+.. module:: godot_multi_objective_fitness_function
+   :platform: Unix
+   :synopsis: Fitness function for the Godot runtime, compile time and binary size optimization problem.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+OBJECTIVES = ('runtime', 'compile_time', 'binary_size')
+
+
+class GodotMultiObjectiveFitnessFunction(GodotRuntimeFitnessFunction):
+    """
+    Multi-objective variant of GodotRuntimeFitnessFunction: the same evaluation (same parameters), but calculate returns every
+    objective of the solution instead of the runtime alone:
+    'runtime', the fitness value of GodotRuntimeFitnessFunction (worst runtime, counter or paired relative difference);
+    'compile_time', the seconds of opt + clang++; and
+    'binary_size', the bytes of the (stripped) Godot binary.
+    If any stage fails, every objective is sys.float_info.max: a configuration that does not build or run is not a trade-off.
+
+    It can be evaluated in several processes at once (e.g. with ArchivingMultiprocessEvaluator): every process works on its own
+    copy of the Godot sources (<godot_source_path>_evaluation-<slot>) and writes its own stats and cost model files
+    (fitness_stats-<timestamp>-<slot>.json), so that they do not overwrite each other. The slot is the worker number of
+    ArchivingMultiprocessEvaluator (the pid with other evaluators), so the copies of the sources are reused by the next
+    executions, as the sequential <godot_source_path>_evaluation is. Bear in mind that concurrent benchmark
+    launches compete for the machine, so the runtimes are noisier than in a sequential run. An ArtifactStore cannot be used
+    in worker processes (every worker would rewrite the shared index and collect the objects of the others).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.process_id = os.getpid()
+        self.shared_stats_file = self.stats_file
+        self.shared_cost_model_file = self.cost_model_file
+
+    def _bind_process(self) -> None:
+        # A copy of the fitness function in a worker process (it is pickled with the problem for every batch of solutions)
+        pid = os.getpid()
+        if pid == self.process_id:
+            return
+        if self.artifact_store is not None:
+            raise ValueError('An ArtifactStore cannot be shared by several processes: evaluate sequentially or without it')
+        self.process_id = pid
+        slot = worker_slot() or pid
+        self.godot_source_copy_path = f'{self.godot_source_path}_evaluation-{slot}'
+        self.stats_file = self.shared_stats_file.replace('.json', f'-{slot}.json')
+        self.cost_model_file = self.shared_cost_model_file.replace('.json', f'-{slot}.json')
+        # Previous batches of this worker were evaluated by other copies: keep their stats and what the cost model learnt
+        self.stats = dict()
+        if os.path.exists(self.stats_file):
+            with open(self.stats_file, 'r') as f:
+                self.stats = json.load(f)
+        if self.cost_model is not None and os.path.exists(self.cost_model_file):
+            self.cost_model = PassCostModel.load(self.cost_model_file)
+
+    def calculate(self, solution_variables: List[int]) -> dict:
+        """
+        Calculate every objective of a solution.
+
+        :param solution_variables: List of integers representing the LLVM passes to apply.
+        :return: {objective: value} for every objective in OBJECTIVES (sys.float_info.max for all of them if an error occurs).
+        """
+        self._bind_process()
+        runtime = super().calculate(solution_variables)
+        entry = self.stats[str(solution_variables)]
+        if runtime == sys.float_info.max or entry['clang']['binary_size'] is None:
+            return {objective: sys.float_info.max for objective in OBJECTIVES}
+        return {
+            'runtime': runtime,
+            'compile_time': entry['opt']['duration'] + entry['clang']['duration'],
+            'binary_size': entry['clang']['binary_size']
+        }
+
+    def name(self) -> str:
+        return "Godot Multi-Objective Fitness Function"
@@ -1,14 +1,23 @@
+from fnmatch import fnmatchcase
 import json
 import os
 from pathlib import Path
+import resource
 import shutil
 import subprocess
 import sys
 import time
 from typing import List
 
+import numpy as np
+
 from custom.jmetal.fitness_function import FitnessFunction
-from custom.jmetal.util import LlvmUtils
+from custom.jmetal.util import PassRegistry, TraceRecorder
+from custom.jmetal.util.artifact_store import ArtifactStore
+from custom.jmetal.util.newpm_pipeline import build_pipeline
+from custom.jmetal.util.pass_cost_model import TIME_PASSES_FLAG, PassCostModel, split_time_passes
+from custom.jmetal.util.perf_counters import COUNTERS, PerfCounters
+from custom.jmetal.util.paired_measurement import CANDIDATE, PairedMeasurementScheduler, PairedResult
 
 """
 .. module:: godot_fitness_function
@@ -17,60 +26,195 @@ from custom.jmetal.util import LlvmUtils
 .. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
 """
 
+BENCHMARK_AGGREGATIONS = ('geomean', 'sum')
+
+# Weight of the tie-breaking counter: below the precision of the statistics reported by godot-benchmarks,
+# so it only reorders solutions whose statistic is equal
+TIEBREAK_WEIGHT = 1e-6
+TIEBREAK_SCALE = 1e9
+
+def benchmark_path(entry: dict) -> str:
+    """
+    Path of a benchmark of the godot-benchmarks JSON output, as accepted by --include-benchmarks
+    (category "Animation > Animation Tree" and name "Animation Tree Quads" give animation/animation_tree/animation_tree_quads).
+    """
+    parts = [part.strip() for part in entry.get('category', '').split('>') if part.strip()] + [entry.get('name', '')]
+    return '/'.join(part.strip().lower().replace(' ', '_') for part in parts)
+
+def parse_benchmark_results(json_path: str, benchmarks: List[str]) -> dict | None:
+    """
+    Results of the given benchmarks (paths or glob patterns) in a godot-benchmarks JSON output.
+
+    :return: {benchmark path: {statistic: value}}, or None if the file cannot be read or some benchmark is missing.
+    """
+    try:
+        with open(json_path, 'r') as f:
+            entries = json.load(f)['benchmarks']
+        if len(benchmarks) == 1 and len(entries) == 1:
+            # A single benchmark was run: no need to match its path
+            return {benchmarks[0]: entries[0]['results']}
+        results = {path: entry['results'] for path, entry in ((benchmark_path(entry), entry) for entry in entries)
+                   if any(fnmatchcase(path, pattern) for pattern in benchmarks)}
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, IndexError, TypeError):
+        return None
+    if not all(any(fnmatchcase(path, pattern) for path in results) for pattern in benchmarks):
+        return None
+    return results
+
+def aggregate_benchmark_values(values: List[float], aggregation: str = 'geomean') -> float:
+    """
+    Combine the values of several benchmarks into one (geometric mean or sum).
+    """
+    if len(values) == 1:
+        return values[0]
+    if aggregation == 'sum':
+        return float(np.sum(values))
+    with np.errstate(divide='ignore'):
+        return float(np.exp(np.log(values).mean()))
+
 class GodotRuntimeFitnessFunction(FitnessFunction):
     """
     Fitness function for the Godot runtime optimization problem.
     Calculates the fitness value based on the worst runtime of five executions of a benchmark.
+    Several benchmarks can be given: all of them run in the same launch of the binary (engine startup is paid once), the
+    worst value of every benchmark is taken and the values of all the benchmarks are aggregated (geometric mean or sum).
+    Every statistic returned by every benchmark is kept in the stats file, not only benchmark_statistic.
 
     :param str godot_source_path: Path to the folder that contains the godot.bc file.
     :param float opt_timeout: Timeout for the optimization process (opt command).
     :param float clang_timeout: Timeout for the Clang compilation process.
-    :param str benchmark: Name of the benchmark in the godot-benchmarks project to use in the evaluations.
+    :param benchmark: Path of the benchmark in the godot-benchmarks project to use in the evaluations, or several of them
+        (a list or a comma-separated string, e.g. stable benchmarks picked with the variability scripts). Glob patterns are allowed.
     :param str benchmark_statistic: Name of the benchmark statistic to use in the evaluations (render_cpu, render_gpu, idle, physics or time).
     :param float benchmark_timeout: Timeout for one benchmark execution.
     :param str godot_benchmarks_repo_path: Path to the godot-benchmarks repository.
     :param str timestamp: Timestamp of the current execution for fitness stats output file.
+    :param bool trace: Whether to record a Chrome/Perfetto timeline of every evaluation stage in ./data/trace.
+    :param str pass_manager: 'legacy' to pass the solution to opt as legacy flags (-O1 legacy passes), or 'newpm' to build a
+        New PM pipeline (-passes=...) over the NewPM passes, with function(...), loop(...) and cgscc(...) adaptors.
+    :param str reference_binary: Path to a reference Godot binary (e.g. the -O3 base binary). If given, the candidate is
+        measured against it with interleaved runs (PairedMeasurementScheduler) instead of five runs alone, and the fitness
+        value is the upper bound of the confidence interval of the relative difference candidate / reference - 1
+        (negative values are faster than the reference).
+    :param PairedMeasurementScheduler paired_scheduler: Scheduler of the paired measurements (default settings if None).
+    :param str benchmark_aggregation: How to combine the values of several benchmarks: 'geomean' (so that every benchmark weighs
+        the same whatever its scale) or 'sum'.
+    :param ArtifactStore artifact_store: Store that keeps the binaries (and optionally the bitcode) of the best solutions, so they
+        can be validated and published at the end of the run without rebuilding them. None to keep nothing.
+    :param str counters: Performance counters collected for every benchmark launch (instructions, cycles, task-clock and
+        context-switches of the whole launch): 'perf' (perf stat), 'rusage' (only task-clock and context-switches, without perf),
+        'auto' (perf if available) or None to collect nothing. They are kept in the stats file.
+    :param str counter_fitness: Counter used as the fitness instead of benchmark_statistic (e.g. 'instructions', far less noisy
+        than the wall-clock statistics, so fewer executions are needed). Its worst value across the executions is taken, or it is
+        the measured value of the paired measurements.
+    :param str counter_tiebreak: Counter that breaks ties between solutions with the same worst statistic (a nudge below the
+        precision of the statistic is added). Not used with a reference binary.
+    :param int benchmark_executions: Launches of the benchmarks per evaluation (worst-of mode).
+    :param bool time_passes: Whether to run opt with -time-passes and keep the per-pass timings in the stats file.
+    :param PassCostModel cost_model: Online model of the opt and clang++ durations of a solution, updated with every evaluation
+        (a timed out opt counts as opt_timeout) and saved to ./data/fitness/cost_model. Its predictions are available through
+        predict_compile_time, so that the problem can skip the candidates that would exceed a compile-time budget.
     """
+    PASS_MANAGERS = ('legacy', 'newpm')
+
     def __init__(self,
                  godot_source_path: str,
                  opt_timeout: float,
                  clang_timeout: float,
-                 benchmark: str,
+                 benchmark: str | List[str],
                  benchmark_statistic: str,
                  benchmark_timeout: float,
                  godot_benchmarks_repo_path: str,
-                 timestamp: str):
+                 timestamp: str,
+                 trace: bool = False,
+                 pass_manager: str = 'legacy',
+                 reference_binary: str = None,
+                 paired_scheduler: PairedMeasurementScheduler = None,
+                 benchmark_aggregation: str = 'geomean',
+                 artifact_store: ArtifactStore = None,
+                 counters: str = None,
+                 counter_fitness: str = None,
+                 counter_tiebreak: str = None,
+                 benchmark_executions: int = 5,
+                 time_passes: bool = False,
+                 cost_model: PassCostModel = None):
         super().__init__()
+        if pass_manager not in self.PASS_MANAGERS:
+            raise ValueError(f'Unknown pass manager {pass_manager!r}, expected one of {self.PASS_MANAGERS}')
+        if benchmark_aggregation not in BENCHMARK_AGGREGATIONS:
+            raise ValueError(f'Unknown benchmark aggregation {benchmark_aggregation!r}, expected one of {BENCHMARK_AGGREGATIONS}')
+        for counter in (counter_fitness, counter_tiebreak):
+            if counter is not None and counter not in COUNTERS:
+                raise ValueError(f'Unknown counter {counter!r}, expected one of {COUNTERS}')
+        if (counter_fitness or counter_tiebreak) and counters is None:
+            counters = 'auto'
+        self.pass_manager = pass_manager
+        if pass_manager == 'newpm':
+            self.pass_registry = PassRegistry.get('newpm')
         self.godot_source_path = godot_source_path
         self.godot_source_copy_path = godot_source_path + '_evaluation'
         self.opt_timeout = opt_timeout
         self.clang_timeout = clang_timeout
-        self.benchmark = benchmark
+        if isinstance(benchmark, str):
+            benchmark = benchmark.split(',')
+        self.benchmarks = [b.strip() for b in benchmark if b.strip()]
+        if not self.benchmarks:
+            raise ValueError('At least one benchmark is required')
+        self.benchmark = ','.join(self.benchmarks)
+        self.benchmark_aggregation = benchmark_aggregation
+        self.artifact_store = artifact_store
         self.benchmark_statistic = benchmark_statistic
         self.benchmark_timeout = benchmark_timeout
         self.godot_benchmarks_repo_path = godot_benchmarks_repo_path
+        self.reference_binary = reference_binary
+        if reference_binary is not None and paired_scheduler is None:
+            paired_scheduler = PairedMeasurementScheduler()
+        self.paired_scheduler = paired_scheduler
+        self.perf_counters = PerfCounters(counters) if counters is not None else None
+        self.counter_fitness = counter_fitness
+        self.counter_tiebreak = counter_tiebreak
+        self.benchmark_executions = benchmark_executions
+        self.time_passes = time_passes
+        self.cost_model = cost_model
+        self.cost_model_file = f'./data/fitness/cost_model/cost_model-{timestamp}.json'
+        if cost_model is not None:
+            Path(os.path.dirname(self.cost_model_file)).mkdir(parents=True, exist_ok=True)
+        if self.perf_counters is not None and self.perf_counters.backend == 'rusage' \
+                and {counter_fitness, counter_tiebreak} & {'instructions', 'cycles'}:
+            raise ValueError('perf is not available: only task-clock and context-switches can be counted')
 
         self.godot_raw_bitcode_filename = 'godot.bc'
         self.godot_optimized_bitcode_filename = 'godot_solution.bc'
         self.godot_binary_filename = 'godot_solution.out'
         self.benchmark_json_prefix = 'execution'
 
+        self.benchmark_results = dict()
+        self.benchmark_counters = dict()
         self.stats = dict()
         self.stats_file = f'./data/fitness/stats/fitness_stats-{timestamp}.json'
         Path(os.path.dirname(self.stats_file)).mkdir(parents=True, exist_ok=True)
 
+        if trace:
+            self.tracer = TraceRecorder(f'./data/trace/trace-{timestamp}.json')
+        self.candidate = None
+        self.attempt_rusage = None
+
     def _copy_original_source(self) -> None:
-        if os.path.exists(self.godot_source_copy_path):
-            shutil.rmtree(self.godot_source_copy_path)
-        shutil.copytree(self.godot_source_path, self.godot_source_copy_path)
+        with self.tracer.span('workspace setup', self.candidate):
+            if os.path.exists(self.godot_source_copy_path):
+                shutil.rmtree(self.godot_source_copy_path)
+            shutil.copytree(self.godot_source_path, self.godot_source_copy_path)
 
-    def _run_command(self, command: str, timeout: float, attempts: int = 1, cwd: str = None) -> tuple[bool, str, float]:
+    def _run_command(self, command: str, timeout: float, attempts: int = 1, cwd: str = None, span: str = None) -> tuple[bool, str, float]:
         success = False
         attempt = 1
         output = ""
         start = time.perf_counter()
 
         while not success and attempt <= attempts:
+            # rusage of the finished children before this attempt, so that the counters of the rusage backend only
+            # cover the last launch (as perf stat does), not the failed attempts before it
+            self.attempt_rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
             try:
                 start = time.perf_counter()
                 result = subprocess.run(
@@ -87,16 +231,28 @@ class GodotRuntimeFitnessFunction(FitnessFunction):
             except subprocess.SubprocessError as e:
                 output = str(e.output)
                 attempt += 1
+
+            if self.tracer.enabled and span is not None:
+                self.tracer.complete(span, start, time.perf_counter(), self.candidate,
+                                     attempt=attempt if success else attempt - 1, success=success)
         
         finish = time.perf_counter()
         duration = finish - start
 
         return success, output, duration
     
-    def _apply_opt_allinone(self, passes: str) -> bool:
+    def _opt_arguments(self, solution_variables: List[int]) -> List[str]:
+        names = self.pass_registry.names_of(solution_variables)
+        if self.pass_manager == 'newpm':
+            pipeline = build_pipeline(names, self.pass_registry)
+            return [f'-passes={pipeline}'] if pipeline else []
+        return [name for name in names if name]
+
+    def _apply_opt_allinone(self, passes: List[str]) -> bool:
         opt_command = [
             'opt',
-            *passes.split(),
+            *([TIME_PASSES_FLAG] if self.time_passes else []),
+            *passes,
             f'{self.godot_source_copy_path}/{self.godot_raw_bitcode_filename}',
             '-o',
             f'{self.godot_source_copy_path}/{self.godot_optimized_bitcode_filename}'
@@ -105,6 +261,7 @@ class GodotRuntimeFitnessFunction(FitnessFunction):
         return self._run_command(
             command=opt_command,
             timeout=self.opt_timeout,
+            span='opt'
         )
 
     def _compile(self) -> bool:
@@ -130,7 +287,38 @@ class GodotRuntimeFitnessFunction(FitnessFunction):
         return self._run_command(
             command=clang_command,
             timeout=self.clang_timeout,
+            span='clang++'
+        )
+
+    def _run_benchmark_binary(self, binary: str, json_path: str, execution_attempts: int, span: str) -> tuple[bool, str, float]:
+        benchmark_command = [
+            binary,
+            '--',
+            '--run-benchmarks',
+            f'--include-benchmarks={self.benchmark}',
+            f'--save-json={json_path}'
+        ]
+
+        if self.perf_counters is None:
+            return self._run_command(
+                command=benchmark_command,
+                timeout=self.benchmark_timeout,
+                attempts=execution_attempts,
+                cwd=self.godot_benchmarks_repo_path,
+                span=span
+            )
+
+        counters_path = str(Path(json_path).with_suffix('.perf'))
+        success, output, duration = self._run_command(
+            command=self.perf_counters.command(benchmark_command, counters_path),
+            timeout=self.benchmark_timeout,
+            attempts=execution_attempts,
+            cwd=self.godot_benchmarks_repo_path,
+            span=span
         )
+        if success:
+            self.benchmark_counters[Path(json_path).stem] = self.perf_counters.read(counters_path, self.attempt_rusage)
+        return success, output, duration
 
     def _run_benchmark(self, executions: int, execution_attempts: int) -> bool:
         last_success = False
@@ -140,19 +328,11 @@ class GodotRuntimeFitnessFunction(FitnessFunction):
         for i in range(1, executions + 1):
             json_path = f'{self.godot_source_copy_path}/{self.benchmark_json_prefix}_{i}.json'
 
-            benchmark_command = [
+            last_success, last_output, duration = self._run_benchmark_binary(
                 f'{self.godot_source_copy_path}/{self.godot_binary_filename}',
-                '--',
-                '--run-benchmarks',
-                f'--include-benchmarks={self.benchmark}',
-                f'--save-json={json_path}'
-            ]
-
-            last_success, last_output, duration = self._run_command(
-                command=benchmark_command,
-                timeout=self.benchmark_timeout,
-                attempts=execution_attempts,
-                cwd=self.godot_benchmarks_repo_path
+                json_path,
+                execution_attempts,
+                f'benchmark {i}'
             )
 
             if not last_success:
@@ -163,93 +343,236 @@ class GodotRuntimeFitnessFunction(FitnessFunction):
 
         return last_success, last_output, total_duration
 
+    def _run_paired_benchmark(self, execution_attempts: int) -> tuple[bool, str, float, PairedResult]:
+        # Candidate and reference runs interleaved in random blocks, without idle sleeps between them
+        output = ""
+        total_duration = 0.0
+
+        def run(arm: str, i: int) -> float | None:
+            nonlocal output, total_duration
+            if arm == CANDIDATE:
+                binary = f'{self.godot_source_copy_path}/{self.godot_binary_filename}'
+            else:
+                binary = self.reference_binary
+            json_path = f'{self.godot_source_copy_path}/{self.benchmark_json_prefix}_{arm}_{i}.json'
+            success, output, duration = self._run_benchmark_binary(binary, json_path, execution_attempts, f'{arm} {i}')
+            if not success:
+                return None
+            total_duration += duration
+            with self.tracer.span('json parsing', self.candidate):
+                results = self._parse_benchmark_results(json_path)
+            if results is None:
+                return None
+            if self.counter_fitness is not None:
+                return self.benchmark_counters[Path(json_path).stem].get(self.counter_fitness)
+            return self._aggregate_statistic(results, self.benchmark_statistic)
+
+        result = self.paired_scheduler.measure(run)
+        return result.success, output, total_duration if result.success else None, result
+
+    def _parse_benchmark_results(self, json_path: str) -> dict | None:
+        # Results of one execution, also kept for the stats file
+        results = parse_benchmark_results(json_path, self.benchmarks)
+        self.benchmark_results[Path(json_path).stem] = results
+        return results
+
+    def _aggregate_statistic(self, results: dict, benchmark_statistic: str) -> float | None:
+        values = [statistics.get(benchmark_statistic) for statistics in results.values()]
+        if not values or None in values:
+            return None
+        return aggregate_benchmark_values(values, self.benchmark_aggregation)
+
+    def _get_worst_counter_value(self, counter: str, executions: int) -> float | None:
+        values = [self.benchmark_counters.get(f'{self.benchmark_json_prefix}_{i}', {}).get(counter)
+                  for i in range(1, executions + 1)]
+        return None if None in values else max(values)
+
     def _get_worst_benchmark_value(self, benchmark_statistic: str, executions: int) -> float | None:
-        worst_value = 0.0
+        with self.tracer.span('json parsing', self.candidate):
+            return self._parse_worst_benchmark_value(benchmark_statistic, executions)
+
+    def _parse_worst_benchmark_value(self, benchmark_statistic: str, executions: int) -> float | None:
+        # Worst value of every benchmark across the executions, then aggregated across the benchmarks
+        worst_values = dict()
 
         for i in range(1, executions + 1):
             json_path = f'{self.godot_source_copy_path}/{self.benchmark_json_prefix}_{i}.json'
-            try:
-                with open(json_path, 'r') as f:
-                    data = json.load(f)
-                    value = data['benchmarks'][0]['results'].get(benchmark_statistic)
-                    if value is None:
-                        worst_value = None
-                        break
-                    if value > worst_value:
-                        worst_value = value
-            except (FileNotFoundError, json.JSONDecodeError, KeyError, IndexError):
-                worst_value = None
-                break
+            results = self._parse_benchmark_results(json_path)
+            if results is None:
+                return None
+            for path, statistics in results.items():
+                value = statistics.get(benchmark_statistic)
+                if value is None:
+                    return None
+                worst_values[path] = max(value, worst_values.get(path, value))
 
-        return worst_value
+        return aggregate_benchmark_values(list(worst_values.values()), self.benchmark_aggregation) if worst_values else None
     
+    def predict_compile_time(self, solution_variables: List[int]) -> float | None:
+        """
+        Predicted opt + clang++ duration of a solution, or None without a cost model or while it has too few observations.
+        """
+        if self.cost_model is None:
+            return None
+        return self.cost_model.predict_total(solution_variables)
+
+    def _update_cost_model(self, solution_variables: List[int], opt_success: bool, opt_duration: float,
+                           clang_success: bool, clang_duration: float) -> None:
+        # A timed out opt is a lower bound of its real duration, but still the best hint that the solution is expensive;
+        # other failures say nothing about the cost
+        if opt_success:
+            opt_seconds = opt_duration
+        elif opt_duration is not None and opt_duration >= self.opt_timeout:
+            opt_seconds = self.opt_timeout
+        else:
+            opt_seconds = None
+        self.cost_model.update(solution_variables, opt=opt_seconds, clang=clang_duration if clang_success else None)
+        self.cost_model.save(self.cost_model_file)
+
+    def _store_artifacts(self, fitness_value: float, opt_arguments: List[str]) -> None:
+        # Before the next evaluation overwrites godot_solution.out
+        if self.artifact_store is None or not self.artifact_store.qualifies(fitness_value):
+            return
+        with self.tracer.span('artifact store', self.candidate):
+            self.artifact_store.offer(
+                self.candidate,
+                fitness_value,
+                f'{self.godot_source_copy_path}/{self.godot_binary_filename}',
+                f'{self.godot_source_copy_path}/{self.godot_optimized_bitcode_filename}',
+                {
+                    'pass_manager': self.pass_manager,
+                    'arguments': opt_arguments,
+                    'benchmarks': self.benchmarks,
+                    'benchmark_statistic': self.benchmark_statistic
+                }
+            )
+
     def _save_stats(self, solution_variables: List[int], 
-                    opt_success: bool, opt_output: str, opt_duration: float,
+                    opt_success: bool, opt_output: str, opt_duration: float, opt_arguments: List[str],
                     clang_success: bool, clang_output: str, clang_duration: float,
                     benchmark_success: bool, benchmark_output: str, benchmark_duration: float,
-                    fitness_value: float) -> None:
+                    fitness_value: float, paired_result: PairedResult = None,
+                    time_passes: dict = None, predicted_durations: dict = None, tool_cpu_seconds: float = None,
+                    binary_size: int = None) -> None:
         self.stats[str(solution_variables)] = {
             'opt': {
                 'success': opt_success,
                 'output': opt_output,
-                'duration': opt_duration
+                'duration': opt_duration,
+                'pass_manager': self.pass_manager,
+                'arguments': opt_arguments
             },
             'clang': {
                 'success': clang_success,
                 'output': clang_output,
-                'duration': clang_duration
+                'duration': clang_duration,
+                'binary_size': binary_size
             },
             'benchmark': {
                 'success': benchmark_success,
                 'output': benchmark_output,
-                'duration': benchmark_duration
+                'duration': benchmark_duration,
+                'benchmarks': self.benchmarks,
+                'aggregation': self.benchmark_aggregation,
+                'results': self.benchmark_results,
+                'counters': self.benchmark_counters if self.perf_counters is not None else None
             },
+            'tool_cpu_seconds': tool_cpu_seconds,
             'fitness_value': fitness_value
         }
-        with open(self.stats_file, 'w') as f:
-            json.dump(self.stats, f, indent=2)
+        if self.time_passes:
+            self.stats[str(solution_variables)]['opt']['time_passes'] = time_passes
+        if predicted_durations is not None:
+            self.stats[str(solution_variables)]['opt']['predicted_duration'] = predicted_durations.get('opt')
+            self.stats[str(solution_variables)]['clang']['predicted_duration'] = predicted_durations.get('clang')
+        if paired_result is not None:
+            self.stats[str(solution_variables)]['benchmark']['reference_binary'] = self.reference_binary
+            self.stats[str(solution_variables)]['benchmark']['paired'] = paired_result.to_dict()
+        with self.tracer.span('stats write', self.candidate):
+            with open(self.stats_file, 'w') as f:
+                json.dump(self.stats, f, indent=2)
 
     def calculate(self, solution_variables: List[int]) -> float:
         """
-        Calculate the fitness value based on the worst runtime of five executions of a benchmark.
+        Calculate the fitness value based on the worst runtime (or performance counter) of five executions of a benchmark or,
+        with a reference binary, on the paired relative difference between the candidate and the reference.
 
         :param solution_variables: List of integers representing the LLVM passes to apply.
-        :return: The fitness value (worst runtime) or sys.float_info.max if an error occurs.
+        :return: The fitness value (worst runtime or upper bound of the relative difference) or sys.float_info.max if an error occurs.
         """
         fitness_value = sys.float_info.max
+        self.candidate = str(solution_variables)
+        self.benchmark_results = dict()
+        self.benchmark_counters = dict()
+        # CPU time of opt, clang++ and the benchmark launches (every subprocess is waited for, so it is in RUSAGE_CHILDREN)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
 
         self._copy_original_source()
 
-        passes = ' '.join([LlvmUtils.get_passes()[i] for i in solution_variables])
+        passes = self._opt_arguments(solution_variables)
+        # Prediction before learning from this solution, kept to assess the model
+        predicted_durations = self.cost_model.predict(solution_variables) if self.cost_model is not None else None
         opt_success, opt_output, opt_duration = self._apply_opt_allinone(passes)
+        time_passes = None
+        if self.time_passes and opt_output is not None:
+            opt_output, time_passes = split_time_passes(opt_output)
 
+        binary_size = None
         if opt_success:
             clang_success, clang_output, clang_duration = self._compile()
+            if clang_success:
+                binary_size = os.path.getsize(f'{self.godot_source_copy_path}/{self.godot_binary_filename}')
         else:
             clang_success = None
             clang_output = None
             clang_duration = None
+
+        if self.cost_model is not None:
+            self._update_cost_model(solution_variables, opt_success, opt_duration, clang_success, clang_duration)
         
+        paired_result = None
         if clang_success:
-            executions = 5
+            executions = self.benchmark_executions
             execution_attempts = 3
-            benchmark_success, benchmark_output, benchmark_duration = self._run_benchmark(executions, execution_attempts)
+            if self.reference_binary is not None:
+                benchmark_success, benchmark_output, benchmark_duration, paired_result = \
+                    self._run_paired_benchmark(execution_attempts)
+            else:
+                benchmark_success, benchmark_output, benchmark_duration = self._run_benchmark(executions, execution_attempts)
         else:
             benchmark_success = None
             benchmark_output = None
             benchmark_duration = None
         
-        if benchmark_success:
+        if paired_result is not None:
+            if benchmark_success and paired_result.interval is not None:
+                fitness_value = paired_result.interval.upper_bound
+        elif benchmark_success:
             worst_benchmark_value = self._get_worst_benchmark_value(self.benchmark_statistic, executions)
+            if worst_benchmark_value is not None and self.counter_fitness is not None:
+                worst_benchmark_value = self._get_worst_counter_value(self.counter_fitness, executions)
+            if worst_benchmark_value is not None and self.counter_tiebreak is not None:
+                tiebreak = self._get_worst_counter_value(self.counter_tiebreak, executions)
+                if tiebreak is not None:
+                    worst_benchmark_value += max(abs(worst_benchmark_value), 1.0) * TIEBREAK_WEIGHT * \
+                                             tiebreak / (tiebreak + TIEBREAK_SCALE)
             if worst_benchmark_value is not None:
                 fitness_value = worst_benchmark_value
         
+        self._store_artifacts(fitness_value, passes)
+
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        tool_cpu_seconds = (usage.ru_utime - children_usage.ru_utime) + (usage.ru_stime - children_usage.ru_stime)
+        self.tool_cpu_seconds += tool_cpu_seconds
+
         self._save_stats(
             solution_variables,
-            opt_success, opt_output, opt_duration,
+            opt_success, opt_output, opt_duration, passes,
             clang_success, clang_output, clang_duration,
             benchmark_success, benchmark_output, benchmark_duration,
-            fitness_value
+            fitness_value, paired_result,
+            time_passes, predicted_durations, tool_cpu_seconds,
+            binary_size
         )
 
         return fitness_value
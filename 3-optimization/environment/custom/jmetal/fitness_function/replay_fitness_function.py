@@ -0,0 +1,116 @@
+import sys
+from typing import List
+
+import numpy as np
+
+from custom.jmetal.fitness_function import FitnessFunction
+from custom.jmetal.util.fitness_archive import merge_archives
+
+"""
+.. module:: replay_fitness_function
+   :platform: Unix, Windows
+   :synopsis: Fitness function that answers from archives of real evaluations, to tune the algorithms quickly.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+FALLBACKS = ('nearest', 'surrogate', 'failure')
+
+
+class ReplayFitnessFunction(FitnessFunction):
+    """
+    Replays the fitness values of one or more archives of real evaluations (JSON fitness archives, legacy CSV or binary
+    .farc, merged with FitnessArchive), so that many algorithm configurations (population size, neighbourhood, SA alpha...)
+    can be compared in minutes instead of days.
+    Archived solutions are answered in O(1) from FitnessArchive.lookup_table. The rest fall back to:
+    'nearest', the mean fitness value of the k archived solutions at the smallest Hamming distance (same position, same pass);
+    'surrogate', a ridge regression of the fitness value on how many times every pass appears in the solution; or
+    'failure', sys.float_info.max as if the evaluation had failed.
+    Failed evaluations (sys.float_info.max) are replayed as they are, but they are not used by the fallbacks.
+    How many queries fell back is counted (fallbacks, fallback_rate), so that results relying too much on them can be spotted.
+
+    :param list archive_files: Archives to replay, merged in the given order.
+    :param str merge_policy: Fitness value kept for solutions present in several archives (last, first, min, max or mean).
+    :param str flavour: Pass catalogue the indexes of the archives refer to (legacy-o1, legacy-all or newpm).
+    :param str fallback: What to answer for solutions not in the archives ('nearest', 'surrogate' or 'failure').
+    :param int k: Neighbours averaged by the 'nearest' fallback.
+    :param float ridge: Regularization of the 'surrogate' fallback.
+    """
+    def __init__(self,
+                 archive_files: List[str],
+                 merge_policy: str = 'mean',
+                 flavour: str = 'legacy-o1',
+                 fallback: str = 'nearest',
+                 k: int = 5,
+                 ridge: float = 1.0):
+        super().__init__()
+        if fallback not in FALLBACKS:
+            raise ValueError(f'Unknown fallback {fallback!r}, expected one of {FALLBACKS}')
+        self.archive = merge_archives(archive_files, merge_policy, flavour)
+        if not len(self.archive):
+            raise ValueError(f'No solutions in {archive_files}')
+        self.pass_registry = self.archive.registry
+        self.lookup = self.archive.lookup_table()
+        self.fallback = fallback
+        self.k = k
+
+        valid = self.archive.fitness < sys.float_info.max
+        self.valid_passes = np.asarray(self.archive.passes)[valid]
+        self.valid_fitness = self.archive.fitness[valid]
+        self.surrogate_coefficients = None
+        if fallback == 'surrogate':
+            self.surrogate_coefficients = self._fit_surrogate(ridge)
+
+        self.queries = 0
+        self.fallbacks = 0
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallbacks / self.queries if self.queries else 0.0
+
+    def _features(self, passes: np.ndarray) -> np.ndarray:
+        # Number of times every pass appears in every solution, plus an intercept
+        features = np.zeros((len(passes), len(self.pass_registry) + 1))
+        rows = np.repeat(np.arange(len(passes)), passes.shape[1])
+        np.add.at(features, (rows, passes.ravel().astype(int)), 1.0)
+        features[:, -1] = 1.0
+        return features
+
+    def _fit_surrogate(self, ridge: float) -> np.ndarray:
+        features = self._features(self.valid_passes)
+        prior = ridge * np.identity(features.shape[1])
+        prior[-1, -1] = 0.0     # The intercept is not regularized
+        return np.linalg.solve(features.T @ features + prior, features.T @ self.valid_fitness)
+
+    def _nearest(self, genome: np.ndarray) -> float:
+        if genome.size != self.archive.n_passes:
+            raise ValueError(f'Solutions of {genome.size} passes cannot be compared with archived solutions of '
+                             f'{self.archive.n_passes} passes')
+        if not len(self.valid_fitness):
+            return sys.float_info.max
+        distances = np.count_nonzero(self.valid_passes != genome, axis=1)
+        k = min(self.k, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return float(np.mean(self.valid_fitness[nearest]))
+
+    def calculate(self, solution_variables: List[int]) -> float:
+        """
+        Fitness value of a solution in the archives, or the fallback estimate if it is not there.
+
+        :param solution_variables: List of integers representing the LLVM passes to apply.
+        :return: The archived (or estimated) fitness value.
+        """
+        self.queries += 1
+        fitness_value = self.lookup.get(self.pass_registry.encode_genome(solution_variables))
+        if fitness_value is not None:
+            return fitness_value
+
+        self.fallbacks += 1
+        if self.fallback == 'nearest':
+            return self._nearest(np.asarray(solution_variables, dtype=self.archive.passes.dtype))
+        if self.fallback == 'surrogate':
+            features = self._features(np.asarray([solution_variables]))
+            return float(features[0] @ self.surrogate_coefficients)
+        return sys.float_info.max
+
+    def name(self) -> str:
+        return "Replay Fitness Function"
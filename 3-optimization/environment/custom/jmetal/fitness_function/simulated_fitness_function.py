@@ -0,0 +1,172 @@
+from datetime import datetime
+import glob
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from custom.jmetal.fitness_function import FitnessFunction
+from custom.jmetal.util import PassRegistry, TraceRecorder
+
+"""
+.. module:: simulated_fitness_function
+   :platform: Unix, Windows
+   :synopsis: Fitness function that simulates the stages of the Godot evaluations from recorded stats.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+STAGES = ('opt', 'clang', 'benchmark')
+
+
+def load_stage_samples(stats_files: List[str]) -> dict:
+    """
+    Durations and outcomes of every stage in fitness_stats-*.json files (paths or glob patterns).
+    A stage that was not reached (success None) is not a sample of that stage.
+
+    :return: {stage: {'success': [durations], 'failure': [durations]}} and the valid fitness values under 'fitness'.
+    """
+    samples = {stage: {'success': [], 'failure': []} for stage in STAGES}
+    samples['fitness'] = []
+    paths = sorted({path for pattern in stats_files for path in glob.glob(pattern)})
+    for path in paths:
+        with open(path, 'r') as f:
+            stats = json.load(f)
+        for entry in stats.values():
+            for stage in STAGES:
+                success = entry[stage]['success']
+                if success is None:
+                    continue
+                # Old stats files keep the values as strings
+                success = success is True or success == 'True'
+                try:
+                    duration = float(entry[stage]['duration'])
+                except (TypeError, ValueError):
+                    duration = None
+                if duration is not None or not success:
+                    samples[stage]['success' if success else 'failure'].append(duration)
+            fitness_value = entry.get('fitness_value')
+            if fitness_value is not None and float(fitness_value) < sys.float_info.max:
+                samples['fitness'].append(float(fitness_value))
+    if not samples['opt']['success']:
+        raise ValueError(f'No successful evaluations in {stats_files}')
+    return samples
+
+
+class SimulatedFitnessFunction(FitnessFunction):
+    """
+    Simulator of GodotRuntimeFitnessFunction to test the optimization infrastructure (schedulers, caches, termination
+    criteria, parallel evaluators) without Godot or LLVM.
+    Every stage (opt, clang++, benchmark) fails with the probability observed in recorded stats files and otherwise takes a
+    duration drawn from the recorded ones. The simulated time is either slept, divided by time_scale (e.g. 1000 to run
+    1000 times faster than the real evaluations), or only added to a virtual clock (time_scale None).
+    The fitness value is a deterministic NK landscape: the contribution of every position depends on its pass and on the
+    next k passes, through a hash of the seed, so the same solution always gets the same value (and the same stage
+    durations and failures), whatever the order of the evaluations or the process evaluating it. If the stats files
+    have fitness values, the landscape is mapped onto their distribution, so that the values look like the real ones.
+
+    :param list stats_files: fitness_stats-*.json files (or glob patterns) to sample the stages from.
+    :param int seed: Seed of the landscape and of the stage samples.
+    :param float time_scale: Real seconds are simulated seconds / time_scale. None to not sleep at all.
+    :param int k: Epistasis of the landscape (number of following passes that interact with every pass).
+    :param str pass_manager: 'legacy' or 'newpm', to use the same pass catalogue as the real fitness function.
+    :param str timestamp: Timestamp for the stats file (same format as the real one). None to not write it.
+    :param bool trace: Whether to record the simulated stages in a Chrome/Perfetto timeline in ./data/trace (named after the
+        timestamp, or after the current time if there is none).
+    """
+    def __init__(self,
+                 stats_files: List[str],
+                 seed: int = 0,
+                 time_scale: float = None,
+                 k: int = 1,
+                 pass_manager: str = 'legacy',
+                 timestamp: str = None,
+                 trace: bool = False):
+        super().__init__()
+        if pass_manager == 'newpm':
+            self.pass_registry = PassRegistry.get('newpm')
+        self.samples = load_stage_samples(stats_files)
+        self.fitness_quantiles = np.sort(self.samples['fitness']) if self.samples['fitness'] else None
+        self.seed = seed
+        self.time_scale = time_scale
+        self.k = k
+        self.virtual_seconds = 0.0
+
+        self.stats = dict()
+        self.stats_file = None
+        if timestamp is not None:
+            self.stats_file = f'./data/fitness/stats/fitness_stats-simulated-{timestamp}.json'
+            Path(os.path.dirname(self.stats_file)).mkdir(parents=True, exist_ok=True)
+        if trace:
+            trace_timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.tracer = TraceRecorder(f'./data/trace/trace-simulated-{trace_timestamp}.json')
+
+    def _uniform(self, *key) -> float:
+        # Deterministic U(0, 1) from the seed and the key (unlike hash(), it does not change between processes)
+        digest = hashlib.blake2b(repr((self.seed, *key)).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') / 2**64
+
+    def landscape(self, solution_variables: List[int]) -> float:
+        """
+        Value of the NK landscape in [0, 1] (lower is better), roughly uniform over random solutions.
+        """
+        n = len(solution_variables)
+        if n == 0:
+            return 0.5
+        contributions = [self._uniform(i, tuple(solution_variables[i:i + self.k + 1])) for i in range(n)]
+        # The mean of n U(0, 1) concentrates around 0.5: standardize it and spread it with the normal CDF
+        z = (np.mean(contributions) - 0.5) / math.sqrt(1 / (12 * n))
+        return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
+    def _simulate_stage(self, stage: str, rng: np.random.Generator, candidate: str) -> tuple[bool, float]:
+        samples = self.samples[stage]
+        total = len(samples['success']) + len(samples['failure'])
+        success = rng.random() >= len(samples['failure']) / total if total else True
+        durations = [d for d in samples['success' if success else 'failure'] if d is not None] or samples['success']
+        duration = float(rng.choice(durations)) if durations else 0.0
+
+        self.virtual_seconds += duration
+        self.tool_cpu_seconds += duration
+        with self.tracer.span(stage, candidate, simulated_seconds=duration, success=success):
+            if self.time_scale:
+                time.sleep(duration / self.time_scale)
+        return success, duration
+
+    def calculate(self, solution_variables: List[int]) -> float:
+        """
+        Simulate the evaluation of a solution.
+
+        :param solution_variables: List of integers representing the LLVM passes to apply.
+        :return: The fitness value of the landscape, or sys.float_info.max if a stage failed.
+        """
+        candidate = str(solution_variables)
+        rng = np.random.default_rng(int(self._uniform('stages', tuple(solution_variables)) * 2**63))
+        entry = {stage: {'success': None, 'duration': None} for stage in STAGES}
+        fitness_value = sys.float_info.max
+
+        for stage in STAGES:
+            success, duration = self._simulate_stage(stage, rng, candidate)
+            entry[stage] = {'success': success, 'duration': duration}
+            if not success:
+                break
+        else:
+            value = self.landscape(solution_variables)
+            if self.fitness_quantiles is not None:
+                value = float(np.quantile(self.fitness_quantiles, value))
+            fitness_value = value
+
+        entry['fitness_value'] = fitness_value
+        self.stats[candidate] = entry
+        if self.stats_file is not None:
+            with self.tracer.span('stats write', candidate):
+                with open(self.stats_file, 'w') as f:
+                    json.dump(self.stats, f, indent=2)
+        return fitness_value
+
+    def name(self) -> str:
+        return "Simulated Fitness Function"
@@ -0,0 +1,3 @@
+from .novelty import NoveltyFilter
+from .crossover import IntegerNPointCrossover, IntegerUniformCrossover
+from .mutation import IntegerInsertMutation, IntegerResetMutation, IntegerSwapMutation
\ No newline at end of file
@@ -0,0 +1,104 @@
+import copy
+import random
+from typing import List
+
+from jmetal.core.operator import Crossover
+from jmetal.core.solution import IntegerSolution
+from jmetal.util.ckecking import Check
+
+from custom.jmetal.operator.novelty import NoveltyFilter
+
+"""
+.. module:: crossover
+   :platform: Unix, Windows
+   :synopsis: Categorical crossovers of pass sequences (uniform and n-point) that avoid already evaluated offspring.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+
+class CategoricalCrossover(Crossover[IntegerSolution, IntegerSolution]):
+    """
+    Base class of the crossovers of pass sequences: every child takes the pass of one of the parents at every position
+    (unlike IntegerSBXCrossover, no value between both parents is made up). With a NoveltyFilter, the crossover is applied
+    again until both children are new; the children are not registered, since the mutation applied next is the operator
+    that decides the offspring.
+
+    :param float probability: Probability of crossing the parents (otherwise, the children are copies of them).
+    :param NoveltyFilter novelty: Filter of the already evaluated solutions. None to allow any offspring.
+    """
+    def __init__(self, probability: float, novelty: NoveltyFilter = None):
+        super(CategoricalCrossover, self).__init__(probability=probability)
+        self.novelty = novelty
+
+    def _cross(self, offspring: List[IntegerSolution], parents: List[IntegerSolution]) -> None:
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def execute(self, parents: List[IntegerSolution]) -> List[IntegerSolution]:
+        Check.that(issubclass(type(parents[0]), IntegerSolution), "Solution type invalid")
+        Check.that(issubclass(type(parents[1]), IntegerSolution), "Solution type invalid")
+        Check.that(len(parents) == 2, "The number of parents is not two: {}".format(len(parents)))
+
+        def produce():
+            offspring = copy.deepcopy(parents)
+            if random.random() <= self.probability:
+                self._cross(offspring, parents)
+            return offspring
+
+        if self.novelty is None:
+            return produce()
+        offspring, _ = self.novelty.resample(produce)
+        return offspring
+
+    def get_number_of_parents(self) -> int:
+        return 2
+
+    def get_number_of_children(self) -> int:
+        return 2
+
+
+class IntegerUniformCrossover(CategoricalCrossover):
+    """
+    Every position is swapped between the children with the given probability (0.5 by default).
+
+    :param float swap_probability: Probability of swapping every position.
+    """
+    def __init__(self, probability: float, swap_probability: float = 0.5, novelty: NoveltyFilter = None):
+        super(IntegerUniformCrossover, self).__init__(probability=probability, novelty=novelty)
+        self.swap_probability = swap_probability
+
+    def _cross(self, offspring: List[IntegerSolution], parents: List[IntegerSolution]) -> None:
+        for i in range(len(parents[0].variables)):
+            if random.random() <= self.swap_probability:
+                offspring[0].variables[i] = parents[1].variables[i]
+                offspring[1].variables[i] = parents[0].variables[i]
+
+    def get_name(self) -> str:
+        return 'Integer uniform crossover'
+
+
+class IntegerNPointCrossover(CategoricalCrossover):
+    """
+    The sequences are cut at n random points and the children alternate the segments of both parents
+    (n=1 is the one-point crossover, n=2 the two-point crossover).
+
+    :param int points: Number of cut points.
+    """
+    def __init__(self, probability: float, points: int = 2, novelty: NoveltyFilter = None):
+        super(IntegerNPointCrossover, self).__init__(probability=probability, novelty=novelty)
+        if points < 1:
+            raise ValueError(f'At least one cut point is required, got {points}')
+        self.points = points
+
+    def _cross(self, offspring: List[IntegerSolution], parents: List[IntegerSolution]) -> None:
+        n = len(parents[0].variables)
+        if n < 2:
+            return
+        cuts = sorted(random.sample(range(1, n), min(self.points, n - 1)))
+        # Swap every other segment: [cut_0, cut_1), [cut_2, cut_3)...
+        bounds = cuts + [n] if len(cuts) % 2 else cuts
+        for start, end in zip(bounds[::2], bounds[1::2]):
+            offspring[0].variables[start:end] = parents[1].variables[start:end]
+            offspring[1].variables[start:end] = parents[0].variables[start:end]
+
+    def get_name(self) -> str:
+        return f'Integer {self.points}-point crossover'
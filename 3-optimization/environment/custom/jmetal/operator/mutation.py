@@ -0,0 +1,105 @@
+import random
+
+from jmetal.core.operator import Mutation
+from jmetal.core.solution import IntegerSolution
+from jmetal.util.ckecking import Check
+
+from custom.jmetal.operator.novelty import NoveltyFilter
+
+"""
+.. module:: mutation
+   :platform: Unix, Windows
+   :synopsis: Categorical mutations of pass sequences (reset, swap and insert) that only emit new solutions.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+
+class CategoricalMutation(Mutation[IntegerSolution]):
+    """
+    Base class of the mutations of pass sequences. The values of the variables are pass indexes, so there is no distance
+    between them (as IntegerPolynomialMutation assumes): a pass is replaced by any other or moved within the sequence.
+    With a NoveltyFilter, the mutation is applied again to the original solution until the result has not been evaluated
+    yet; if the attempts run out, random passes are reset until it is new. The result is registered in the filter.
+
+    :param float probability: Probability of mutating every variable.
+    :param NoveltyFilter novelty: Filter of the already evaluated solutions. None to allow any offspring.
+    """
+    def __init__(self, probability: float, novelty: NoveltyFilter = None):
+        super(CategoricalMutation, self).__init__(probability=probability)
+        self.novelty = novelty
+
+    def _mutate(self, solution: IntegerSolution) -> None:
+        raise NotImplementedError("Subclasses should implement this method.")
+
+    def execute(self, solution: IntegerSolution) -> IntegerSolution:
+        Check.that(issubclass(type(solution), IntegerSolution), "Solution type invalid")
+
+        if self.novelty is None:
+            self._mutate(solution)
+            return solution
+
+        original = list(solution.variables)
+
+        def produce():
+            solution.variables = list(original)
+            self._mutate(solution)
+            return [solution]
+
+        _, novel = self.novelty.resample(produce)
+        if not novel:
+            self.novelty.force(solution)
+        self.novelty.register(solution.variables)
+        return solution
+
+
+class IntegerResetMutation(CategoricalMutation):
+    """
+    Every variable is replaced, with the given probability, by another pass chosen uniformly at random.
+    """
+    def _mutate(self, solution: IntegerSolution) -> None:
+        for i in range(len(solution.variables)):
+            if random.random() <= self.probability:
+                lower_bound, upper_bound = solution.lower_bound[i], solution.upper_bound[i]
+                if lower_bound == upper_bound:
+                    continue
+                value = random.randint(lower_bound, upper_bound - 1)
+                solution.variables[i] = value + 1 if value >= solution.variables[i] else value
+
+    def get_name(self) -> str:
+        return 'Integer reset mutation'
+
+
+class IntegerSwapMutation(CategoricalMutation):
+    """
+    Every variable is swapped, with the given probability, with another one at a random position (the same passes in another order).
+    """
+    def _mutate(self, solution: IntegerSolution) -> None:
+        n = len(solution.variables)
+        if n < 2:
+            return
+        for i in range(n):
+            if random.random() <= self.probability:
+                j = random.randrange(n - 1)
+                j = j + 1 if j >= i else j
+                solution.variables[i], solution.variables[j] = solution.variables[j], solution.variables[i]
+
+    def get_name(self) -> str:
+        return 'Integer swap mutation'
+
+
+class IntegerInsertMutation(CategoricalMutation):
+    """
+    Every variable is moved, with the given probability, to a random position, shifting the passes in between
+    (the rest of the sequence keeps its relative order).
+    """
+    def _mutate(self, solution: IntegerSolution) -> None:
+        n = len(solution.variables)
+        if n < 2:
+            return
+        for i in range(n):
+            if random.random() <= self.probability:
+                value = solution.variables.pop(i)
+                solution.variables.insert(random.randrange(n), value)
+
+    def get_name(self) -> str:
+        return 'Integer insert mutation'
@@ -0,0 +1,71 @@
+import random
+from typing import Callable, Iterable, List
+
+from jmetal.core.solution import IntegerSolution
+
+"""
+.. module:: novelty
+   :platform: Unix, Windows
+   :synopsis: Membership test of already evaluated solutions, so that variation operators only emit new ones.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+
+class NoveltyFilter():
+    """
+    Tells whether a solution has already been evaluated, looking it up in the fitness archive of the problem (a dict keyed by
+    str(solution.variables), so the lookup is a hash set membership test) and in the offspring already handed out by the
+    mutation operators and not archived yet (e.g. rejected by the compile-time budget).
+    Variation operators that receive one resample their offspring until it is new, so that no evaluation of the budget
+    (StoppingByEvaluations) is spent on a solution whose fitness is already known.
+
+    :param archive: Keys of the evaluated solutions. It should be the archive object itself (e.g.
+        LlvmRuntimeProblem.fitness_archive), not a copy, so that new evaluations are seen.
+    :param int max_attempts: Times an operator is applied again before giving up (or forcing a new solution, in the mutations).
+    """
+    def __init__(self, archive: Iterable = None, max_attempts: int = 100):
+        self.archive = archive if archive is not None else dict()
+        self.max_attempts = max_attempts
+        self.issued = set()
+        self.resamples = 0
+        self.forced = 0
+
+    @staticmethod
+    def key(variables: List[int]) -> str:
+        # Same key as the fitness archive of LlvmRuntimeProblem
+        return str(list(variables))
+
+    def is_novel(self, variables: List[int]) -> bool:
+        key = self.key(variables)
+        return key not in self.archive and key not in self.issued
+
+    def register(self, variables: List[int]) -> None:
+        self.issued.add(self.key(variables))
+
+    def resample(self, produce: Callable[[], List[IntegerSolution]]) -> tuple[List[IntegerSolution], bool]:
+        """
+        Call produce until all of its solutions are new (and different from each other), at most max_attempts times.
+
+        :return: The last solutions produced and whether they are all new.
+        """
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.resamples += 1
+            solutions = produce()
+            keys = [self.key(solution.variables) for solution in solutions]
+            if len(set(keys)) == len(keys) and all(self.is_novel(solution.variables) for solution in solutions):
+                return solutions, True
+        return solutions, False
+
+    def force(self, solution: IntegerSolution) -> IntegerSolution:
+        """
+        Reset random variables of the solution, one at a time, until it is new (or the attempts run out, if nearly all the
+        search space has been evaluated).
+        """
+        self.forced += 1
+        for _ in range(self.max_attempts * len(solution.variables)):
+            if self.is_novel(solution.variables):
+                break
+            i = random.randrange(len(solution.variables))
+            solution.variables[i] = random.randint(solution.lower_bound[i], solution.upper_bound[i])
+        return solution
@@ -0,0 +1 @@
+from .llvm_multi_objective_problem import LlvmMultiObjectiveProblem
\ No newline at end of file
@@ -0,0 +1,149 @@
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from jmetal.core.problem import IntegerProblem
+from jmetal.core.solution import IntegerSolution
+
+from custom.jmetal.fitness_function import FitnessFunction
+from custom.jmetal.fitness_function.godot_multi_objective_fitness_function import OBJECTIVES
+
+"""
+.. module:: llvm_multi_objective_problem
+   :platform: Unix, Windows
+   :synopsis: LLVM runtime, compile time and binary size optimization problem.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+OBJECTIVE_LABELS = {'runtime': 'Runtime', 'compile_time': 'Compile time', 'binary_size': 'Binary size'}
+
+
+class LlvmMultiObjectiveProblem(IntegerProblem):
+    """
+    Multi-objective variant of LlvmRuntimeProblem: the runtime plus the compile time and/or the binary size, all minimized,
+    for NSGA-II and the other multi-objective algorithms of jMetal. The fitness function returns {objective: value} for every
+    objective (GodotMultiObjectiveFitnessFunction) and the problem keeps the chosen ones, in the given order.
+
+    The fitness archive keeps every objective returned by the fitness function ({"[1, 2, ...]": {"runtime": ...,
+    "compile_time": ..., "binary_size": ...}}), so it can be reused with other objectives. Archives of LlvmRuntimeProblem
+    (a single value per solution) are read as the runtime: their solutions are evaluated again only if other objectives are needed.
+    Such an archive is never written: the archive of the execution (with the solutions read from it) is saved to a new file.
+
+    The solutions can be evaluated in worker processes (ArchivingMultiprocessEvaluator): the evaluator only sends them the
+    solutions of a batch that are not archived (archived_objectives), once each; the workers do not write the archive,
+    they leave the new evaluations in the attributes of the solutions and the evaluator merges them into the archive of the
+    main process (merge_evaluations), which the workers receive with the next batch.
+
+    :param int n_passes_in_solution: Number of passes that represents any solution.
+    :param FitnessFunction fitness_function: Fitness function that returns every objective of a solution.
+    :param str fitness_archive_file: Path to the file containing the objectives (or runtimes) of already evaluated solutions. None to skip this feature.
+    :param str timestamp: Timestamp of the current execution for fitness archive output file.
+    :param list objectives: Objectives to minimize, among 'runtime', 'compile_time' and 'binary_size'.
+    """
+    def __init__(self,
+                 n_passes_in_solution: int,
+                 fitness_function: FitnessFunction,
+                 fitness_archive_file: str,
+                 timestamp: str,
+                 objectives: List[str] = ('runtime', 'compile_time')):
+        super(LlvmMultiObjectiveProblem, self).__init__()
+        unknown = [objective for objective in objectives if objective not in OBJECTIVES]
+        if unknown or len(set(objectives)) != len(objectives) or len(objectives) < 2:
+            raise ValueError(f'Expected at least two different objectives among {OBJECTIVES}, got {list(objectives)}')
+        self.lower_bound = n_passes_in_solution * [0]
+        self.upper_bound = n_passes_in_solution * [len(fitness_function.pass_registry) - 1]
+        self.objectives = list(objectives)
+        self.obj_directions = [self.MINIMIZE] * len(self.objectives)
+        self.obj_labels = [OBJECTIVE_LABELS[objective] for objective in self.objectives]
+
+        self.fitness_function = fitness_function
+        self.real_evaluations = 0
+        self.archive_hits = 0
+        self.process_id = os.getpid()
+
+        self.fitness_archive = dict()
+        self.fitness_archive_file = './data/fitness/fitness-' + timestamp + '.json'
+        if fitness_archive_file:
+            with open(fitness_archive_file, 'r') as f:
+                archive = json.load(f)
+            self.fitness_archive = {key: value if isinstance(value, dict) else {'runtime': value}
+                                    for key, value in archive.items()}
+            # A single-objective archive is only read: rewriting it in this format would break LlvmRuntimeProblem
+            if all(isinstance(value, dict) for value in archive.values()):
+                self.fitness_archive_file = fitness_archive_file
+        if self.fitness_archive_file != fitness_archive_file:
+            Path(os.path.dirname(self.fitness_archive_file)).mkdir(parents=True, exist_ok=True)
+
+    def number_of_variables(self) -> int:
+        return super().number_of_variables()    # (Should be) equal to n_passes_in_solution
+
+    def create_solution(self) -> IntegerSolution:
+        return super().create_solution()    # (Should) create a random solution
+
+    def number_of_objectives(self) -> int:
+        return len(self.obj_directions)
+
+    def number_of_constraints(self) -> int:
+        return 0
+
+    def _save_archive(self) -> None:
+        with self.fitness_function.tracer.span('archive write'):
+            with open(self.fitness_archive_file, 'w') as f:
+                json.dump(self.fitness_archive, f, indent=2)
+
+    def archived_objectives(self, solution: IntegerSolution) -> Optional[List[float]]:
+        """
+        Objectives of the solution in the fitness archive, or None if it has to be evaluated.
+        """
+        values = self.fitness_archive.get(str(solution.variables))
+        if values is None or any(objective not in values for objective in self.objectives):
+            return None
+        return [values[objective] for objective in self.objectives]
+
+    def evaluate(self, solution: IntegerSolution) -> IntegerSolution:
+        # Avoid re-evaluating solutions
+        tracer = self.fitness_function.tracer
+        passes_indexes_str = str(solution.variables)
+        with tracer.span('archive lookup', passes_indexes_str):
+            objectives = self.archived_objectives(solution)
+        if objectives is None:
+            tool_cpu_seconds = self.fitness_function.tool_cpu_seconds
+            with tracer.span('evaluation', passes_indexes_str):
+                values = self.fitness_function.calculate(solution.variables)
+            if os.getpid() == self.process_id:
+                self.real_evaluations += 1
+                self.fitness_archive[passes_indexes_str] = values
+                self._save_archive()
+            else:
+                # In a worker process, for merge_evaluations
+                solution.attributes['evaluation'] = {
+                    'objectives': values,
+                    'tool_cpu_seconds': self.fitness_function.tool_cpu_seconds - tool_cpu_seconds
+                }
+            objectives = [values[objective] for objective in self.objectives]
+        else:
+            self.archive_hits += 1
+        solution.objectives = objectives
+        return solution
+
+    def merge_evaluations(self, solutions: List[IntegerSolution]) -> None:
+        """
+        Archive the solutions evaluated in worker processes and add up their counters (real evaluations and CPU time of the
+        tools), in the main process. The rest of the solutions count as archive hits.
+        """
+        merged = 0
+        for solution in solutions:
+            evaluation = solution.attributes.pop('evaluation', None)
+            if evaluation is None:
+                continue
+            self.fitness_archive[str(solution.variables)] = evaluation['objectives']
+            self.fitness_function.tool_cpu_seconds += evaluation['tool_cpu_seconds']
+            merged += 1
+        self.real_evaluations += merged
+        self.archive_hits += len(solutions) - merged
+        if merged:
+            self._save_archive()
+
+    def name(self) -> str:
+        return 'LLVM Multi-Objective Problem (' + ', '.join(self.obj_labels) + '), with ' + self.fitness_function.name()
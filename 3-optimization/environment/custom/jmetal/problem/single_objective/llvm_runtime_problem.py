@@ -7,17 +7,19 @@
 #   - El nombre del archivo (original: optimizationLLVMproblem.py)
 #   - Refactorizado para quitar todo lo sobrante y hacer que se parezca al problema ZDT1 (el del ejemplo del GitHub)
 #   - Diseñado como un problema base/genérico donde únicamente cambia la evaluación de una solución y el LlvmUtils
+#   - Presupuesto de tiempo de compilación: descarta o penaliza las soluciones cuyo tiempo de opt + clang++ previsto lo supera
+#   - Cuenta las evaluaciones reales (real_evaluations) y las que salen del fitness archive (archive_hits)
 # ###
 
 import json
 import os
 from pathlib import Path
+import sys
 
 from jmetal.core.problem import IntegerProblem
 from jmetal.core.solution import IntegerSolution
 
 from custom.jmetal.fitness_function import FitnessFunction
-from custom.jmetal.util import LlvmUtils
 
 """
 .. module:: llvm_runtime_problem
@@ -34,20 +36,36 @@ class LlvmRuntimeProblem(IntegerProblem):
     :param FitnessFunction fitness_function: Fitness function to evaluate the solutions.
     :param str fitness_archive_file: Path to the file containing fitness values of already evaluated solutions. None to skip this feature.
     :param str timestamp: Timestamp of the current execution for fitness archive output file.
+    :param float compile_time_budget: Seconds of opt + clang++ that a solution may take, as predicted by the fitness function
+        (predict_compile_time) before evaluating it. None to evaluate every solution.
+    :param str budget_policy: What to do with the solutions predicted over the budget: 'reject' them without evaluating
+        (sys.float_info.max, not archived) or 'penalize' them (they are evaluated and their fitness value is worsened in
+        proportion to the predicted excess, so that the search moves away from them).
     """
+    BUDGET_POLICIES = ('reject', 'penalize')
+
     def __init__(self, 
                  n_passes_in_solution: int,
                  fitness_function: FitnessFunction,
                  fitness_archive_file: str,
                  timestamp: str,
-                 llvm_utils = 0): # !!! TODO O QUIZÁ PONERLO MEJOR EN EL FITNESS FUNCTION? esto se podría convertir en "GenericMinimizationProblem" o algo así, y que lo interesante sea que incluya el diccionario de soluciones ya evaluadas
+                 llvm_utils = 0,
+                 compile_time_budget: float = None,
+                 budget_policy: str = 'reject'): # !!! TODO O QUIZÁ PONERLO MEJOR EN EL FITNESS FUNCTION? esto se podría convertir en "GenericMinimizationProblem" o algo así, y que lo interesante sea que incluya el diccionario de soluciones ya evaluadas
         super(LlvmRuntimeProblem, self).__init__()
         self.lower_bound = n_passes_in_solution * [0]
-        self.upper_bound = n_passes_in_solution * [len(LlvmUtils.get_passes()) - 1]
+        self.upper_bound = n_passes_in_solution * [len(fitness_function.pass_registry) - 1]
         self.obj_directions = [self.MINIMIZE]
         self.obj_labels = ["Runtime"]
 
         self.fitness_function = fitness_function
+        if budget_policy not in self.BUDGET_POLICIES:
+            raise ValueError(f'Unknown budget policy {budget_policy!r}, expected one of {self.BUDGET_POLICIES}')
+        self.compile_time_budget = compile_time_budget
+        self.budget_policy = budget_policy
+        self.rejected_evaluations = 0
+        self.real_evaluations = 0
+        self.archive_hits = 0
 
         if fitness_archive_file:
             with open(fitness_archive_file, 'r') as f:
@@ -70,15 +88,39 @@ class LlvmRuntimeProblem(IntegerProblem):
     def number_of_constraints(self) -> int:
         return 0
 
+    def _budget_excess(self, solution: IntegerSolution) -> float | None:
+        # Relative excess of the predicted compile time over the budget (None if within the budget or unknown)
+        if self.compile_time_budget is None:
+            return None
+        predicted = self.fitness_function.predict_compile_time(solution.variables)
+        if predicted is None or predicted <= self.compile_time_budget:
+            return None
+        solution.attributes['predicted_compile_time'] = predicted
+        return predicted / self.compile_time_budget - 1
+
     def evaluate(self, solution: IntegerSolution) -> IntegerSolution:
         # Avoid re-evaluating solutions
+        tracer = self.fitness_function.tracer
         passes_indexes_str = str(solution.variables)
-        fitness_value = self.fitness_archive.get(passes_indexes_str)
+        with tracer.span('archive lookup', passes_indexes_str):
+            fitness_value = self.fitness_archive.get(passes_indexes_str)
+        excess = self._budget_excess(solution)
+        if not fitness_value and excess is not None and self.budget_policy == 'reject':
+            self.rejected_evaluations += 1
+            solution.objectives[0] = sys.float_info.max
+            return solution
         if not fitness_value:
-            fitness_value = self.fitness_function.calculate(solution.variables)
-            self.fitness_archive.update({passes_indexes_str: fitness_value})
-            with open(self.fitness_archive_file, 'w') as f:
-                json.dump(self.fitness_archive, f, indent=2)
+            self.real_evaluations += 1
+            with tracer.span('evaluation', passes_indexes_str):
+                fitness_value = self.fitness_function.calculate(solution.variables)
+            with tracer.span('archive write', passes_indexes_str):
+                self.fitness_archive.update({passes_indexes_str: fitness_value})
+                with open(self.fitness_archive_file, 'w') as f:
+                    json.dump(self.fitness_archive, f, indent=2)
+        else:
+            self.archive_hits += 1
+        if excess is not None and self.budget_policy == 'penalize' and fitness_value != sys.float_info.max:
+            fitness_value += max(abs(fitness_value), 1.0) * excess
         solution.objectives[0] = fitness_value
         return solution
 
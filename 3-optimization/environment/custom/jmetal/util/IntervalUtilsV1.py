@@ -5,11 +5,17 @@
 # DESTINO: TFM Godot
 # MODIFICACIONES:
 #   - Adaptado el import de IntervalValue
+#   - Bootstrap vectorizado (una matriz de índices para todas las réplicas), con lotes de muestras
+#     (make_intervals), método BCa además del de percentiles y generador aleatorio configurable
+#   - make_intervals devuelve un IntervalArray
 # ###
 
+from typing import Union
+
 import numpy as np
+from scipy.special import ndtr, ndtri
 
-from custom.jmetal.util.IntervalValueV1 import IntervalValue
+from custom.jmetal.util.IntervalValueV1 import IntervalArray, IntervalValue
 
 class IntervalUtils:
     """
@@ -20,12 +26,22 @@ class IntervalUtils:
     Methods
     -------
     @staticmethod
-    make_interval(runtimes: np.ndarray, n_iterations: int = 500, significance_level: int = 5)
+    make_interval(runtimes: np.ndarray, n_iterations: int = 500, significance_level: int = 5, method: str = "percentile", rng = None)
         Build a IntervalValue object using the bootstrap replication method.
+    @staticmethod
+    make_intervals(samples: np.ndarray, n_iterations: int = 500, significance_level: int = 5, method: str = "percentile", rng = None)
+        Build an IntervalArray with one interval per row of a batch of samples.
     """
 
+    METHODS = ("percentile", "bca")
+
+    # Rows resampled at once, to bound the size of the (rows, n_iterations, n) index matrix
+    _MAX_CHUNK_ELEMENTS = 1 << 24
+
     @staticmethod
-    def make_interval(runtimes: np.ndarray, n_iterations: int = 500, significance_level: int = 5) -> IntervalValue:
+    def make_interval(runtimes: np.ndarray, n_iterations: int = 500, significance_level: int = 5,
+                      method: str = "percentile",
+                      rng: Union[np.random.Generator, int, None] = None) -> IntervalValue:
         """
 
         Parameters
@@ -36,6 +52,10 @@ class IntervalUtils:
             Number of bootstrap replications (Default value is 500).
         significance_level: int, optional.
             Significance level for the confidence interval (Default is 5%).
+        method: str, optional.
+            "percentile" (Default) or "bca" (bias-corrected and accelerated).
+        rng: numpy.random.Generator or int, optional.
+            Random generator or seed (Default is a fresh, unseeded generator).
 
         Returns
         -------
@@ -43,12 +63,99 @@ class IntervalUtils:
             IntervalValue object constructed.
 
         """
+        sample = np.asarray(runtimes, dtype=float).reshape(1, -1)
+        return IntervalUtils.make_intervals(sample, n_iterations, significance_level, method, rng)[0]
+
+    @staticmethod
+    def make_intervals(samples: np.ndarray, n_iterations: int = 500, significance_level: int = 5,
+                       method: str = "percentile",
+                       rng: Union[np.random.Generator, int, None] = None) -> IntervalArray:
+        """
+
+        Parameters
+        ----------
+        samples : numpy.ndarray
+            2D array with one data sample per row (all of them with the same size).
+        n_iterations : int, optional
+            Number of bootstrap replications per row (Default value is 500).
+        significance_level: int, optional.
+            Significance level for the confidence intervals (Default is 5%).
+        method: str, optional.
+            "percentile" (Default) or "bca" (bias-corrected and accelerated).
+        rng: numpy.random.Generator or int, optional.
+            Random generator or seed (Default is a fresh, unseeded generator).
+
+        Returns
+        -------
+        IntervalArray
+            One interval per row of samples.
+
+        """
+        lower, upper = IntervalUtils.bootstrap_bounds(samples, n_iterations, significance_level, method, rng)
+        return IntervalArray(lower, upper)
 
-        stats = np.empty(n_iterations)
-        for i in range(n_iterations):
-            bs_sample = np.random.choice(runtimes,size=len(runtimes))
-            stats[i] = np.mean(bs_sample)
+    @staticmethod
+    def bootstrap_bounds(samples: np.ndarray, n_iterations: int = 500, significance_level: int = 5,
+                         method: str = "percentile",
+                         rng: Union[np.random.Generator, int, None] = None) -> tuple:
+        """
 
-        conf_inv = np.percentile(stats,[float(significance_level)/2,100 - float(significance_level)/2])
+        Parameters
+        ----------
+        Same as make_intervals.
 
-        return IntervalValue(conf_inv[0],conf_inv[1])
+        Returns
+        -------
+        tuple of numpy.ndarray
+            Lower and upper bounds of the confidence interval of the mean of each row.
+
+        """
+        if method not in IntervalUtils.METHODS:
+            raise ValueError(f"Unknown bootstrap method '{method}', expected one of {IntervalUtils.METHODS}")
+        samples = np.asarray(samples, dtype=float)
+        if samples.ndim == 1:
+            samples = samples.reshape(1, -1)
+        rng = np.random.default_rng(rng)
+        rows, n = samples.shape
+
+        # Bootstrap means: every replication of every row drawn from a single index matrix
+        stats = np.empty((rows, n_iterations))
+        chunk = max(1, IntervalUtils._MAX_CHUNK_ELEMENTS // max(1, n_iterations * n))
+        for start in range(0, rows, chunk):
+            block = samples[start:start + chunk]
+            idx = rng.integers(0, n, size=(len(block), n_iterations, n))
+            stats[start:start + chunk] = np.take_along_axis(block[:, None, :], idx, axis=2).mean(axis=2)
+        stats.sort(axis=1)
+
+        alpha = float(significance_level) / 100
+        quantiles = np.tile([alpha / 2, 1 - alpha / 2], (rows, 1))
+        if method == "bca":
+            quantiles = IntervalUtils._bca_quantiles(samples, stats, quantiles)
+
+        # Linear interpolation between order statistics, as numpy.percentile does
+        position = quantiles * (n_iterations - 1)
+        below = np.floor(position).astype(int)
+        above = np.minimum(below + 1, n_iterations - 1)
+        fraction = position - below
+        row = np.arange(rows)[:, None]
+        bounds = stats[row, below] + (stats[row, above] - stats[row, below]) * fraction
+        return bounds[:, 0], bounds[:, 1]
+
+    @staticmethod
+    def _bca_quantiles(samples: np.ndarray, sorted_stats: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+        # Bias correction from the share of replications below the observed mean, acceleration from the
+        # jackknife (leave-one-out means have the closed form (sum - x_i) / (n - 1))
+        rows, n = samples.shape
+        n_iterations = sorted_stats.shape[1]
+        theta = samples.mean(axis=1)
+        below = (sorted_stats < theta[:, None]).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z0 = ndtri(below / n_iterations)
+            jackknife = (samples.sum(axis=1, keepdims=True) - samples) / (n - 1)
+            deviation = jackknife.mean(axis=1, keepdims=True) - jackknife
+            acceleration = (deviation ** 3).sum(axis=1) / (6 * ((deviation ** 2).sum(axis=1)) ** 1.5)
+            z = ndtri(quantiles)
+            shifted = z0[:, None] + z
+            adjusted = ndtr(z0[:, None] + shifted / (1 - acceleration[:, None] * shifted))
+        # Degenerate samples (constant or a single value) fall back to the percentile method
+        return np.where(np.isfinite(adjusted), adjusted, quantiles)
@@ -4,9 +4,14 @@
 # ORIGEN: Alberto, 2025-06-26
 # DESTINO: TFM Godot
 # MODIFICACIONES:
-#   - Ninguna
+#   - __slots__ en IntervalValue y comparaciones sin recalcular el centro y la anchura
+#   - Añadida IntervalArray, poblaciones de intervalos respaldadas por arrays de NumPy
 # ###
 
+from typing import Iterable, Union
+
+import numpy as np
+
 class IntervalValue:
     """
     A class used to represent an range of values
@@ -29,6 +34,8 @@ class IntervalValue:
 
     """
 
+    __slots__ = ("lower_bound", "upper_bound")
+
     # Default constructor
     def __init__(self, a: float = 0, b: float = 1):
         """
@@ -77,8 +84,9 @@ class IntervalValue:
 
     # Minimization order relationship (Art 8)
     def __le__(self, o) -> bool:
-        if o.center() != self.center():
-            return self.center() < o.center()
+        center, other_center = self.center(), o.center()
+        if other_center != center:
+            return center < other_center
         else:
             return self.width() <= o.width()
 
@@ -96,3 +104,120 @@ class IntervalValue:
     # - operator overload
     def __sub__(self,o) -> float:
         return self.center() - o.center()
+
+
+class IntervalArray:
+    """
+    A class used to represent a population of intervals as two NumPy columns
+
+    ...
+
+    Attributes
+    ----------
+    lower : numpy.ndarray
+        Lower bounds of the intervals.
+    upper : numpy.ndarray
+        Upper bounds of the intervals.
+
+    Methods
+    -------
+    center() -> numpy.ndarray
+        Return the centers of the intervals.
+    width() -> numpy.ndarray
+        Return the widths of the intervals.
+    argsort() -> numpy.ndarray
+        Indexes that sort the intervals with the IntervalValue order (center, then width).
+    argmin() -> int
+        Index of the best interval with the IntervalValue order.
+    less_equal() / less_than() -> numpy.ndarray
+        Pairwise matrices of the IntervalValue order (element [i, j] is self[i] <= self[j]).
+    dominates() -> numpy.ndarray
+        Pairwise matrix where element [i, j] is True if interval i lies entirely below interval j.
+
+    """
+
+    __slots__ = ("lower", "upper")
+
+    def __init__(self, lower: Iterable[float] = (), upper: Iterable[float] = ()):
+        """
+
+        Parameters
+        ----------
+        lower : iterable of float
+            Lower bounds of the intervals.
+        upper : iterable of float
+            Upper bounds of the intervals.
+
+        """
+        self.lower = np.asarray(lower, dtype=float).reshape(-1)
+        self.upper = np.asarray(upper, dtype=float).reshape(-1)
+        if self.lower.shape != self.upper.shape:
+            raise ValueError(f"Bounds with different sizes: {self.lower.shape} and {self.upper.shape}")
+
+    @classmethod
+    def from_values(cls, values: Iterable[IntervalValue]) -> "IntervalArray":
+        """
+
+        Parameters
+        ----------
+        values : iterable of IntervalValue
+            Intervals to pack.
+
+        Returns
+        ----------
+        IntervalArray
+            Array with the same intervals.
+
+        """
+        values = list(values)
+        return cls([v.lower_bound for v in values], [v.upper_bound for v in values])
+
+    # Interval centers
+    def center(self) -> np.ndarray:
+        return (self.upper + self.lower) / 2
+
+    # Interval widths
+    def width(self) -> np.ndarray:
+        return np.abs(self.upper - self.lower)
+
+    # Same order as sorted() over IntervalValue objects (stable for ties)
+    def argsort(self) -> np.ndarray:
+        return np.lexsort((self.width(), self.center()))
+
+    # Best interval for minimization (first one in case of ties)
+    def argmin(self) -> int:
+        if len(self) == 0:
+            raise ValueError("argmin of an empty IntervalArray")
+        return int(self.argsort()[0])
+
+    # Pairwise IntervalValue.__le__
+    def less_equal(self) -> np.ndarray:
+        center, width = self.center(), self.width()
+        same_center = center[:, None] == center[None, :]
+        return np.where(same_center, width[:, None] <= width[None, :], center[:, None] < center[None, :])
+
+    # Pairwise IntervalValue.__lt__
+    def less_than(self) -> np.ndarray:
+        equal = (self.lower[:, None] == self.lower[None, :]) & (self.upper[:, None] == self.upper[None, :])
+        return self.less_equal() & ~equal
+
+    # Pairwise dominance: interval i is better than interval j whatever the real values are
+    def dominates(self) -> np.ndarray:
+        return self.upper[:, None] < self.lower[None, :]
+
+    def to_values(self) -> list:
+        return [IntervalValue(a, b) for a, b in zip(self.lower.tolist(), self.upper.tolist())]
+
+    def __len__(self) -> int:
+        return len(self.lower)
+
+    def __iter__(self):
+        return iter(self.to_values())
+
+    def __getitem__(self, index) -> Union[IntervalValue, "IntervalArray"]:
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            return IntervalValue(float(self.lower[index]), float(self.upper[index]))
+        return IntervalArray(self.lower[index], self.upper[index])
+
+    def __str__(self):
+        return "".join(str(value) for value in self)
@@ -6,6 +6,12 @@
 # MODIFICACIONES:
 #   - Adaptados los import de IntervalUtils e IntervalValue
 #   - He dejado all_passes como los passes únicos que aplica -O1, por simplificar
+#   - Las listas de passes (-O1 y la completa que estaba comentada) viven ahora en PassRegistry, y encode/decode
+#     usan sus búsquedas O(1)
+#   - mergeDict fusiona en bloque con FitnessArchive; encode y decode traducen los passes con PassRegistry y copian el
+#     valor tal cual (sin pasarlo por float)
+#   - Si allinone falla, toIR biseca la secuencia (bisect) en vez de lanzar un opt por pass (onebyone), descarta
+#     solo los passes que fallan y guarda estadísticas de fallos (get_failure_stats)
 # ###
 
 # v4 version
@@ -17,12 +23,15 @@ import subprocess
 import time
 import random
 from shutil import copy as copyfile
+from shutil import rmtree
 import sys
 import numpy as np
 from typing import Union
 
 from custom.jmetal.util.IntervalUtilsV1 import IntervalUtils
 from custom.jmetal.util.IntervalValueV1 import IntervalValue
+from custom.jmetal.util.fitness_archive import FitnessArchive
+from custom.jmetal.util.pass_registry import PassRegistry
 
 class LlvmUtils():
     '''
@@ -48,6 +57,8 @@ class LlvmUtils():
         self.worstruns = worstruns
         self.jobid = jobid
         self.onebyones = 0
+        self.failure_stats = {'fallbacks': 0, 'opt_invocations': 0, 'sequences_with_drops': 0, 'dropped_passes': dict()}
+        self.last_dropped = []
         self.useperf = useperf
         self.useinterval = useinterval
         self.n_iterations = n_iterations
@@ -59,71 +70,10 @@ class LlvmUtils():
         else:
             self.usenuma = ""
 
+    # Passes applied by -O1 (PassRegistry.get('legacy-all') has the full legacy list)
     @staticmethod
     def get_passes() -> list:
-        all_passes = [
-            '',
-            '-aa', '-adce', '-alignment-from-assumptions', '-always-inline',
-            '-annotation-remarks', '-annotation2metadata', '-basic-aa', '-bdce',
-            '-block-freq', '-branch-prob', '-called-value-propagation',
-            '-deadargelim', '-demanded-bits', '-div-rem-pairs', '-domtree',
-            '-early-cse', '-early-cse-memssa', '-float2int', '-forceattrs',
-            '-function-attrs', '-globaldce', '-globalopt', '-globals-aa',
-            '-indvars', '-inferattrs', '-inject-tli-mappings', '-instcombine',
-            '-instsimplify', '-ipsccp', '-lcssa', '-libcalls-shrinkwrap', '-licm',
-            '-loop-deletion', '-loop-distribute', '-loop-idiom',
-            '-loop-instsimplify', '-loop-load-elim', '-loop-rotate',
-            '-loop-simplify', '-loop-simplifycfg', '-loop-sink', '-loop-unroll',
-            '-loop-vectorize', '-loops', '-lower-constant-intrinsics',
-            '-lower-expect', '-mem2reg', '-memcpyopt', '-memoryssa',
-            '-postdomtree', '-reassociate', '-rpo-function-attrs',
-            '-scalar-evolution', '-sccp', '-scoped-noalias-aa',
-            '-simple-loop-unswitch', '-simplifycfg', '-sroa',
-            '-strip-dead-prototypes', '-targetlibinfo', '-tbaa',
-            '-transform-warning', '-vector-combine', '-verify'
-        ]
-
-        return all_passes
-
-    """
-    @staticmethod
-    def get_passes() -> list:
-        all_passes = ['-aa','-atomic-expand','-basic-aa','-block-freq','-branch-prob','-cfl-anders-aa','-cfl-steens-aa',
-                      '-codegenprepare','-cost-model','-cycles','-da','-demanded-bits','-divergence','-domfrontier','-domtree',
-                      '-dwarfehprepare','-early-cse-memssa','-expand-reductions','-expandmemcmp','-expandvp',
-                      '-global-merge','-globals-aa','-hardware-loops','-hexagon-loop-idiom','-hexagon-vc','-hexagon-vlcr',
-                      '-indirectbr-expand','-interleaved-access','-interleaved-load-combine','-iv-users','-jmc-instrument',
-                      '-lazy-value-info','-loop-extract-single','-loops','-lower-amx-intrinsics','-lower-amx-type',
-                      '-lower-matrix-intrinsics-minimal','-memdep','-memoryssa','-mve-tail-predication','-objc-arc-aa',
-                      '-phi-values', '-postdomtree','-pre-amx-config', '-pre-isel-intrinsic-lowering','-regions','-replace-with-veclib', '-safe-stack',
-                      '-scalar-evolution','-scev-aa','-scoped-noalias-aa','-select-optimize','-si-annotate-control-flow','-sjljehprepare',
-                      '-stack-safety','-stack-safety-local','-systemz-tdc','-targetlibinfo','-tbaa','-type-promotion','-unreachableblockelim',
-                      '-verify-safepoint-ir','-wasm-add-missing-prototypes','-wasm-fix-function-bitcasts','-wasm-lower-em-ehsjlj',
-                      '-wasm-mclower-prepass','-wasm-optimize-returned','-wasmehprepare','-winehprepare', '-adce', '-add-discriminators', '-aggressive-instcombine', '-alignment-from-assumptions', 
-                      '-always-inline', '-annotation-remarks', '-annotation2metadata', '-assume-builder', '-assume-simplify',
-                      '-bdce', '-bounds-checking', '-break-crit-edges', '-called-value-propagation',
-                      '-callsite-splitting', '-canon-freeze','-consthoist', '-constmerge', '-constraint-elimination',
-                      '-correlated-propagation', '-cross-dso-cfi', '-dce', '-deadargelim', '-dfa-jump-threading', '-div-rem-pairs',
-                      '-dse', '-early-cse', '-elim-avail-extern', '-extract-blocks', '-fix-irreducible', '-flattencfg', '-float2int', 
-                      '-forceattrs', '-function-attrs', '-function-specialization', '-globaldce', '-globalopt', '-globalsplit', '-guard-widening',
-                      '-gvn', '-gvn-hoist', '-gvn-sink', '-hotcoldsplit', '-indvars', '-infer-address-spaces', '-inferattrs', '-inject-tli-mappings',
-                      '-inline', '-instcombine', '-instcount', '-instnamer', '-instsimplify', '-ipsccp', '-irce', '-iroutliner',
-                      '-jump-threading', '-lcssa', '-libcalls-shrinkwrap', '-load-store-vectorizer', '-loop-data-prefetch', 
-                      '-loop-deletion', '-loop-distribute', '-loop-extract', '-loop-flatten', '-loop-fusion', '-loop-idiom', '-loop-instsimplify', 
-                      '-loop-interchange', '-loop-load-elim', '-loop-predication', '-loop-reduce', '-loop-reroll', '-loop-rotate', '-loop-simplify', 
-                      '-loop-simplifycfg', '-loop-sink', '-loop-unroll', '-loop-unroll-and-jam', '-loop-vectorize', '-loop-versioning', 
-                      '-lower-constant-intrinsics', '-lower-expect', '-lower-global-dtors', '-lower-guard-intrinsic',
-                      '-lower-matrix-intrinsics', '-lower-widenable-condition', '-loweratomic', '-lowerinvoke', '-lowerswitch', '-make-guards-explicit',
-                      '-mem2reg', '-memcpyopt', '-mergefunc', '-mergeicmps', '-mergereturn', '-mldst-motion', 
-                      '-nary-reassociate', '-newgvn', '-objc-arc', '-objc-arc-apelim', '-objc-arc-contract', '-objc-arc-expand',
-                      '-partial-inliner', '-partially-inline-libcalls', '-reassociate', '-redundant-dbg-inst-elim', '-reg2mem', '-rewrite-statepoints-for-gc', '-rewrite-symbols', 
-                      '-rpo-function-attrs', '-scalarize-masked-mem-intrin', '-scalarizer', '-sccp', '-separate-const-offset-from-gep',
-                      '-simple-loop-unswitch', '-simplifycfg', '-sink', '-slsr', '-speculative-execution', 
-                      '-sroa', '-strip', '-strip-dead-debug-info', '-strip-dead-prototypes', '-strip-debug-declare', 
-                      '-strip-gc-relocates', '-strip-nondebug', '-strip-nonlinetable-debuginfo', '-structurizecfg', 
-                      '-tailcallelim', '-tlshoist', '-transform-warning', '-unify-loop-exits', '-vector-combine', '-verify',""]
-        return all_passes
-    """
+        return list(PassRegistry.get('legacy-o1').names)
 
     # To convert the original benchmark into LLVM IR
     def benchmark_link(self) -> None:
@@ -253,7 +203,7 @@ class LlvmUtils():
         result = self.allinone(passes)
         if not result:
             copyfile("{}{}".format(self.basepath,self.source),"{}optimized_{}.bc".format(self.basepath,self.jobid))
-            result = self.onebyone(passes)
+            result = self.bisect(passes)
         return result
 
     # To transform from LLVM IR to assembly code
@@ -307,17 +257,100 @@ class LlvmUtils():
                 result = False
         return result
 
-    # To get the number of time onebyone is run
+    # To apply a sequence of passes from src to dst (different files, so a failing opt never clobbers its input)
+    def _run_opt(self, passes: str, src: str, dst: str, timeout: int) -> bool:
+        self.failure_stats['opt_invocations'] += 1
+        cmd = subprocess.Popen("timeout {} {}opt-15 {} {} -o {}".format(
+                                timeout,self.llvmpath,passes,src,dst),shell=True, stderr = subprocess.PIPE)
+        try:
+            cmd.communicate(timeout=timeout)
+            return cmd.returncode == 0 and os.path.exists(dst)
+        except subprocess.TimeoutExpired as e:
+            cmd.kill()
+            cmd.communicate()
+            print('Error {}'.format(e),file=sys.stderr)
+            print('Sentence: {}'.format(passes),file=sys.stderr)
+            return False
+
+    # To apply transformations bisecting the sequence (fallback of allinone). Halves that work are applied once and
+    # their output bitcode is the input of what follows; only failing halves are split again, so k offending passes
+    # are isolated and dropped with O(k log n) opt runs instead of one run per pass. Returns False if any pass was
+    # dropped, like onebyone
+    def bisect(self, passes: str = '-O3') -> bool:
+        passeslist = [llvm_pass for llvm_pass in passes.split(' ') if llvm_pass]
+        self.onebyones += 1
+        self.failure_stats['fallbacks'] += 1
+        workdir = "{}bisect_{}/".format(self.basepath,self.jobid)
+        rmtree(workdir, ignore_errors=True)
+        os.makedirs(workdir)
+        self._bisect_steps = 0
+        start = "{}step_0.bc".format(workdir)
+        copyfile("{}{}".format(self.basepath,self.source),start)
+
+        dropped = []
+        final = self._bisect(passeslist, start, workdir, dropped, known_failure=True)
+        copyfile(final,"{}optimized_{}.bc".format(self.basepath,self.jobid))
+        rmtree(workdir, ignore_errors=True)
+
+        self.last_dropped = dropped
+        for llvm_pass in dropped:
+            self.failure_stats['dropped_passes'][llvm_pass] = self.failure_stats['dropped_passes'].get(llvm_pass, 0) + 1
+        if dropped:
+            self.failure_stats['sequences_with_drops'] += 1
+            print('Dropped passes: {}'.format(' '.join(dropped)),file=sys.stderr)
+        return not dropped
+
+    def _bisect(self, passeslist: list, src: str, workdir: str, dropped: list, known_failure: bool = False) -> str:
+        if not passeslist:
+            return src
+        if not known_failure:
+            self._bisect_steps += 1
+            dst = "{}step_{}.bc".format(workdir,self._bisect_steps)
+            if self._run_opt(' '.join(passeslist), src, dst, timeout=min(20, 5 * len(passeslist))):
+                os.remove(src)
+                return dst
+        if len(passeslist) == 1:
+            dropped.append(passeslist[0])
+            return src
+        middle = len(passeslist) // 2
+        src = self._bisect(passeslist[:middle], src, workdir, dropped)
+        return self._bisect(passeslist[middle:], src, workdir, dropped)
+
+    # To get the number of time the fallback (onebyone or bisect) is run
     def get_onebyone(self):
         return self.onebyones
 
-    # To add a file to the output file
+    # To get the fallback statistics: fallbacks run, opt invocations, sequences with dropped passes and how many
+    # times each pass was dropped
+    def get_failure_stats(self) -> dict:
+        stats = dict(self.failure_stats)
+        stats['dropped_passes'] = dict(self.failure_stats['dropped_passes'])
+        return stats
+
+    # To add a file to the output file (the output file wins for solutions present in both)
     @staticmethod
     def mergeDict(input_: str,output_: str):
-        dic = dict()
-        LlvmUtils.fileToDictionary(input_,dic)
-        LlvmUtils.fileToDictionary(output_,dic)
-        LlvmUtils.dictionaryToFile(output_,dic)
+        try:
+            merged = FitnessArchive.merge([FitnessArchive.from_csv(input_, 'legacy-o1'),
+                                           FitnessArchive.from_csv(output_, 'legacy-o1')], policy='last')
+        except ValueError:
+            # Solutions of different lengths or unknown passes: keep the generic line by line merge
+            dic = dict()
+            LlvmUtils.fileToDictionary(input_,dic)
+            LlvmUtils.fileToDictionary(output_,dic)
+            LlvmUtils.dictionaryToFile(output_,dic)
+            return
+        merged.to_csv(output_, names=LlvmUtils._has_pass_names(output_))
+
+    # Whether a legacy file stores pass names (decoded) instead of indexes (encoded)
+    @staticmethod
+    def _has_pass_names(filename: str) -> bool:
+        # An empty file has neither; the empty pass name ('') only appears in files with names
+        with open(filename,'r') as file:
+            line = file.readline().rstrip('\n')
+        if not line:
+            return False
+        return not all(key.isdigit() for key in line[:line.rfind(',')].split(','))
 
     # File to dictionary
     @staticmethod
@@ -339,32 +372,26 @@ class LlvmUtils():
                     key = '{}'.format(key).replace(", ",",")
                     file.write('{},{}\n'.format(key,values))
 
+    # To translate the passes of every line of a file, keeping the value as it is
+    @staticmethod
+    def _translate(input_: str, output_: str, translate):
+        with open(input_,'r') as inputfile, open(output_,'w') as ouputfile:
+            for line in inputfile:
+                line = line.rstrip('\n')
+                if not line:
+                    continue
+                index = line.rfind(',')
+                keys = line[:index].split(',')
+                value = line[index+1:]
+                ouputfile.write(''.join('{},'.format(translate(key)) for key in keys) + '{}\n'.format(value))
+
     # To encode file from passes to integers
     @staticmethod
     def encode(input_: str, output_: str):
-        with open(input_,'r') as inputfile:
-            lines = inputfile.readlines()
-            with open(output_,'w') as ouputfile:
-                for line in lines:
-                    index = line.rfind(',')
-                    keys = "{}".format(line[:index]).split(",")
-                    value = "{}".format(line[index+1:])[:-1]
-                    newkey = ""
-                    for key in keys:
-                        newkey += '{},'.format(LlvmUtils.get_passes().index(key))
-                    ouputfile.write('{}{}\n'.format(newkey,value))
+        LlvmUtils._translate(input_, output_, PassRegistry.get('legacy-o1').index)
 
     # To decode file from integers to passes
     @staticmethod
     def decode(input_: str,output_: str):
-        with open(input_,'r') as inputfile:
-            lines = inputfile.readlines()
-            with open(output_,'w') as ouputfile:
-                for line in lines:
-                    index = line.rfind(',')
-                    keys = "{}".format(line[:index]).split(",")
-                    value = "{}".format(line[index+1:])[:-1]
-                    newkey = ""
-                    for key in keys:
-                        newkey += '{},'.format(LlvmUtils.get_passes()[int(key)])
-                    ouputfile.write('{}{}\n'.format(newkey,value))
+        registry = PassRegistry.get('legacy-o1')
+        LlvmUtils._translate(input_, output_, lambda key: registry.name(int(key)))
@@ -5,6 +5,11 @@
 # DESTINO: TFM Godot
 # MODIFICACIONES:
 #   - Adaptados los import de IntervalUtils e IntervalValue
+#   - Las listas de passes viven ahora en PassRegistry, y encode/decode usan sus búsquedas O(1)
+#   - mergeDict fusiona en bloque con FitnessArchive; encode y decode traducen los passes con PassRegistry y copian el
+#     valor tal cual (sin pasarlo por float)
+#   - Si allinone falla, toIR biseca la secuencia (bisect) en vez de lanzar un opt por pass (onebyone), descarta
+#     solo los passes que fallan y guarda estadísticas de fallos (get_failure_stats)
 # ###
 
 # v4 version
@@ -16,12 +21,15 @@ import subprocess
 import time
 import random
 from shutil import copy as copyfile
+from shutil import rmtree
 import sys
 import numpy as np
 from typing import Union
 
 from custom.jmetal.util.IntervalUtilsV1 import IntervalUtils
 from custom.jmetal.util.IntervalValueV1 import IntervalValue
+from custom.jmetal.util.fitness_archive import FitnessArchive
+from custom.jmetal.util.pass_registry import PassRegistry
 
 class LlvmUtils():
     '''
@@ -47,6 +55,8 @@ class LlvmUtils():
         self.worstruns = worstruns
         self.jobid = jobid
         self.onebyones = 0
+        self.failure_stats = {'fallbacks': 0, 'opt_invocations': 0, 'sequences_with_drops': 0, 'dropped_passes': dict()}
+        self.last_dropped = []
         self.useperf = useperf
         self.useinterval = useinterval
         self.n_iterations = n_iterations
@@ -60,70 +70,16 @@ class LlvmUtils():
 
     @staticmethod
     def get_passes() -> list:
-        all_passes = ['adce', 'add-discriminators', 'aggressive-instcombine', 'alignment-from-assumptions', 
-                      'always-inline', 'annotation-remarks', 'annotation2metadata', 'assume-builder', 'assume-simplify',
-                       'bdce', 'bounds-checking', 'break-crit-edges', 'called-value-propagation',
-                      'callsite-splitting', 'canon-freeze','consthoist', 'constmerge', 'constraint-elimination',
-                      'correlated-propagation', 'cross-dso-cfi', 'dce', 'deadargelim', 'dfa-jump-threading', 'div-rem-pairs',
-                      'dse', 'early-cse', 'elim-avail-extern', 'extract-blocks', 'fix-irreducible', 'flattencfg', 'float2int', 
-                      'forceattrs', 'function-attrs', 'function-specialization', 'globaldce', 'globalopt', 'globalsplit', 'guard-widening',
-                      'gvn', 'gvn-hoist', 'gvn-sink', 'hotcoldsplit', 'indvars', 'infer-address-spaces', 'inferattrs', 'inject-tli-mappings',
-                      'inline', 'instcombine', 'instcount', 'instnamer', 'instsimplify', 'ipsccp', 'irce', 'iroutliner',
-                      'jump-threading', 'lcssa', 'libcalls-shrinkwrap', 'load-store-vectorizer', 'loop-data-prefetch', 
-                      'loop-deletion', 'loop-distribute', 'loop-extract', 'loop-flatten', 'loop-fusion', 'loop-idiom', 'loop-instsimplify', 
-                      'loop-interchange', 'loop-load-elim', 'loop-predication', 'loop-reduce', 'loop-reroll', 'loop-rotate', 'loop-simplify', 
-                      'loop-simplifycfg', 'loop-sink', 'loop-unroll', 'loop-unroll-and-jam', 'loop-vectorize', 'loop-versioning', 
-                       'lower-constant-intrinsics', 'lower-expect', 'lower-global-dtors', 'lower-guard-intrinsic',
-                      'lower-matrix-intrinsics', 'lower-widenable-condition', 'loweratomic', 'lowerinvoke', 'lowerswitch', 'make-guards-explicit',
-                      'mem2reg', 'memcpyopt', 'mergefunc', 'mergeicmps', 'mergereturn','mldst-motion', 
-                      'nary-reassociate', 'newgvn', 'objc-arc', 'objc-arc-apelim', 'objc-arc-contract', 'objc-arc-expand',
-                      'partial-inliner', 'partially-inline-libcalls', 'reassociate', 'redundant-dbg-inst-elim', 'reg2mem', 'rewrite-statepoints-for-gc', 'rewrite-symbols', 
-                      'rpo-function-attrs', 'scalarize-masked-mem-intrin', 'scalarizer', 'sccp', 'separate-const-offset-from-gep',
-                      'simple-loop-unswitch', 'simplifycfg', 'sink', 'slsr', 'speculative-execution', 
-                      'sroa', 'strip', 'strip-dead-debug-info', 'strip-dead-prototypes', 'strip-debug-declare', 
-                      'strip-gc-relocates', 'strip-nondebug', 'strip-nonlinetable-debuginfo', 'structurizecfg', 
-                      'tailcallelim', 'tlshoist', 'transform-warning', 'unify-loop-exits', 'vector-combine', 'verify', ""]
-        return all_passes
+        return list(PassRegistry.get('newpm').names)
 
     @staticmethod
     def get_function_passes() -> list:
-        function_passes = ['adce', 'add-discriminators', 'aggressive-instcombine', 'alignment-from-assumptions', 
-                           'annotation-remarks', 'assume-builder', 'assume-simplify', 'bdce', 'bounds-checking', 
-                           'break-crit-edges', 'callsite-splitting', 'canon-freeze', 'consthoist', 'constraint-elimination',
-                           'correlated-propagation', 'dce', 'dfa-jump-threading', 'div-rem-pairs', 'dse', 'early-cse', 
-                           'fix-irreducible', 'flattencfg', 'float2int', 'guard-widening', 'gvn', 'gvn-hoist', 'gvn-sink',
-                           'indvars', 'infer-address-spaces', 'inject-tli-mappings', 'instcombine', 'instcount', 'instnamer',
-                           'instsimplify', 'irce', 'jump-threading', 'lcssa', 'libcalls-shrinkwrap', 'licm', 'lint', 'load-store-vectorizer',
-                           'loop-data-prefetch', 'loop-deletion', 'loop-distribute', 'loop-flatten', 'loop-fusion', 'loop-idiom', 
-                           'loop-instsimplify', 'loop-interchange', 'loop-load-elim', 'loop-predication', 'loop-reduce', 'loop-reroll',
-                           'loop-rotate', 'loop-simplify', 'loop-simplifycfg', 'loop-sink', 'loop-unroll', 'loop-unroll-and-jam', 
-                           'loop-vectorize', 'loop-versioning', 'loop-versioning-licm', 'lower-constant-intrinsics', 'lower-expect', 
-                           'lower-guard-intrinsic', 'lower-matrix-intrinsics', 'lower-widenable-condition', 'loweratomic', 'lowerinvoke', 
-                           'lowerswitch', 'make-guards-explicit', 'mem2reg', 'memcpyopt', 'mergeicmps', 'mergereturn', 
-                           'mldst-motion', 'nary-reassociate', 'newgvn', 'objc-arc', 'objc-arc-contract', 'objc-arc-expand', 
-                           'partially-inline-libcalls', 'polly-prepare', 'reassociate', 'redundant-dbg-inst-elim', 'reg2mem', 
-                           'scalarize-masked-mem-intrin', 'scalarizer', 'sccp', 'separate-const-offset-from-gep', 'simple-loop-unswitch', 
-                           'simplifycfg', 'sink', 'slp-vectorizer', 'slsr', 'speculative-execution', 'sroa', 'strip-gc-relocates', 
-                           'structurizecfg', 'tailcallelim', 'tlshoist', 'transform-warning', 'unify-loop-exits', 'vector-combine', 
-                           'verify']
-
-        return function_passes
+        return list(PassRegistry.get('newpm').function_passes)
 
     @staticmethod
     def get_module_passes() -> list:
-        module_passes = ['annotation2metadata', 'attributor', 'called-value-propagation', 'check-debugify',
-                           'constmerge', 'cross-dso-cfi', 'deadargelim', 'debugify', 'elim-avail-extern',
-                           'extract-blocks', 'forceattrs', 'function-specialization', 'globaldce', 'globalopt', 
-                           'globalsplit', 'hotcoldsplit', 'inferattrs', 'internalize', 'ipsccp', 'iroutliner',
-                           'loop-extract', 'lower-global-dtors', 'memprof-module', 'mergefunc', 'metarenamer', 
-                           'objc-arc-apelim', 'partial-inliner', 'polly-codegen', 'polly-dce', 'polly-delicm', 
-                           'polly-export-jscop', 'polly-import-jscop', 'polly-mse', 'polly-opt-isl', 'polly-optree',
-                           'polly-prune-unprofitable', 'polly-simplify', 'rewrite-statepoints-for-gc', 'rewrite-symbols',
-                           'rpo-function-attrs', 'strip', 'strip-dead-debug-info', 'strip-dead-prototypes', 
-                           'strip-debug-declare', 'strip-nondebug', 'strip-nonlinetable-debuginfo']
-
-        return module_passes
-    
+        return list(PassRegistry.get('newpm').module_passes)
+
     # To convert the original benchmark into LLVM IR
     def benchmark_link(self) -> None:
         os.chdir("{}{}/".format(self.basepath,self.benchmark))
@@ -252,7 +208,7 @@ class LlvmUtils():
         result = self.allinone(passes)
         if not result:
             copyfile("{}{}".format(self.basepath,self.source),"{}optimized_{}.bc".format(self.basepath,self.jobid))
-            result = self.onebyone(passes)
+            result = self.bisect(passes)
         return result
 
     # To transform from LLVM IR to assembly code
@@ -305,17 +261,135 @@ class LlvmUtils():
                 result = False
         return result
 
-    # To get the number of time onebyone is run
+    # To apply a sequence of passes from src to dst (different files, so a failing opt never clobbers its input)
+    def _run_opt(self, passes: str, src: str, dst: str, timeout: int) -> bool:
+        self.failure_stats['opt_invocations'] += 1
+        cmd = subprocess.Popen("timeout {} {}opt-15 {} {} -o {}".format(
+                                timeout,self.llvmpath,"-passes=\'{}\'".format(passes),src,dst),shell=True, stderr = subprocess.PIPE)
+        try:
+            cmd.communicate(timeout=timeout)
+            return cmd.returncode == 0 and os.path.exists(dst)
+        except subprocess.TimeoutExpired as e:
+            cmd.kill()
+            cmd.communicate()
+            print('Error {}'.format(e),file=sys.stderr)
+            print('Sentence: {}'.format(passes),file=sys.stderr)
+            return False
+
+    # To apply transformations bisecting the sequence (fallback of allinone). Halves that work are applied once and
+    # their output bitcode is the input of what follows; only failing halves are split again, so k offending passes
+    # are isolated and dropped with O(k log n) opt runs instead of one run per pass. Returns False if any pass was
+    # dropped, like onebyone
+    def bisect(self, passes: str = '-O3') -> bool:
+        passeslist = LlvmUtils._split_pipeline(passes)
+        self.onebyones += 1
+        self.failure_stats['fallbacks'] += 1
+        workdir = "{}bisect_{}/".format(self.basepath,self.jobid)
+        rmtree(workdir, ignore_errors=True)
+        os.makedirs(workdir)
+        self._bisect_steps = 0
+        start = "{}step_0.bc".format(workdir)
+        copyfile("{}{}".format(self.basepath,self.source),start)
+
+        dropped = []
+        final = self._bisect(passeslist, start, workdir, dropped, known_failure=True)
+        copyfile(final,"{}optimized_{}.bc".format(self.basepath,self.jobid))
+        rmtree(workdir, ignore_errors=True)
+
+        self.last_dropped = dropped
+        for llvm_pass in dropped:
+            self.failure_stats['dropped_passes'][llvm_pass] = self.failure_stats['dropped_passes'].get(llvm_pass, 0) + 1
+        if dropped:
+            self.failure_stats['sequences_with_drops'] += 1
+            print('Dropped passes: {}'.format(' '.join(dropped)),file=sys.stderr)
+        return not dropped
+
+    def _bisect(self, passeslist: list, src: str, workdir: str, dropped: list, known_failure: bool = False) -> str:
+        if not passeslist:
+            return src
+        if not known_failure:
+            self._bisect_steps += 1
+            dst = "{}step_{}.bc".format(workdir,self._bisect_steps)
+            if self._run_opt(','.join(passeslist), src, dst, timeout=min(20, 5 * len(passeslist))):
+                os.remove(src)
+                return dst
+        if len(passeslist) == 1:
+            # An adaptor such as function(...) is bisected over its own passes before being dropped
+            expanded = LlvmUtils._expand_adaptor(passeslist[0])
+            if expanded:
+                return self._bisect(expanded, src, workdir, dropped, known_failure=True)
+            dropped.append(passeslist[0])
+            return src
+        middle = len(passeslist) // 2
+        src = self._bisect(passeslist[:middle], src, workdir, dropped)
+        return self._bisect(passeslist[middle:], src, workdir, dropped)
+
+    # To get the number of time the fallback (onebyone or bisect) is run
     def get_onebyone(self):
         return self.onebyones
 
-    # To add a file to the output file
+    # To get the fallback statistics: fallbacks run, opt invocations, sequences with dropped passes and how many
+    # times each pass was dropped
+    def get_failure_stats(self) -> dict:
+        stats = dict(self.failure_stats)
+        stats['dropped_passes'] = dict(self.failure_stats['dropped_passes'])
+        return stats
+
+    # To split a pipeline on its top-level commas (commas inside adaptors such as function(...) are kept)
+    @staticmethod
+    def _split_pipeline(passes: str) -> list:
+        elements = []
+        current = ""
+        depth = 0
+        for char in passes:
+            if char == ',' and depth == 0:
+                elements.append(current)
+                current = ""
+                continue
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            current += char
+        elements.append(current)
+        return [element.strip() for element in elements if element.strip()]
+
+    # To turn adaptor(a,b) into [adaptor(a), adaptor(b)] (also through nested adaptors), or [] for a single pass
+    @staticmethod
+    def _expand_adaptor(element: str) -> list:
+        opening = element.find('(')
+        if opening < 0 or not element.endswith(')'):
+            return []
+        adaptor = element[:opening]
+        inner = LlvmUtils._split_pipeline(element[opening+1:-1])
+        if len(inner) == 1:
+            inner = LlvmUtils._expand_adaptor(inner[0])
+        return ["{}({})".format(adaptor,part) for part in inner]
+
+    # To add a file to the output file (the output file wins for solutions present in both)
     @staticmethod
     def mergeDict(input_: str,output_: str):
-        dic = dict()
-        LlvmUtils.fileToDictionary(input_,dic)
-        LlvmUtils.fileToDictionary(output_,dic)
-        LlvmUtils.dictionaryToFile(output_,dic)
+        try:
+            merged = FitnessArchive.merge([FitnessArchive.from_csv(input_, 'newpm'),
+                                           FitnessArchive.from_csv(output_, 'newpm')], policy='last')
+        except ValueError:
+            # Solutions of different lengths or unknown passes: keep the generic line by line merge
+            dic = dict()
+            LlvmUtils.fileToDictionary(input_,dic)
+            LlvmUtils.fileToDictionary(output_,dic)
+            LlvmUtils.dictionaryToFile(output_,dic)
+            return
+        merged.to_csv(output_, names=LlvmUtils._has_pass_names(output_))
+
+    # Whether a legacy file stores pass names (decoded) instead of indexes (encoded)
+    @staticmethod
+    def _has_pass_names(filename: str) -> bool:
+        # An empty file has neither; the empty pass name ('') only appears in files with names
+        with open(filename,'r') as file:
+            line = file.readline().rstrip('\n')
+        if not line:
+            return False
+        return not all(key.isdigit() for key in line[:line.rfind(',')].split(','))
 
     # File to dictionary
     @staticmethod
@@ -337,32 +411,26 @@ class LlvmUtils():
                     key = '{}'.format(key).replace(", ",",")
                     file.write('{},{}\n'.format(key,values))
 
+    # To translate the passes of every line of a file, keeping the value as it is
+    @staticmethod
+    def _translate(input_: str, output_: str, translate):
+        with open(input_,'r') as inputfile, open(output_,'w') as ouputfile:
+            for line in inputfile:
+                line = line.rstrip('\n')
+                if not line:
+                    continue
+                index = line.rfind(',')
+                keys = line[:index].split(',')
+                value = line[index+1:]
+                ouputfile.write(''.join('{},'.format(translate(key)) for key in keys) + '{}\n'.format(value))
+
     # To encode file from passes to integers
     @staticmethod
     def encode(input_: str, output_: str):
-        with open(input_,'r') as inputfile:
-            lines = inputfile.readlines()
-            with open(output_,'w') as ouputfile:
-                for line in lines:
-                    index = line.rfind(',')
-                    keys = "{}".format(line[:index]).split(",")
-                    value = "{}".format(line[index+1:])[:-1]
-                    newkey = ""
-                    for key in keys:
-                        newkey += '{},'.format(LlvmUtils.get_passes().index(key))
-                    ouputfile.write('{}{}\n'.format(newkey,value))
+        LlvmUtils._translate(input_, output_, PassRegistry.get('newpm').index)
 
     # To decode file from integers to passes
     @staticmethod
     def decode(input_: str,output_: str):
-        with open(input_,'r') as inputfile:
-            lines = inputfile.readlines()
-            with open(output_,'w') as ouputfile:
-                for line in lines:
-                    index = line.rfind(',')
-                    keys = "{}".format(line[:index]).split(",")
-                    value = "{}".format(line[index+1:])[:-1]
-                    newkey = ""
-                    for key in keys:
-                        newkey += '{},'.format(LlvmUtils.get_passes()[int(key)])
-                    ouputfile.write('{}{}\n'.format(newkey,value))
+        registry = PassRegistry.get('newpm')
+        LlvmUtils._translate(input_, output_, lambda key: registry.name(int(key)))
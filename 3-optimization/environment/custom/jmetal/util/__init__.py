@@ -1,3 +1,13 @@
-from .IntervalValueV1 import IntervalValue
+from .IntervalValueV1 import IntervalArray, IntervalValue
 from .IntervalUtilsV1 import IntervalUtils
-from .Llvm15Utils_LegacyAllPMV1 import LlvmUtils
\ No newline at end of file
+from .pass_registry import PassRegistry
+from .fitness_archive import FitnessArchive
+from .paired_measurement import PairedMeasurementScheduler
+from .artifact_store import ArtifactStore
+from .perf_counters import PerfCounters
+from .pass_cost_model import PassCostModel
+from .evaluator import ArchivingMultiprocessEvaluator
+from .termination_criterion import (AndTerminationCriterion, OrTerminationCriterion, StoppingByRealEvaluations,
+                                    StoppingByStagnation, StoppingByToolCpuTime, StoppingByWallClock)
+from .Llvm15Utils_LegacyAllPMV1 import LlvmUtils
+from .trace_recorder import TraceRecorder
\ No newline at end of file
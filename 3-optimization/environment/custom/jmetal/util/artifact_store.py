@@ -0,0 +1,147 @@
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+import shutil
+import sys
+
+"""
+.. module:: artifact_store
+   :platform: Unix, Windows
+   :synopsis: Content-addressed store of the binaries (and bitcode) of the best solutions, under a disk budget.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 of a file, read in 1 MiB chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore():
+    """
+    Keeps the artifacts of the top_k solutions with the lowest fitness seen so far, so they can be benchmarked again
+    (or published as base binaries) without rebuilding them with opt and clang++.
+    Files are stored by content (objects/<sha256[:2]>/<sha256>): sequences that produce the same binary share it.
+    The index (index.json) maps every kept solution to its fitness, the digests of its artifacts and free metadata.
+    When a new solution enters the top_k, or the artifacts exceed max_bytes, the worst solutions are evicted and the
+    objects no longer referenced are deleted.
+
+    :param str root: Folder of the store (created if it does not exist). An existing store is reopened.
+    :param int top_k: Number of solutions kept.
+    :param int max_bytes: Disk budget for the objects (None for no limit). The best solution is always kept.
+    :param bool keep_bitcode: Whether to keep the optimized bitcode as well as the binary.
+    """
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(self, root: str, top_k: int = 10, max_bytes: int = None, keep_bitcode: bool = False):
+        if top_k < 1:
+            raise ValueError(f'top_k must be a positive integer, got {top_k}')
+        self.root = root
+        self.top_k = top_k
+        self.max_bytes = max_bytes
+        self.keep_bitcode = keep_bitcode
+        self.index_path = os.path.join(root, self.INDEX_FILENAME)
+        Path(os.path.join(root, 'objects')).mkdir(parents=True, exist_ok=True)
+
+        self.entries = dict()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                self.entries = json.load(f)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def ranking(self) -> list[tuple[str, dict]]:
+        """
+        (solution, entry) pairs from the best fitness to the worst.
+        """
+        return sorted(self.entries.items(), key=lambda item: item[1]['fitness'])
+
+    def total_bytes(self) -> int:
+        return sum(os.path.getsize(self.object_path(digest)) for digest in self._referenced())
+
+    def qualifies(self, fitness: float) -> bool:
+        """
+        Whether a solution with this fitness would enter the top_k.
+        """
+        if fitness is None or not math.isfinite(fitness) or fitness >= sys.float_info.max:
+            return False
+        if len(self.entries) < self.top_k:
+            return True
+        return fitness < self.ranking()[-1][1]['fitness']
+
+    def offer(self, solution: str, fitness: float, binary_path: str, bitcode_path: str = None,
+              metadata: dict = None) -> bool:
+        """
+        Keep the artifacts of a solution if its fitness enters the top_k. Must be called before the files are overwritten
+        by the next evaluation.
+
+        :param str solution: Key of the solution (str of the list of pass indexes, as in the fitness archive).
+        :param float fitness: Fitness value of the solution (lower is better).
+        :param str binary_path: Path to the binary of the solution.
+        :param str bitcode_path: Path to the optimized bitcode (only kept with keep_bitcode).
+        :param dict metadata: Extra information saved with the entry (opt arguments, pass manager...).
+        :return: Whether the solution was stored.
+        """
+        if solution in self.entries and self.entries[solution]['fitness'] <= fitness:
+            return False
+        if not self.qualifies(fitness) and solution not in self.entries:
+            return False
+
+        entry = {
+            'fitness': fitness,
+            'binary': self._put(binary_path),
+            'bitcode': self._put(bitcode_path) if self.keep_bitcode and bitcode_path else None,
+            'metadata': metadata or dict()
+        }
+        self.entries[solution] = entry
+        self._evict()
+        self._save()
+        return solution in self.entries
+
+    def _put(self, path: str) -> str:
+        digest = file_digest(path)
+        destination = self.object_path(digest)
+        if not os.path.exists(destination):
+            Path(os.path.dirname(destination)).mkdir(parents=True, exist_ok=True)
+            tmp = f'{destination}.tmp'
+            shutil.copyfile(path, tmp)
+            shutil.copymode(path, tmp)
+            os.replace(tmp, destination)
+        return digest
+
+    def _referenced(self) -> set[str]:
+        return {digest for entry in self.entries.values() for digest in (entry['binary'], entry['bitcode']) if digest}
+
+    def _evict(self) -> None:
+        ranking = self.ranking()
+        for solution, _ in ranking[self.top_k:]:
+            del self.entries[solution]
+        ranking = ranking[:self.top_k]
+        if self.max_bytes is not None:
+            while len(ranking) > 1 and self.total_bytes() > self.max_bytes:
+                solution, _ = ranking.pop()
+                del self.entries[solution]
+        self._collect_garbage()
+
+    def _collect_garbage(self) -> None:
+        referenced = self._referenced()
+        for path in Path(self.root, 'objects').glob('*/*'):
+            if path.name not in referenced:
+                path.unlink()
+
+    def _save(self) -> None:
+        tmp = f'{self.index_path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp, self.index_path)
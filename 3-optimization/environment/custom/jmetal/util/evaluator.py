@@ -0,0 +1,73 @@
+from multiprocessing import Pool, Value
+from typing import List, Optional, TypeVar
+
+from jmetal.core.problem import Problem
+from jmetal.util.evaluator import MultiprocessEvaluator
+
+"""
+.. module:: evaluator
+   :platform: Unix, Windows
+   :synopsis: Parallel evaluator that brings the evaluations of the worker processes back to the fitness archive.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+S = TypeVar('S')
+
+# Slot (1, 2, ...) of the current worker process of an ArchivingMultiprocessEvaluator, None outside of them
+_worker_slot = None
+
+
+def _init_worker(counter) -> None:
+    global _worker_slot
+    with counter.get_lock():
+        counter.value += 1
+        _worker_slot = counter.value
+
+
+def worker_slot() -> Optional[int]:
+    """
+    Slot of the current process in the pool of an ArchivingMultiprocessEvaluator: 1 to the number of processes, the same in
+    every execution (unlike the pid), or None if the process is not one of its workers.
+    """
+    return _worker_slot
+
+
+class ArchivingMultiprocessEvaluator(MultiprocessEvaluator[S]):
+    """
+    MultiprocessEvaluator (a pool of processes evaluating every batch of solutions, e.g. the offspring of NSGA-II) for problems
+    with a fitness archive (e.g. LlvmMultiObjectiveProblem). Only the solutions of the batch that are not archived
+    (archived_objectives) are sent to the workers, and only once each, even if the batch repeats them. The problem is pickled
+    into the workers with every batch, so what they learn (the archive, the counters) would be lost: after every batch, the
+    problem merges the evaluations of the workers (merge_evaluations), and the rest of the solutions of the batch (archived
+    or repeated) are then evaluated from the archive in the main process.
+
+    Every worker gets a slot number (worker_slot), so that it can name its files (e.g. its copy of the sources) after it
+    and the next executions reuse them instead of piling up one set per pid.
+
+    :param int processes: Number of worker processes (the number of CPUs if None).
+    """
+    def __init__(self, processes: int = None):
+        # The pool of MultiprocessEvaluator, plus the slot numbering
+        super(MultiprocessEvaluator, self).__init__()
+        self.pool = Pool(processes, initializer=_init_worker, initargs=(Value('i', 0),))
+
+    def evaluate(self, solution_list: List[S], problem: Problem) -> List[S]:
+        archived_objectives = getattr(problem, 'archived_objectives', None)
+        merge_evaluations = getattr(problem, 'merge_evaluations', None)
+        if archived_objectives is None or merge_evaluations is None:
+            return super(ArchivingMultiprocessEvaluator, self).evaluate(solution_list, problem)
+
+        pending = dict()
+        for solution in solution_list:
+            if archived_objectives(solution) is None:
+                pending.setdefault(str(solution.variables), solution)
+        evaluated = super(ArchivingMultiprocessEvaluator, self).evaluate(list(pending.values()), problem) if pending else []
+        merge_evaluations(evaluated)
+
+        # The first occurrence of every pending solution is replaced by its evaluated copy; the rest hit the archive
+        evaluated = {str(solution.variables): solution for solution in evaluated}
+        result = []
+        for solution in solution_list:
+            copy = evaluated.pop(str(solution.variables), None)
+            result.append(copy if copy is not None else problem.evaluate(solution))
+        return result
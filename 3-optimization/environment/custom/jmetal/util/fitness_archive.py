@@ -0,0 +1,270 @@
+import json
+import os
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from custom.jmetal.util.pass_registry import PassRegistry
+
+"""
+.. module:: fitness_archive
+   :platform: Unix, Windows
+   :synopsis: Binary, memory-mappable archive of evaluated pass sequences and bulk converters.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+ARCHIVE_SUFFIX = '.farc'
+MERGE_POLICIES = ('last', 'first', 'min', 'max', 'mean')
+
+_MAGIC = b'LLVMFARC'
+_FORMAT_VERSION = 1
+_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u2'),
+    ('n_passes', '<u2'),
+    ('llvm_version', '<u2'),
+    ('reserved', '<u2'),
+    ('n_records', '<u8'),
+    ('flavour', 'S16'),
+    ('padding', 'V24'),
+])
+HEADER_SIZE = _HEADER_DTYPE.itemsize    # 64 bytes, records start right after the header
+
+
+def record_dtype(n_passes: int) -> np.dtype:
+    """
+    Fixed-width record: one uint8 per pass (the PassRegistry genome) followed by the float64 fitness.
+    """
+    return np.dtype([('passes', 'u1', (n_passes,)), ('fitness', '<f8')])
+
+
+class FitnessArchive():
+    """
+    Archive of evaluated solutions (pass index sequences of the same length) and their fitness values.
+    On disk it is a 64-byte header followed by fixed-width records, so it can be memory-mapped with NumPy and
+    opened in constant time whatever its size. It also converts in bulk from and to the two formats used so far:
+    the JSON fitness_archive of LlvmRuntimeProblem ({"[1, 2, ...]": fitness}) and the legacy CSV of LlvmUtils
+    (one "pass,pass,...,fitness" line per solution, with pass names or indexes).
+
+    :param numpy.ndarray passes: (n_records, n_passes) matrix of pass indexes.
+    :param numpy.ndarray fitness: Fitness value of every record.
+    :param str flavour: PassRegistry flavour the indexes refer to.
+    :param int llvm_version: LLVM version of the PassRegistry.
+    """
+    def __init__(self, passes: np.ndarray, fitness: np.ndarray, flavour: str = 'legacy-o1', llvm_version: int = 15):
+        passes = np.asarray(passes)
+        if passes.ndim != 2:
+            raise ValueError(f'passes must be a (n_records, n_passes) matrix, got shape {passes.shape}')
+        if passes.size and (passes.min() < 0 or passes.max() > np.iinfo(np.uint8).max):
+            raise ValueError('Pass indexes do not fit in uint8')
+        self.passes = passes if passes.dtype == np.uint8 else passes.astype(np.uint8)
+        self.fitness = np.asarray(fitness, dtype=np.float64)
+        if len(self.passes) != len(self.fitness):
+            raise ValueError(f'{len(self.passes)} pass rows but {len(self.fitness)} fitness values')
+        self.flavour = flavour
+        self.llvm_version = llvm_version
+
+    @property
+    def n_passes(self) -> int:
+        return self.passes.shape[1]
+
+    @property
+    def registry(self) -> PassRegistry:
+        return PassRegistry.get(self.flavour, self.llvm_version)
+
+    def __len__(self) -> int:
+        return len(self.fitness)
+
+    # Binary format
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'FitnessArchive':
+        """
+        Open a binary archive. With mmap the records are mapped read-only instead of read into memory.
+        """
+        header = np.fromfile(path, dtype=_HEADER_DTYPE, count=1)
+        if len(header) == 0 or header['magic'][0] != _MAGIC:
+            raise ValueError(f'{path} is not a fitness archive')
+        header = header[0]
+        if header['version'] != _FORMAT_VERSION:
+            raise ValueError(f'{path}: unsupported archive version {header["version"]}')
+        dtype = record_dtype(int(header['n_passes']))
+        n_records = int(header['n_records'])
+        if mmap and n_records:
+            records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+        else:
+            with open(path, 'rb') as f:
+                f.seek(HEADER_SIZE)
+                records = np.fromfile(f, dtype=dtype, count=n_records)
+        return cls(records['passes'], records['fitness'], header['flavour'].decode(), int(header['llvm_version']))
+
+    def save(self, path: str) -> None:
+        """
+        Write the archive atomically (to a temporary file that then replaces path).
+        """
+        header = np.zeros(1, dtype=_HEADER_DTYPE)
+        header['magic'] = _MAGIC
+        header['version'] = _FORMAT_VERSION
+        header['n_passes'] = self.n_passes
+        header['llvm_version'] = self.llvm_version
+        header['n_records'] = len(self)
+        header['flavour'] = self.flavour.encode()
+        records = np.empty(len(self), dtype=record_dtype(self.n_passes))
+        records['passes'] = self.passes
+        records['fitness'] = self.fitness
+
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            header.tofile(f)
+            records.tofile(f)
+        os.replace(tmp, path)
+
+    # JSON fitness_archive of LlvmRuntimeProblem
+
+    @classmethod
+    def from_json(cls, path: str, flavour: str = 'legacy-o1', llvm_version: int = 15) -> 'FitnessArchive':
+        with open(path, 'r') as f:
+            archive = json.load(f)
+        return cls.from_dict(archive, flavour, llvm_version)
+
+    @classmethod
+    def from_dict(cls, archive: dict, flavour: str = 'legacy-o1', llvm_version: int = 15) -> 'FitnessArchive':
+        """
+        Build an archive from a {"[1, 2, ...]": fitness} dictionary, parsing all the keys in a single NumPy call.
+        """
+        if not archive:
+            return cls(np.empty((0, 0), dtype=np.uint8), np.empty(0), flavour, llvm_version)
+        keys = list(archive.keys())
+        if len({key.count(',') for key in keys}) > 1:
+            raise ValueError('All the solutions of an archive must have the same number of passes')
+        passes = np.fromstring(','.join(key[1:-1] for key in keys), dtype=np.int64, sep=',')
+        fitness = np.fromiter(archive.values(), dtype=np.float64, count=len(keys))
+        return cls(passes.reshape(len(keys), -1), fitness, flavour, llvm_version)
+
+    def to_dict(self) -> dict:
+        """
+        {"[1, 2, ...]": fitness} dictionary, with the same keys LlvmRuntimeProblem uses (str of the variables list).
+        """
+        return {'[' + ', '.join(map(str, row)) + ']': value
+                for row, value in zip(self.passes.tolist(), self.fitness.tolist())}
+
+    def to_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    # Legacy CSV of LlvmUtils
+
+    @classmethod
+    def from_csv(cls, path: str, flavour: str = 'legacy-o1', llvm_version: int = 15) -> 'FitnessArchive':
+        """
+        Read a legacy "pass,pass,...,fitness" file. Passes may be indexes (encoded files) or names (decoded files).
+        """
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+        lines = [line for line in lines if line]
+        if not lines:
+            return cls(np.empty((0, 0), dtype=np.uint8), np.empty(0), flavour, llvm_version)
+        if len({line.count(',') for line in lines}) > 1:
+            raise ValueError(f'{path}: all the lines must have the same number of passes')
+        n_fields = lines[0].count(',') + 1
+        tokens = np.array(','.join(lines).split(','), dtype=object)
+        table = tokens.reshape(len(lines), n_fields)
+        keys = table[:, :-1]
+        fitness = table[:, -1].astype(np.float64)
+        try:
+            passes = keys.astype(np.int64)
+        except ValueError:
+            index = PassRegistry.get(flavour, llvm_version).index
+            passes = np.array([index(name) for name in keys.ravel()], dtype=np.int64).reshape(keys.shape)
+        return cls(passes, fitness, flavour, llvm_version)
+
+    def to_csv(self, path: str, names: bool = False) -> None:
+        """
+        Write a legacy "pass,pass,...,fitness" file, with pass indexes (encoded) or pass names (decoded).
+        """
+        if names:
+            keys = np.asarray(self.registry.names, dtype=object)[self.passes]
+        else:
+            keys = self.passes.astype(str).astype(object)
+        rows = np.column_stack([keys, np.array([repr(v) for v in self.fitness.tolist()], dtype=object)])
+        with open(path, 'w') as f:
+            f.writelines(','.join(row) + '\n' for row in rows.tolist())
+
+    # Lookups and merges
+
+    def lookup_table(self) -> dict:
+        """
+        {genome bytes: fitness} dictionary for O(1) lookups with PassRegistry.encode_genome keys.
+        """
+        return dict(zip((bytes(row) for row in np.ascontiguousarray(self.passes)), self.fitness.tolist()))
+
+    @staticmethod
+    def merge(archives: Sequence['FitnessArchive'], policy: str = 'last') -> 'FitnessArchive':
+        """
+        K-way merge of archives (e.g. collected on different machines) with a single stable sort.
+        Duplicated solutions are resolved with the policy: 'last' (the later archive wins, as LlvmUtils.mergeDict),
+        'first', 'min', 'max' or 'mean'. The result is sorted by genome.
+        """
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f'Unknown merge policy {policy!r}, expected one of {MERGE_POLICIES}')
+        archives = [archive for archive in archives if len(archive)]
+        if not archives:
+            return FitnessArchive(np.empty((0, 0), dtype=np.uint8), np.empty(0))
+        first = archives[0]
+        for archive in archives[1:]:
+            if (archive.n_passes, archive.flavour, archive.llvm_version) != \
+                    (first.n_passes, first.flavour, first.llvm_version):
+                raise ValueError('Only archives with the same solution length and pass catalogue can be merged')
+
+        passes = np.concatenate([archive.passes for archive in archives])
+        fitness = np.concatenate([archive.fitness for archive in archives])
+        # Every row seen as one fixed-width byte string: a single stable sort (which keeps the archive order
+        # among duplicates) instead of one pass per column
+        keys = passes.view(f'S{first.n_passes}').ravel() if first.n_passes else np.zeros(len(passes), dtype='S1')
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        passes = passes[order]
+        fitness = fitness[order]
+        is_start = np.ones(len(passes), dtype=bool)
+        is_start[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(is_start)
+
+        if policy == 'first':
+            merged = fitness[starts]
+        elif policy == 'last':
+            merged = fitness[np.append(starts[1:], len(fitness)) - 1]
+        elif policy == 'min':
+            merged = np.minimum.reduceat(fitness, starts)
+        elif policy == 'max':
+            merged = np.maximum.reduceat(fitness, starts)
+        else:
+            merged = np.add.reduceat(fitness, starts) / np.diff(np.append(starts, len(fitness)))
+        return FitnessArchive(passes[starts], merged, first.flavour, first.llvm_version)
+
+
+def read_archive(path: str, flavour: str = 'legacy-o1', llvm_version: int = 15) -> FitnessArchive:
+    """
+    Open an archive in any supported format, chosen by extension: binary (.farc), JSON (.json) or legacy CSV.
+    """
+    if path.endswith(ARCHIVE_SUFFIX):
+        return FitnessArchive.load(path)
+    if path.endswith('.json'):
+        return FitnessArchive.from_json(path, flavour, llvm_version)
+    return FitnessArchive.from_csv(path, flavour, llvm_version)
+
+
+def write_archive(archive: FitnessArchive, path: str, names: bool = False) -> None:
+    """
+    Write an archive in the format given by the extension of path (see read_archive).
+    """
+    if path.endswith(ARCHIVE_SUFFIX):
+        archive.save(path)
+    elif path.endswith('.json'):
+        archive.to_json(path)
+    else:
+        archive.to_csv(path, names)
+
+
+def merge_archives(paths: Iterable[str], policy: str = 'last', flavour: str = 'legacy-o1',
+                   llvm_version: int = 15) -> FitnessArchive:
+    return FitnessArchive.merge([read_archive(path, flavour, llvm_version) for path in paths], policy)
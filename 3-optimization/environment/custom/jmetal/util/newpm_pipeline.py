@@ -0,0 +1,76 @@
+from typing import Iterable
+
+from custom.jmetal.util.pass_registry import PassRegistry
+
+"""
+.. module:: newpm_pipeline
+   :platform: Unix, Windows
+   :synopsis: Builds New Pass Manager pipelines (opt -passes=...) from sequences of pass names.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+# Loop passes that need MemorySSA, so their loop adaptor has to be loop-mssa(...) instead of loop(...)
+MEMORYSSA_LOOP_PASSES = frozenset(['licm', 'lnicm', 'simple-loop-unswitch'])
+
+
+def build_pipeline(names: Iterable[str], registry: PassRegistry = None, group: bool = True) -> str:
+    """
+    Build the text of a New PM pipeline for opt -passes. Adjacent function passes are grouped into one function(...)
+    adaptor and adjacent loop passes into one loop(...) (or loop-mssa(...)) adaptor inside it, so that every function
+    and loop is visited once per group and the analyses are kept between passes instead of being invalidated and
+    recomputed for the whole module after each of them. Adjacent CGSCC passes (e.g. inline) are grouped into one
+    cgscc(...) adaptor, which is also needed for the pipeline to parse: opt takes a top-level CGSCC pass as the start of
+    a CGSCC pipeline. Module passes, and any pass the registry does not classify, stay at the top level. Empty names are
+    skipped.
+
+    :param names: Pass names, in order.
+    :param registry: PassRegistry with the function/loop/CGSCC classification (the NewPM one by default).
+    :param group: False to emit a flat comma-separated pipeline, as Llvm15Utils_NewPMV1 does.
+    :return: Pipeline text (empty if there are no passes).
+    """
+    names = [name for name in names if name]
+    if not group:
+        return ','.join(names)
+    registry = registry or PassRegistry.get('newpm')
+
+    pipeline = []
+    cgscc_group = []
+    function_group = []
+    loop_group = []
+
+    def close_loop_group():
+        if loop_group:
+            adaptor = 'loop-mssa' if MEMORYSSA_LOOP_PASSES.intersection(loop_group) else 'loop'
+            function_group.append(f'{adaptor}({",".join(loop_group)})')
+            loop_group.clear()
+
+    def close_function_group():
+        close_loop_group()
+        if function_group:
+            pipeline.append(f'function({",".join(function_group)})')
+            function_group.clear()
+
+    def close_cgscc_group():
+        if cgscc_group:
+            pipeline.append(f'cgscc({",".join(cgscc_group)})')
+            cgscc_group.clear()
+
+    for name in names:
+        if registry.is_loop_pass(name):
+            close_cgscc_group()
+            loop_group.append(name)
+        elif registry.is_function_pass(name):
+            close_cgscc_group()
+            close_loop_group()
+            function_group.append(name)
+        elif registry.is_cgscc_pass(name):
+            close_function_group()
+            cgscc_group.append(name)
+        else:
+            close_function_group()
+            close_cgscc_group()
+            pipeline.append(name)
+    close_function_group()
+    close_cgscc_group()
+
+    return ','.join(pipeline)
@@ -0,0 +1,176 @@
+from typing import Callable, List, Union
+
+import numpy as np
+from scipy.special import stdtrit
+
+from custom.jmetal.util.IntervalUtilsV1 import IntervalUtils
+from custom.jmetal.util.IntervalValueV1 import IntervalValue
+
+"""
+.. module:: paired_measurement
+   :platform: Unix, Windows
+   :synopsis: Interleaved candidate-vs-reference runtime measurements with an adaptive number of repetitions.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+CANDIDATE = 'candidate'
+REFERENCE = 'reference'
+INTERVAL_METHODS = ('t', 'bootstrap')
+# Below this number of blocks the percentile bootstrap gives intervals far too narrow, so the t interval is used instead
+BOOTSTRAP_MIN_BLOCKS = 20
+
+
+class PairedResult():
+    """
+    Outcome of a paired measurement.
+
+    :param bool success: False if some run failed (the measurement stops at the first failure).
+    :param list candidate: Values measured for the candidate, in execution order.
+    :param list reference: Values measured for the reference, in execution order.
+    :param list differences: Relative difference (candidate / reference - 1) of every block.
+    :param IntervalValue interval: Confidence interval of the mean relative difference (None if not computed).
+    :param bool converged: Whether the stopping rule was met before running out of blocks.
+    """
+    def __init__(self, success: bool, candidate: List[float], reference: List[float], differences: List[float],
+                 interval: IntervalValue = None, converged: bool = False):
+        self.success = success
+        self.candidate = candidate
+        self.reference = reference
+        self.differences = differences
+        self.interval = interval
+        self.converged = converged
+
+    @property
+    def runs(self) -> int:
+        return len(self.candidate) + len(self.reference)
+
+    @property
+    def mean_difference(self) -> float | None:
+        return float(np.mean(self.differences)) if self.differences else None
+
+    def to_dict(self) -> dict:
+        return {
+            'success': self.success,
+            'candidate': self.candidate,
+            'reference': self.reference,
+            'relative_differences': self.differences,
+            'mean_relative_difference': self.mean_difference,
+            'interval': None if self.interval is None else [self.interval.lower_bound, self.interval.upper_bound],
+            'runs': self.runs,
+            'converged': self.converged
+        }
+
+
+class PairedMeasurementScheduler():
+    """
+    Measures a candidate against a reference binary by interleaving their runs in blocks, instead of running the
+    candidate a fixed number of times alone and spacing the runs with idle sleeps.
+    Every block runs both binaries block_size times in a random order, so slow drifts of the machine (thermal state,
+    background load, frequency scaling) hit both sides of the block alike and cancel out in its relative difference
+    mean(candidate) / mean(reference) - 1. After min_blocks blocks, a confidence interval of the mean difference is
+    computed after every block, and the measurement stops as soon as the interval is narrower than precision or leaves
+    no doubt about the sign of the difference (it does not contain 0), or after max_blocks.
+    With so few blocks, the interval is a Student's t interval (a percentile bootstrap is far too narrow below
+    BOOTSTRAP_MIN_BLOCKS differences). Since the interval is looked at up to max_blocks - min_blocks + 1 times and the
+    measurement stops at the first look that meets the rule, the significance level is spent over the looks, so that
+    the interval the measurement stops with still has the nominal coverage: look k of K gets
+    alpha * ((k / K)^spending_exponent - ((k - 1) / K)^spending_exponent), so most of it is kept for the last look.
+    An early look with 2 or 3 differences rarely stops anything (its t quantile is huge), so splitting the level evenly
+    (Bonferroni, spending_exponent 1) would mostly widen the last interval, and with it the fitness (its upper bound).
+
+    With the default settings a measurement takes 3 blocks: 6 runs, 3 of each binary, against the 5 runs of the
+    candidate alone of worst-of-5, with drifts of the machine cancelled out. Every block allowed beyond min_blocks adds
+    2 * block_size runs to the candidates that are within the noise of the reference (with a run-to-run variation of
+    1-2%, anything closer than a few %), which run up to max_blocks: e.g. about 8 runs with max_blocks 4, and about 20
+    with min_blocks 3 and max_blocks 10.
+
+    :param int block_size: Runs of each binary per block.
+    :param int min_blocks: Blocks run before the stopping rule is checked.
+    :param int max_blocks: Maximum number of blocks.
+    :param float precision: Half width of the confidence interval (as a relative difference) that stops the measurement.
+    :param int n_iterations: Bootstrap replications of the confidence interval.
+    :param int significance_level: Significance level of the confidence interval (in %), spent over the looks.
+    :param float spending_exponent: Exponent of the alpha spending function (1 for Bonferroni, higher to keep more of the
+        significance level for the last looks).
+    :param str interval_method: 't' (Student's t interval) or 'bootstrap' (percentile bootstrap, only used once there
+        are BOOTSTRAP_MIN_BLOCKS differences; the t interval is used before).
+    :param rng: Random generator or seed, used for the run order and the bootstrap.
+    """
+    def __init__(self, block_size: int = 1, min_blocks: int = 3, max_blocks: int = 3, precision: float = 0.01,
+                 n_iterations: int = 500, significance_level: int = 5, spending_exponent: float = 3,
+                 interval_method: str = 't', rng: Union[np.random.Generator, int, None] = None):
+        if block_size < 1:
+            raise ValueError(f'block_size must be a positive integer, got {block_size}')
+        if not 2 <= min_blocks <= max_blocks:
+            raise ValueError(f'Expected 2 <= min_blocks <= max_blocks, got {min_blocks} and {max_blocks}')
+        if interval_method not in INTERVAL_METHODS:
+            raise ValueError(f'Unknown interval method {interval_method!r}, expected one of {INTERVAL_METHODS}')
+        if spending_exponent <= 0:
+            raise ValueError(f'spending_exponent must be positive, got {spending_exponent}')
+        self.block_size = block_size
+        self.min_blocks = min_blocks
+        self.max_blocks = max_blocks
+        self.precision = precision
+        self.n_iterations = n_iterations
+        self.significance_level = significance_level
+        self.spending_exponent = spending_exponent
+        self.interval_method = interval_method
+        self.rng = np.random.default_rng(rng)
+
+    def block_order(self) -> List[str]:
+        """
+        Random order of the runs of one block (block_size runs of each binary).
+        """
+        order = np.array([CANDIDATE, REFERENCE] * self.block_size)
+        return self.rng.permutation(order).tolist()
+
+    @property
+    def looks(self) -> int:
+        return self.max_blocks - self.min_blocks + 1
+
+    def look_significance_level(self, look: int) -> float:
+        # Significance level (in %) spent at a look (1 to looks) of the stopping rule
+        spent = [(k / self.looks) ** self.spending_exponent for k in (look - 1, look)]
+        return self.significance_level * (spent[1] - spent[0])
+
+    def interval(self, differences: List[float]) -> IntervalValue:
+        sample = np.asarray(differences, dtype=float)
+        significance_level = self.look_significance_level(min(len(sample) - self.min_blocks + 1, self.looks))
+        if self.interval_method == 'bootstrap' and len(sample) >= BOOTSTRAP_MIN_BLOCKS:
+            return IntervalUtils.make_interval(sample, self.n_iterations, significance_level, rng=self.rng)
+        mean = float(np.mean(sample))
+        half_width = float(stdtrit(len(sample) - 1, 1 - significance_level / 200) * np.std(sample, ddof=1)
+                           / np.sqrt(len(sample)))
+        return IntervalValue(mean - half_width, mean + half_width)
+
+    def is_met(self, interval: IntervalValue) -> bool:
+        return interval.width() / 2 <= self.precision or interval.lower_bound > 0 or interval.upper_bound < 0
+
+    def measure(self, run: Callable[[str, int], float | None]) -> PairedResult:
+        """
+        Run blocks until the stopping rule is met.
+
+        :param run: Callable that runs one binary (CANDIDATE or REFERENCE) and returns the measured value, or None if
+            the run failed. Its second argument is the number of the run of that binary (starting at 1).
+        :return: A PairedResult with every measured value and the confidence interval of the relative difference.
+        """
+        values = {CANDIDATE: [], REFERENCE: []}
+        differences = []
+        interval = None
+
+        for _ in range(self.max_blocks):
+            block = {CANDIDATE: [], REFERENCE: []}
+            for arm in self.block_order():
+                value = run(arm, len(values[arm]) + 1)
+                if value is None:
+                    return PairedResult(False, values[CANDIDATE], values[REFERENCE], differences, interval)
+                values[arm].append(value)
+                block[arm].append(value)
+
+            differences.append(float(np.mean(block[CANDIDATE]) / np.mean(block[REFERENCE]) - 1))
+            if len(differences) >= self.min_blocks:
+                interval = self.interval(differences)
+                if self.is_met(interval):
+                    return PairedResult(True, values[CANDIDATE], values[REFERENCE], differences, interval, True)
+
+        return PairedResult(True, values[CANDIDATE], values[REFERENCE], differences, interval)
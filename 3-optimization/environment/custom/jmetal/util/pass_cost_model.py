@@ -0,0 +1,153 @@
+import json
+import re
+from typing import List
+
+import numpy as np
+
+"""
+.. module:: pass_cost_model
+   :platform: Unix, Windows
+   :synopsis: opt -time-passes reports and an online per-pass model of the compile time of a solution.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+TIME_PASSES_FLAG = '-time-passes'
+
+_REPORT_RULE = re.compile(r'^===-+===$')
+_REPORT_ROW = re.compile(r'^\s*((?:\d+\.\d+\s+\(\s*\d+\.\d+%\)\s+)+)(.+?)\s*$')
+_REPORT_VALUE = re.compile(r'(\d+\.\d+)\s+\(\s*\d+\.\d+%\)')
+
+
+def split_time_passes(output: str) -> tuple[str, dict]:
+    """
+    Separate the -time-passes reports from the rest of the output of opt. The same flag works with both pass managers:
+    the legacy one names the passes by their description (e.g. "Combine redundant instructions") and the New PM by their
+    class (e.g. InstCombinePass), analyses included.
+
+    :param str output: Output of opt (stdout and stderr).
+    :return: The output without the reports, and {report title: {name: wall seconds}} (the Total row included).
+    """
+    lines = output.splitlines()
+    rest = []
+    reports = dict()
+    i = 0
+    while i < len(lines):
+        # Every report starts with a ===---=== / title / ===---=== header
+        if _REPORT_RULE.match(lines[i].strip()) and i + 2 < len(lines) and _REPORT_RULE.match(lines[i + 2].strip()):
+            title = lines[i + 1].strip().strip('.').strip()
+            timings = dict()
+            i += 3
+            # The report ends with a blank line after its rows
+            while i < len(lines) and not (timings and not lines[i].strip()):
+                match = _REPORT_ROW.match(lines[i])
+                if match:
+                    # The wall time is the last column with a percentage (Instr and Mem columns, if any, have none)
+                    wall = float(_REPORT_VALUE.findall(match.group(1))[-1])
+                    name = match.group(2)
+                    timings[name] = timings.get(name, 0.0) + wall
+                i += 1
+            reports[title] = timings
+        else:
+            rest.append(lines[i])
+            i += 1
+    return '\n'.join(rest), reports
+
+
+class PassCostModel():
+    """
+    Online least-squares model of the compile time of a solution as the sum of the cost of its passes.
+    Every target (opt and clang++ durations by default) is a ridge regression of the measured seconds on the number of times
+    every pass appears in the solution, plus an intercept (reading and writing the bitcode, or linking), updated with every
+    evaluation by accumulating the normal equations. The -time-passes reports are not used as targets: their names do not map
+    one to one to the passes of a solution (analyses, passes scheduled by other passes), and the measured duration is what
+    counts against the timeouts.
+
+    :param int n_passes: Number of passes of the catalogue (solutions are lists of indexes into it).
+    :param float ridge: Regularization of the costs of the passes, so that the model can predict from the first observations.
+    :param int min_observations: Observations of a target before its predictions are trusted.
+    :param tuple targets: Names of the modeled durations.
+    """
+    def __init__(self, n_passes: int, ridge: float = 1.0, min_observations: int = 10, targets: tuple = ('opt', 'clang')):
+        self.n_passes = n_passes
+        self.ridge = ridge
+        self.min_observations = min_observations
+        self.targets = tuple(targets)
+        # Solutions have a fixed length, so the intercept and the costs of the passes are confounded: the intercept is not
+        # regularized, so that it takes the common part instead of spreading it across every pass
+        prior = ridge * np.identity(n_passes + 1)
+        prior[-1, -1] = 0.0
+        self.gram = {target: prior.copy() for target in self.targets}
+        self.moments = {target: np.zeros(n_passes + 1) for target in self.targets}
+        self.observations = {target: 0 for target in self.targets}
+        self._coefficients = dict()
+
+    def _features(self, solution_variables: List[int]) -> np.ndarray:
+        features = np.zeros(self.n_passes + 1)
+        features[-1] = 1.0
+        np.add.at(features, np.asarray(solution_variables, dtype=int), 1.0)
+        return features
+
+    def update(self, solution_variables: List[int], **durations: float) -> None:
+        """
+        Add the measured durations of a solution (e.g. opt=12.3, clang=301.0). None values are skipped.
+        """
+        features = self._features(solution_variables)
+        for target, seconds in durations.items():
+            if seconds is None:
+                continue
+            self.gram[target] += np.outer(features, features)
+            self.moments[target] += seconds * features
+            self.observations[target] += 1
+            self._coefficients.pop(target, None)
+
+    def coefficients(self, target: str) -> np.ndarray:
+        """
+        Estimated cost in seconds of every pass, followed by the intercept.
+        """
+        if target not in self._coefficients:
+            self._coefficients[target] = np.linalg.solve(self.gram[target], self.moments[target])
+        return self._coefficients[target]
+
+    def predict(self, solution_variables: List[int]) -> dict:
+        """
+        :return: {target: predicted seconds, or None if the target has fewer than min_observations}.
+        """
+        features = self._features(solution_variables)
+        return {target: max(float(features @ self.coefficients(target)), 0.0)
+                if self.observations[target] >= self.min_observations else None
+                for target in self.targets}
+
+    def predict_total(self, solution_variables: List[int]) -> float | None:
+        """
+        Predicted duration of all the targets together (e.g. opt + clang++), or None if some of them cannot be predicted yet.
+        """
+        prediction = self.predict(solution_variables)
+        if None in prediction.values():
+            return None
+        return sum(prediction.values())
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({
+                'n_passes': self.n_passes,
+                'ridge': self.ridge,
+                'min_observations': self.min_observations,
+                'targets': list(self.targets),
+                'gram': {target: self.gram[target].tolist() for target in self.targets},
+                'moments': {target: self.moments[target].tolist() for target in self.targets},
+                'observations': self.observations
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'PassCostModel':
+        """
+        Model saved by a previous run, to keep learning from it.
+        """
+        with open(path, 'r') as f:
+            data = json.load(f)
+        model = cls(data['n_passes'], data['ridge'], data['min_observations'], tuple(data['targets']))
+        for target in model.targets:
+            model.gram[target] = np.array(data['gram'][target])
+            model.moments[target] = np.array(data['moments'][target])
+            model.observations[target] = data['observations'][target]
+        return model
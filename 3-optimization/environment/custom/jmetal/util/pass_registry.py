@@ -0,0 +1,279 @@
+from typing import Iterable, Sequence
+
+import numpy as np
+
+"""
+.. module:: pass_registry
+   :platform: Unix, Windows
+   :synopsis: Catalogues of LLVM passes with constant-time name/index lookups and compact genomes.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+_LEGACY_O1_PASSES = [
+    '', '-aa', '-adce', '-alignment-from-assumptions', '-always-inline', '-annotation-remarks',
+    '-annotation2metadata', '-basic-aa', '-bdce', '-block-freq', '-branch-prob',
+    '-called-value-propagation', '-deadargelim', '-demanded-bits', '-div-rem-pairs', '-domtree',
+    '-early-cse', '-early-cse-memssa', '-float2int', '-forceattrs', '-function-attrs',
+    '-globaldce', '-globalopt', '-globals-aa', '-indvars', '-inferattrs', '-inject-tli-mappings',
+    '-instcombine', '-instsimplify', '-ipsccp', '-lcssa', '-libcalls-shrinkwrap', '-licm',
+    '-loop-deletion', '-loop-distribute', '-loop-idiom', '-loop-instsimplify', '-loop-load-elim',
+    '-loop-rotate', '-loop-simplify', '-loop-simplifycfg', '-loop-sink', '-loop-unroll',
+    '-loop-vectorize', '-loops', '-lower-constant-intrinsics', '-lower-expect', '-mem2reg',
+    '-memcpyopt', '-memoryssa', '-postdomtree', '-reassociate', '-rpo-function-attrs',
+    '-scalar-evolution', '-sccp', '-scoped-noalias-aa', '-simple-loop-unswitch', '-simplifycfg',
+    '-sroa', '-strip-dead-prototypes', '-targetlibinfo', '-tbaa', '-transform-warning',
+    '-vector-combine', '-verify'
+]
+
+_LEGACY_ALL_PASSES = [
+    '-aa', '-atomic-expand', '-basic-aa', '-block-freq', '-branch-prob', '-cfl-anders-aa',
+    '-cfl-steens-aa', '-codegenprepare', '-cost-model', '-cycles', '-da', '-demanded-bits',
+    '-divergence', '-domfrontier', '-domtree', '-dwarfehprepare', '-early-cse-memssa',
+    '-expand-reductions', '-expandmemcmp', '-expandvp', '-global-merge', '-globals-aa',
+    '-hardware-loops', '-hexagon-loop-idiom', '-hexagon-vc', '-hexagon-vlcr', '-indirectbr-expand',
+    '-interleaved-access', '-interleaved-load-combine', '-iv-users', '-jmc-instrument',
+    '-lazy-value-info', '-loop-extract-single', '-loops', '-lower-amx-intrinsics',
+    '-lower-amx-type', '-lower-matrix-intrinsics-minimal', '-memdep', '-memoryssa',
+    '-mve-tail-predication', '-objc-arc-aa', '-phi-values', '-postdomtree', '-pre-amx-config',
+    '-pre-isel-intrinsic-lowering', '-regions', '-replace-with-veclib', '-safe-stack',
+    '-scalar-evolution', '-scev-aa', '-scoped-noalias-aa', '-select-optimize',
+    '-si-annotate-control-flow', '-sjljehprepare', '-stack-safety', '-stack-safety-local',
+    '-systemz-tdc', '-targetlibinfo', '-tbaa', '-type-promotion', '-unreachableblockelim',
+    '-verify-safepoint-ir', '-wasm-add-missing-prototypes', '-wasm-fix-function-bitcasts',
+    '-wasm-lower-em-ehsjlj', '-wasm-mclower-prepass', '-wasm-optimize-returned', '-wasmehprepare',
+    '-winehprepare', '-adce', '-add-discriminators', '-aggressive-instcombine',
+    '-alignment-from-assumptions', '-always-inline', '-annotation-remarks', '-annotation2metadata',
+    '-assume-builder', '-assume-simplify', '-bdce', '-bounds-checking', '-break-crit-edges',
+    '-called-value-propagation', '-callsite-splitting', '-canon-freeze', '-consthoist',
+    '-constmerge', '-constraint-elimination', '-correlated-propagation', '-cross-dso-cfi', '-dce',
+    '-deadargelim', '-dfa-jump-threading', '-div-rem-pairs', '-dse', '-early-cse',
+    '-elim-avail-extern', '-extract-blocks', '-fix-irreducible', '-flattencfg', '-float2int',
+    '-forceattrs', '-function-attrs', '-function-specialization', '-globaldce', '-globalopt',
+    '-globalsplit', '-guard-widening', '-gvn', '-gvn-hoist', '-gvn-sink', '-hotcoldsplit',
+    '-indvars', '-infer-address-spaces', '-inferattrs', '-inject-tli-mappings', '-inline',
+    '-instcombine', '-instcount', '-instnamer', '-instsimplify', '-ipsccp', '-irce', '-iroutliner',
+    '-jump-threading', '-lcssa', '-libcalls-shrinkwrap', '-load-store-vectorizer',
+    '-loop-data-prefetch', '-loop-deletion', '-loop-distribute', '-loop-extract', '-loop-flatten',
+    '-loop-fusion', '-loop-idiom', '-loop-instsimplify', '-loop-interchange', '-loop-load-elim',
+    '-loop-predication', '-loop-reduce', '-loop-reroll', '-loop-rotate', '-loop-simplify',
+    '-loop-simplifycfg', '-loop-sink', '-loop-unroll', '-loop-unroll-and-jam', '-loop-vectorize',
+    '-loop-versioning', '-lower-constant-intrinsics', '-lower-expect', '-lower-global-dtors',
+    '-lower-guard-intrinsic', '-lower-matrix-intrinsics', '-lower-widenable-condition',
+    '-loweratomic', '-lowerinvoke', '-lowerswitch', '-make-guards-explicit', '-mem2reg',
+    '-memcpyopt', '-mergefunc', '-mergeicmps', '-mergereturn', '-mldst-motion',
+    '-nary-reassociate', '-newgvn', '-objc-arc', '-objc-arc-apelim', '-objc-arc-contract',
+    '-objc-arc-expand', '-partial-inliner', '-partially-inline-libcalls', '-reassociate',
+    '-redundant-dbg-inst-elim', '-reg2mem', '-rewrite-statepoints-for-gc', '-rewrite-symbols',
+    '-rpo-function-attrs', '-scalarize-masked-mem-intrin', '-scalarizer', '-sccp',
+    '-separate-const-offset-from-gep', '-simple-loop-unswitch', '-simplifycfg', '-sink', '-slsr',
+    '-speculative-execution', '-sroa', '-strip', '-strip-dead-debug-info',
+    '-strip-dead-prototypes', '-strip-debug-declare', '-strip-gc-relocates', '-strip-nondebug',
+    '-strip-nonlinetable-debuginfo', '-structurizecfg', '-tailcallelim', '-tlshoist',
+    '-transform-warning', '-unify-loop-exits', '-vector-combine', '-verify', ''
+]
+
+_NEWPM_PASSES = [
+    'adce', 'add-discriminators', 'aggressive-instcombine', 'alignment-from-assumptions',
+    'always-inline', 'annotation-remarks', 'annotation2metadata', 'assume-builder',
+    'assume-simplify', 'bdce', 'bounds-checking', 'break-crit-edges', 'called-value-propagation',
+    'callsite-splitting', 'canon-freeze', 'consthoist', 'constmerge', 'constraint-elimination',
+    'correlated-propagation', 'cross-dso-cfi', 'dce', 'deadargelim', 'dfa-jump-threading',
+    'div-rem-pairs', 'dse', 'early-cse', 'elim-avail-extern', 'extract-blocks', 'fix-irreducible',
+    'flattencfg', 'float2int', 'forceattrs', 'function-attrs', 'function-specialization',
+    'globaldce', 'globalopt', 'globalsplit', 'guard-widening', 'gvn', 'gvn-hoist', 'gvn-sink',
+    'hotcoldsplit', 'indvars', 'infer-address-spaces', 'inferattrs', 'inject-tli-mappings',
+    'inline', 'instcombine', 'instcount', 'instnamer', 'instsimplify', 'ipsccp', 'irce',
+    'iroutliner', 'jump-threading', 'lcssa', 'libcalls-shrinkwrap', 'load-store-vectorizer',
+    'loop-data-prefetch', 'loop-deletion', 'loop-distribute', 'loop-extract', 'loop-flatten',
+    'loop-fusion', 'loop-idiom', 'loop-instsimplify', 'loop-interchange', 'loop-load-elim',
+    'loop-predication', 'loop-reduce', 'loop-reroll', 'loop-rotate', 'loop-simplify',
+    'loop-simplifycfg', 'loop-sink', 'loop-unroll', 'loop-unroll-and-jam', 'loop-vectorize',
+    'loop-versioning', 'lower-constant-intrinsics', 'lower-expect', 'lower-global-dtors',
+    'lower-guard-intrinsic', 'lower-matrix-intrinsics', 'lower-widenable-condition', 'loweratomic',
+    'lowerinvoke', 'lowerswitch', 'make-guards-explicit', 'mem2reg', 'memcpyopt', 'mergefunc',
+    'mergeicmps', 'mergereturn', 'mldst-motion', 'nary-reassociate', 'newgvn', 'objc-arc',
+    'objc-arc-apelim', 'objc-arc-contract', 'objc-arc-expand', 'partial-inliner',
+    'partially-inline-libcalls', 'reassociate', 'redundant-dbg-inst-elim', 'reg2mem',
+    'rewrite-statepoints-for-gc', 'rewrite-symbols', 'rpo-function-attrs',
+    'scalarize-masked-mem-intrin', 'scalarizer', 'sccp', 'separate-const-offset-from-gep',
+    'simple-loop-unswitch', 'simplifycfg', 'sink', 'slsr', 'speculative-execution', 'sroa',
+    'strip', 'strip-dead-debug-info', 'strip-dead-prototypes', 'strip-debug-declare',
+    'strip-gc-relocates', 'strip-nondebug', 'strip-nonlinetable-debuginfo', 'structurizecfg',
+    'tailcallelim', 'tlshoist', 'transform-warning', 'unify-loop-exits', 'vector-combine',
+    'verify', ''
+]
+
+_NEWPM_FUNCTION_PASSES = [
+    'adce', 'add-discriminators', 'aggressive-instcombine', 'alignment-from-assumptions',
+    'annotation-remarks', 'assume-builder', 'assume-simplify', 'bdce', 'bounds-checking',
+    'break-crit-edges', 'callsite-splitting', 'canon-freeze', 'consthoist',
+    'constraint-elimination', 'correlated-propagation', 'dce', 'dfa-jump-threading',
+    'div-rem-pairs', 'dse', 'early-cse', 'fix-irreducible', 'flattencfg', 'float2int',
+    'guard-widening', 'gvn', 'gvn-hoist', 'gvn-sink', 'indvars', 'infer-address-spaces',
+    'inject-tli-mappings', 'instcombine', 'instcount', 'instnamer', 'instsimplify', 'irce',
+    'jump-threading', 'lcssa', 'libcalls-shrinkwrap', 'licm', 'lint', 'load-store-vectorizer',
+    'loop-data-prefetch', 'loop-deletion', 'loop-distribute', 'loop-flatten', 'loop-fusion',
+    'loop-idiom', 'loop-instsimplify', 'loop-interchange', 'loop-load-elim', 'loop-predication',
+    'loop-reduce', 'loop-reroll', 'loop-rotate', 'loop-simplify', 'loop-simplifycfg', 'loop-sink',
+    'loop-unroll', 'loop-unroll-and-jam', 'loop-vectorize', 'loop-versioning',
+    'loop-versioning-licm', 'lower-constant-intrinsics', 'lower-expect', 'lower-guard-intrinsic',
+    'lower-matrix-intrinsics', 'lower-widenable-condition', 'loweratomic', 'lowerinvoke',
+    'lowerswitch', 'make-guards-explicit', 'mem2reg', 'memcpyopt', 'mergeicmps', 'mergereturn',
+    'mldst-motion', 'nary-reassociate', 'newgvn', 'objc-arc', 'objc-arc-contract',
+    'objc-arc-expand', 'partially-inline-libcalls', 'polly-prepare', 'reassociate',
+    'redundant-dbg-inst-elim', 'reg2mem', 'scalarize-masked-mem-intrin', 'scalarizer', 'sccp',
+    'separate-const-offset-from-gep', 'simple-loop-unswitch', 'simplifycfg', 'sink',
+    'slp-vectorizer', 'slsr', 'speculative-execution', 'sroa', 'strip-gc-relocates',
+    'structurizecfg', 'tailcallelim', 'tlshoist', 'transform-warning', 'unify-loop-exits',
+    'vector-combine', 'verify'
+]
+
+_NEWPM_MODULE_PASSES = [
+    'annotation2metadata', 'attributor', 'called-value-propagation', 'check-debugify',
+    'constmerge', 'cross-dso-cfi', 'deadargelim', 'debugify', 'elim-avail-extern',
+    'extract-blocks', 'forceattrs', 'function-specialization', 'globaldce', 'globalopt',
+    'globalsplit', 'hotcoldsplit', 'inferattrs', 'internalize', 'ipsccp', 'iroutliner',
+    'loop-extract', 'lower-global-dtors', 'memprof-module', 'mergefunc', 'metarenamer',
+    'objc-arc-apelim', 'partial-inliner', 'polly-codegen', 'polly-dce', 'polly-delicm',
+    'polly-export-jscop', 'polly-import-jscop', 'polly-mse', 'polly-opt-isl', 'polly-optree',
+    'polly-prune-unprofitable', 'polly-simplify', 'rewrite-statepoints-for-gc', 'rewrite-symbols',
+    'rpo-function-attrs', 'strip', 'strip-dead-debug-info', 'strip-dead-prototypes',
+    'strip-debug-declare', 'strip-nondebug', 'strip-nonlinetable-debuginfo'
+]
+
+# Loop and loop nest passes of LLVM 15 (LOOP_PASS and LOOPNEST_PASS in PassRegistry.def), which the New PM runs inside
+# loop(...) / loop-mssa(...) adaptors
+_NEWPM_LOOP_PASSES = [
+    'canon-freeze', 'guard-widening', 'indvars', 'licm', 'lnicm', 'loop-bound-split', 'loop-deletion', 'loop-flatten',
+    'loop-idiom', 'loop-instsimplify', 'loop-interchange', 'loop-predication', 'loop-reduce', 'loop-reroll',
+    'loop-rotate', 'loop-simplifycfg', 'loop-unroll-and-jam', 'loop-unroll-full', 'loop-versioning-licm',
+    'simple-loop-unswitch'
+]
+
+# CGSCC passes of LLVM 15 (CGSCC_PASS in PassRegistry.def), which the New PM runs inside cgscc(...) adaptors: at the top
+# level, the first of them would make opt parse the whole pipeline as a CGSCC one and reject the module passes after it
+_NEWPM_CGSCC_PASSES = [
+    'argpromotion', 'attributor-cgscc', 'function-attrs', 'inline', 'openmp-opt-cgscc'
+]
+
+# (LLVM version, flavour) -> (passes, function passes, module passes, loop passes, CGSCC passes). Only meaningful for NewPM.
+_PASS_TABLES = {
+    (15, 'legacy-all'): (_LEGACY_ALL_PASSES, (), (), (), ()),
+    (15, 'legacy-o1'): (_LEGACY_O1_PASSES, (), (), (), ()),
+    (15, 'newpm'): (_NEWPM_PASSES, _NEWPM_FUNCTION_PASSES, _NEWPM_MODULE_PASSES, _NEWPM_LOOP_PASSES, _NEWPM_CGSCC_PASSES),
+}
+
+
+class PassRegistry():
+    """
+    Immutable catalogue of the LLVM passes a solution can choose from, built once per LLVM version and pass manager
+    flavour and shared through PassRegistry.get. Solutions are lists of indexes into this catalogue.
+    Name <-> index lookups are O(1) (a dict one way, a NumPy array the other), and since every catalogue has at most
+    256 passes a solution can be stored as a uint8 genome: one byte per pass, directly usable as a hashable key.
+
+    :param str flavour: Pass manager flavour: 'legacy-all', 'legacy-o1' (the passes applied by -O1) or 'newpm'.
+    :param int llvm_version: LLVM major version.
+    """
+    FLAVOURS = ('legacy-all', 'legacy-o1', 'newpm')
+    GENOME_DTYPE = np.uint8
+
+    _registries = {}
+
+    def __init__(self, flavour: str = 'legacy-o1', llvm_version: int = 15):
+        if (llvm_version, flavour) not in _PASS_TABLES:
+            raise ValueError(f'No pass catalogue for flavour {flavour!r} and LLVM {llvm_version}. '
+                             f'Available: {sorted(_PASS_TABLES)}')
+        passes, function_passes, module_passes, loop_passes, cgscc_passes = _PASS_TABLES[(llvm_version, flavour)]
+        if len(passes) > np.iinfo(self.GENOME_DTYPE).max + 1:
+            raise ValueError(f'{len(passes)} passes do not fit in a {np.dtype(self.GENOME_DTYPE).name} genome')
+        self.flavour = flavour
+        self.llvm_version = llvm_version
+        self.names = tuple(passes)
+        self.function_passes = tuple(function_passes)
+        self.module_passes = tuple(module_passes)
+        self.loop_passes = tuple(loop_passes)
+        self.cgscc_passes = tuple(cgscc_passes)
+        self._function_passes = frozenset(function_passes)
+        self._module_passes = frozenset(module_passes)
+        self._loop_passes = frozenset(loop_passes)
+        self._cgscc_passes = frozenset(cgscc_passes)
+        self._names = np.array(self.names, dtype=object)
+        self._indexes = {name: index for index, name in enumerate(self.names)}
+
+    @classmethod
+    def get(cls, flavour: str = 'legacy-o1', llvm_version: int = 15) -> 'PassRegistry':
+        """
+        Return the shared registry for a flavour and LLVM version, building it on first use.
+        """
+        key = (llvm_version, flavour)
+        registry = cls._registries.get(key)
+        if registry is None:
+            registry = cls._registries[key] = cls(flavour, llvm_version)
+        return registry
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._indexes
+
+    def is_function_pass(self, name: str) -> bool:
+        return name in self._function_passes
+
+    def is_module_pass(self, name: str) -> bool:
+        return name in self._module_passes
+
+    def is_loop_pass(self, name: str) -> bool:
+        return name in self._loop_passes
+
+    def is_cgscc_pass(self, name: str) -> bool:
+        return name in self._cgscc_passes
+
+    def name(self, index: int) -> str:
+        return self.names[index]
+
+    def index(self, name: str) -> int:
+        """
+        Index of a pass name. Raises ValueError, like list.index, if the pass is not in the catalogue.
+        """
+        try:
+            return self._indexes[name]
+        except KeyError:
+            raise ValueError(f'{name!r} is not a {self.flavour} pass') from None
+
+    def names_of(self, indexes: Iterable[int]) -> list:
+        return self._names[np.asarray(indexes, dtype=np.intp)].tolist()
+
+    def indexes_of(self, names: Iterable[str]) -> list:
+        return [self.index(name) for name in names]
+
+    def to_pipeline(self, indexes: Iterable[int], separator: str = ' ') -> str:
+        """
+        Pass names of a solution joined into an opt argument (e.g. '-sroa -instcombine' for the legacy flavours).
+        """
+        return separator.join(self.names_of(indexes))
+
+    def encode_genome(self, indexes: Sequence[int]) -> bytes:
+        """
+        Pack a solution into one byte per pass. The result is hashable and much smaller than the list of ints.
+        """
+        genome = np.asarray(indexes)
+        if genome.size and (genome.min() < 0 or genome.max() >= len(self)):
+            raise ValueError(f'Pass indexes out of range for {self.flavour}: {list(indexes)}')
+        return genome.astype(self.GENOME_DTYPE).tobytes()
+
+    def decode_genome(self, genome: bytes) -> list:
+        return np.frombuffer(genome, dtype=self.GENOME_DTYPE).tolist()
+
+    def encode_genomes(self, solutions: Sequence[Sequence[int]]) -> np.ndarray:
+        """
+        Pack many solutions of the same length into a (n_solutions, n_passes) uint8 matrix.
+        Each row's tobytes() is the same key encode_genome returns.
+        """
+        genomes = np.asarray(solutions)
+        if genomes.size and (genomes.min() < 0 or genomes.max() >= len(self)):
+            raise ValueError(f'Pass indexes out of range for {self.flavour}')
+        return genomes.astype(self.GENOME_DTYPE).reshape(len(genomes), -1)
+
+    def __repr__(self) -> str:
+        return f'PassRegistry({self.flavour!r}, llvm_version={self.llvm_version}, passes={len(self)})'
@@ -0,0 +1,97 @@
+import os
+import resource
+import shutil
+import subprocess
+from typing import List
+
+"""
+.. module:: perf_counters
+   :platform: Unix
+   :synopsis: Hardware/software performance counters of a command, with perf stat or with rusage as a fallback.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+COUNTERS = ('instructions', 'cycles', 'task-clock', 'context-switches')
+BACKENDS = ('auto', 'perf', 'rusage')
+
+
+def perf_available(perf: str = 'perf') -> bool:
+    """
+    Whether perf stat can count instructions for an unprivileged process (perf installed, supported by the kernel and
+    allowed by perf_event_paranoid).
+    """
+    if shutil.which(perf) is None:
+        return False
+    try:
+        result = subprocess.run([perf, 'stat', '-x,', '-e', 'instructions:u', '--', 'true'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0 and '<not supported>' not in result.stderr and '<not counted>' not in result.stderr
+
+
+class PerfCounters():
+    """
+    Collects instructions, cycles, task-clock (ms) and context switches of a command.
+    With the perf backend the command is wrapped with perf stat (CSV output to a file). With the rusage backend, used
+    where perf is not available (containers, VMs, perf_event_paranoid), only task-clock (user + system CPU time) and
+    context switches (voluntary + involuntary) are known, from the rusage of the finished children; instructions and
+    cycles are None.
+
+    :param str backend: 'perf', 'rusage' or 'auto' (perf if available, rusage otherwise).
+    :param str perf: perf executable.
+    """
+    def __init__(self, backend: str = 'auto', perf: str = 'perf'):
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown counters backend {backend!r}, expected one of {BACKENDS}')
+        if backend == 'auto':
+            backend = 'perf' if perf_available(perf) else 'rusage'
+        self.backend = backend
+        self.perf = perf
+
+    def command(self, command: List[str], output_path: str) -> List[str]:
+        """
+        Command to run instead of command, so that its counters can be read afterwards from output_path.
+        """
+        if self.backend != 'perf':
+            return command
+        # User-space events (:u) so that the counts do not depend on perf_event_paranoid allowing kernel profiling
+        events = 'instructions:u,cycles:u,task-clock,context-switches'
+        return [self.perf, 'stat', '-x,', '-o', output_path, '-e', events, '--', *command]
+
+    def read(self, output_path: str, snapshot: resource.struct_rusage) -> dict:
+        """
+        Counters of the command run since snapshot was taken (rusage of the finished children, used by the rusage
+        backend). The snapshot has to be taken right before the attempt that is measured, so that retried launches
+        do not count.
+
+        :return: {counter: value} for every counter in COUNTERS (None if unknown).
+        """
+        if self.backend == 'perf':
+            return self._read_perf(output_path)
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {
+            'instructions': None,
+            'cycles': None,
+            'task-clock': ((usage.ru_utime - snapshot.ru_utime) + (usage.ru_stime - snapshot.ru_stime)) * 1000,
+            'context-switches': (usage.ru_nvcsw - snapshot.ru_nvcsw) + (usage.ru_nivcsw - snapshot.ru_nivcsw)
+        }
+
+    @staticmethod
+    def _read_perf(output_path: str) -> dict:
+        # perf stat -x, lines: value,unit,event,run time,percentage,... (comments start with #)
+        counters = dict.fromkeys(COUNTERS)
+        if not os.path.exists(output_path):
+            return counters
+        with open(output_path, 'r') as f:
+            for line in f:
+                fields = line.strip().split(',')
+                if len(fields) < 3 or line.startswith('#'):
+                    continue
+                event = fields[2].split(':')[0]
+                if event in counters:
+                    try:
+                        counters[event] = float(fields[0])
+                    except ValueError:
+                        counters[event] = None     # <not counted> or <not supported>
+        return counters
@@ -0,0 +1,158 @@
+from jmetal.util.termination_criterion import TerminationCriterion
+
+"""
+.. module:: termination_criterion
+   :platform: Unix, Windows
+   :synopsis: Stopping conditions based on the compute budget (wall clock, CPU time of the tools, real evaluations) and on
+              stagnation, composable with AND/OR.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+
+def _real_evaluations(kwargs: dict) -> int:
+    # Evaluations that ran the fitness function (LlvmRuntimeProblem counts them), or every evaluation for other problems
+    return getattr(kwargs.get('PROBLEM'), 'real_evaluations', kwargs['EVALUATIONS'])
+
+
+def _best_objective(kwargs: dict) -> float | None:
+    # SOLUTIONS is a single solution in CellularGeneticAlgorithm and SimulatedAnnealing (the best one or the current one)
+    solutions = kwargs.get('SOLUTIONS')
+    if solutions is None:
+        return None
+    if not isinstance(solutions, list):
+        solutions = [solutions]
+    return min((solution.objectives[0] for solution in solutions), default=None)
+
+
+class StoppingByWallClock(TerminationCriterion):
+    """
+    Stops when the run has taken max_seconds (COMPUTING_TIME, since the algorithm started). Unlike StoppingByTime, it can
+    anticipate the next step: it stops as soon as one more step of the average duration would go past max_seconds,
+    so that the run ends before the deadline instead of up to one (long) evaluation after it.
+
+    :param float max_seconds: Wall-clock budget of the run.
+    :param bool anticipate: Whether to stop one average step early.
+    """
+    def __init__(self, max_seconds: float, anticipate: bool = True):
+        super(StoppingByWallClock, self).__init__()
+        self.max_seconds = max_seconds
+        self.anticipate = anticipate
+        self.seconds = 0.0
+        self.steps = 0
+        self.first_seconds = None
+
+    def update(self, *args, **kwargs):
+        self.seconds = kwargs['COMPUTING_TIME']
+        if self.first_seconds is None:
+            # The first update comes after evaluating the initial solutions, which does not say how long a step takes
+            self.first_seconds = self.seconds
+        else:
+            self.steps += 1
+
+    @property
+    def average_step(self) -> float:
+        return (self.seconds - self.first_seconds) / self.steps if self.steps else 0.0
+
+    @property
+    def is_met(self):
+        margin = self.average_step if self.anticipate else 0.0
+        return self.seconds + margin >= self.max_seconds
+
+
+class StoppingByToolCpuTime(TerminationCriterion):
+    """
+    Stops when the external tools (opt, clang++, the benchmarks) have used max_cpu_seconds of CPU time, as accumulated by
+    the fitness function of the problem (FitnessFunction.tool_cpu_seconds). Unlike the wall clock, it does not depend on
+    the load of the machine, so it is comparable between runs.
+
+    :param float max_cpu_seconds: CPU budget of the tools.
+    """
+    def __init__(self, max_cpu_seconds: float):
+        super(StoppingByToolCpuTime, self).__init__()
+        self.max_cpu_seconds = max_cpu_seconds
+        self.cpu_seconds = 0.0
+
+    def update(self, *args, **kwargs):
+        fitness_function = getattr(kwargs.get('PROBLEM'), 'fitness_function', None)
+        self.cpu_seconds = getattr(fitness_function, 'tool_cpu_seconds', 0.0)
+
+    @property
+    def is_met(self):
+        return self.cpu_seconds >= self.max_cpu_seconds
+
+
+class StoppingByRealEvaluations(TerminationCriterion):
+    """
+    Stops after max_evaluations evaluations that actually ran the fitness function: the solutions found in the fitness
+    archive do not count (StoppingByEvaluations counts them all).
+
+    :param int max_evaluations: Budget of real evaluations.
+    """
+    def __init__(self, max_evaluations: int):
+        super(StoppingByRealEvaluations, self).__init__()
+        self.max_evaluations = max_evaluations
+        self.evaluations = 0
+
+    def update(self, *args, **kwargs):
+        self.evaluations = _real_evaluations(kwargs)
+
+    @property
+    def is_met(self):
+        return self.evaluations >= self.max_evaluations
+
+
+class StoppingByStagnation(TerminationCriterion):
+    """
+    Stops when the best fitness value seen (minimization) has not improved by more than min_improvement in the last
+    max_evaluations real evaluations.
+
+    :param int max_evaluations: Real evaluations without improvement before stopping.
+    :param float min_improvement: Smallest decrease of the best fitness value that counts as an improvement.
+    """
+    def __init__(self, max_evaluations: int, min_improvement: float = 0.0):
+        super(StoppingByStagnation, self).__init__()
+        self.max_evaluations = max_evaluations
+        self.min_improvement = min_improvement
+        self.best = None
+        self.evaluations = 0
+        self.last_improvement = 0
+
+    def update(self, *args, **kwargs):
+        self.evaluations = _real_evaluations(kwargs)
+        best = _best_objective(kwargs)
+        if best is not None and (self.best is None or best < self.best - self.min_improvement):
+            self.best = best
+            self.last_improvement = self.evaluations
+
+    @property
+    def is_met(self):
+        return self.evaluations - self.last_improvement >= self.max_evaluations
+
+
+class _CompositeTerminationCriterion(TerminationCriterion):
+    # Every criterion receives the updates, also the ones that are already met
+    def __init__(self, *criteria: TerminationCriterion):
+        super(_CompositeTerminationCriterion, self).__init__()
+        self.criteria = list(criteria)
+
+    def update(self, *args, **kwargs):
+        for criterion in self.criteria:
+            criterion.update(*args, **kwargs)
+
+
+class AndTerminationCriterion(_CompositeTerminationCriterion):
+    """
+    Met when all the criteria are met.
+    """
+    @property
+    def is_met(self):
+        return all(criterion.is_met for criterion in self.criteria)
+
+
+class OrTerminationCriterion(_CompositeTerminationCriterion):
+    """
+    Met when any of the criteria is met (e.g. a wall-clock budget or stagnation, whatever comes first).
+    """
+    @property
+    def is_met(self):
+        return any(criterion.is_met for criterion in self.criteria)
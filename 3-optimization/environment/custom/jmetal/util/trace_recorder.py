@@ -0,0 +1,100 @@
+import json
+import os
+from pathlib import Path
+import socket
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+"""
+.. module:: trace_recorder
+   :platform: Unix, Windows
+   :synopsis: Chrome/Perfetto trace events for the evaluation pipeline.
+.. moduleauthor:: Carlos Benito-Jareño <carlos.benito@uca.es>
+"""
+
+_NULL_SPAN = nullcontext()
+
+
+class TraceRecorder():
+    """
+    Records spans of the evaluation pipeline as Chrome trace events ("JSON Array Format"), which can be
+    opened with chrome://tracing or https://ui.perfetto.dev.
+    Events are appended to the trace file as soon as they finish, so several workers can share the same
+    file and an interrupted run still leaves a readable trace (the closing bracket is optional in this format).
+    Timestamps come from time.perf_counter, the same clock used to measure the duration of every command.
+    When no trace file is given the recorder is disabled and every call returns immediately.
+
+    :param str trace_file: Path to the trace output file. None to disable tracing.
+    :param str worker_id: Identifier of the worker that records the spans. Defaults to <hostname>-<pid>.
+    """
+    def __init__(self, trace_file: str = None, worker_id: str = None):
+        self.trace_file = trace_file
+        self.enabled = trace_file is not None
+        self.worker_id = worker_id
+        self._default_worker_id = worker_id is None
+        self._pid = None
+
+        if self.enabled:
+            Path(os.path.dirname(self.trace_file) or '.').mkdir(parents=True, exist_ok=True)
+            if not os.path.exists(self.trace_file) or os.path.getsize(self.trace_file) == 0:
+                with open(self.trace_file, 'w') as f:
+                    f.write('[\n')
+
+    def _write(self, event: dict) -> None:
+        # The pid is resolved lazily so that recorders copied into worker processes report their own pid
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            if self._default_worker_id:
+                self.worker_id = f'{socket.gethostname()}-{pid}'
+            self._append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': self.worker_id}})
+        event['pid'] = pid
+        event['tid'] = threading.get_native_id()
+        event['args']['worker'] = self.worker_id
+        self._append(event)
+
+    def _append(self, event: dict) -> None:
+        with open(self.trace_file, 'a') as f:
+            f.write(json.dumps(event) + ',\n')
+
+    def complete(self, name: str, start: float, finish: float, candidate: str = None, **args) -> None:
+        """
+        Record a span that has already finished.
+
+        :param str name: Name of the span (opt, clang++, benchmark attempt...).
+        :param float start: time.perf_counter value at the beginning of the span.
+        :param float finish: time.perf_counter value at the end of the span.
+        :param str candidate: Key of the candidate solution being evaluated.
+        :param args: Extra arguments shown with the span.
+        """
+        if not self.enabled:
+            return
+        args['candidate'] = candidate
+        self._write({
+            'name': name,
+            'ph': 'X',
+            'ts': start * 1e6,
+            'dur': (finish - start) * 1e6,
+            'args': args
+        })
+
+    def span(self, name: str, candidate: str = None, **args):
+        """
+        Context manager that records the enclosed block as a span.
+
+        :param str name: Name of the span.
+        :param str candidate: Key of the candidate solution being evaluated.
+        :param args: Extra arguments shown with the span.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, candidate, args)
+
+    @contextmanager
+    def _span(self, name: str, candidate: str, args: dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter(), candidate, **args)
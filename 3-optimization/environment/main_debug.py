@@ -14,14 +14,23 @@ from datetime import datetime
 
 from custom.jmetal.algorithm.single_objective import CellularGeneticAlgorithm
 from custom.jmetal.algorithm.single_objective import SimulatedAnnealing
+from jmetal.algorithm.multiobjective import NSGAII
 from jmetal.util.neighborhood import L5
-from jmetal.operator.crossover import IntegerSBXCrossover
-from jmetal.operator.mutation import IntegerPolynomialMutation
+from custom.jmetal.operator import IntegerNPointCrossover, IntegerResetMutation, NoveltyFilter
 from custom.jmetal.problem.single_objective import LlvmRuntimeProblem
+from custom.jmetal.problem.multi_objective import LlvmMultiObjectiveProblem
 from custom.jmetal.fitness_function import DummyFitnessFunction
 from custom.jmetal.fitness_function import GodotRuntimeFitnessFunction
+from custom.jmetal.fitness_function import GodotMultiObjectiveFitnessFunction
+from custom.jmetal.fitness_function import SimulatedFitnessFunction
+from custom.jmetal.fitness_function import ReplayFitnessFunction
+from custom.jmetal.util import ArchivingMultiprocessEvaluator, ArtifactStore, PassCostModel, PassRegistry
+from custom.jmetal.util import (OrTerminationCriterion, StoppingByRealEvaluations, StoppingByStagnation,
+                               StoppingByToolCpuTime, StoppingByWallClock)
 from jmetal.util.termination_criterion import StoppingByEvaluations
 from jmetal.util.observer import ProgressBarObserver, BasicObserver
+from jmetal.util.evaluator import SequentialEvaluator
+from jmetal.util.solution import get_non_dominated_solutions, print_function_values_to_file, print_variables_to_file
 
 
 
@@ -32,10 +41,11 @@ timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
 # Get required arguments: algorithm and seed
 if len(sys.argv) < 4:
-    print("ERROR --- Usage: python run_optimizer.py <ga|sa> <seed> <fitness_archive_file>")
+    print("ERROR --- Usage: python run_optimizer.py <ga|sa|nsgaii> <seed> <fitness_archive_file>")
     print("  Example: python run_optimizer.py ga 42 fitness_archive-20250723_144639.json")
     print("    ga: (Cellular) Genetic Algorithm")
     print("    sa: Simulated Annealing")
+    print("    nsgaii: NSGA-II (multi-objective: runtime frente a tiempo de compilación y/o tamaño del binario)")
     print("    seed: Integer seed for reproducibility")
     print("    fitness_archive_file: Path to a JSON file with fitness values of already evaluated solutions. Use an empty string to skip this feature.")
     sys.exit(1)
@@ -64,19 +74,45 @@ opt_timeout = 5 * 60        # Con 30 passes, nunca me ha tardado más de 3 min r
 clang_timeout = 15 * 60     # Nunca me ha tardado más de 15 min
 benchmark = 'animation/animation_tree/animation_tree_quads'    # Bastante estable entre ejecuciones y máquinas
 benchmark_statistic = 'render_cpu'  # Va en conjunción del benchmark en sí
+benchmark_aggregation = 'geomean'   # Si benchmark lleva varios separados por coma (un solo lanzamiento): 'geomean' o 'sum'
 benchmark_timeout = 1 * 60  # Timeout de una ejecución, no de las 5
 godot_benchmarks_repo_path = '/home/fedora/Carlos/godot-benchmarks'
 max_evaluations = 1000
+max_wall_clock_hours = None     # Además de max_evaluations, se para con lo primero que se cumpla de lo siguiente (None = sin límite)
+max_tool_cpu_hours = None       # Horas de CPU de opt, clang++ y los benchmarks
+max_real_evaluations = None     # Evaluaciones que no salen del fitness archive
+stagnation_evaluations = None   # Evaluaciones reales seguidas sin mejorar la mejor solución
+trace = False               # Timeline Chrome/Perfetto de cada evaluación en ./data/trace (abrir con ui.perfetto.dev)
+pass_manager = 'legacy'     # 'legacy' (flags de los passes de -O1) o 'newpm' (pipeline -passes=... con function(...), loop(...) y cgscc(...))
+reference_binary = None     # Binario de referencia (p. ej. el de -O3) para medir por pares intercalados; None para el peor de 5
+counters = None             # Contadores de cada lanzamiento: 'perf', 'rusage' (sin perf), 'auto' o None para no medirlos
+counter_fitness = None      # Contador como fitness en vez de benchmark_statistic (p. ej. 'instructions', mucho menos ruidoso)
+counter_tiebreak = None     # Contador que solo desempata soluciones con el mismo valor de benchmark_statistic
+benchmark_executions = 5    # Lanzamientos por evaluación (con counter_fitness suelen bastar menos)
+artifacts_top_k = 0         # Binarios de las K mejores soluciones guardados en ./data/artifacts (0 para no guardar nada)
+artifacts_max_gb = 20       # Presupuesto de disco del almacén; se desalojan las peores soluciones
+time_passes = False         # opt con -time-passes: tiempos de cada pass en el fichero de stats
+compile_time_budget = None  # Segundos de opt + clang++ previstos que puede tardar una solución (ga y sa); None para no limitar
+budget_policy = 'reject'    # Con las que lo superan: 'reject' (no se evalúan) o 'penalize' (se evalúan y se empeora su fitness)
+cost_model_file = ''        # Modelo de costes de una ejecución anterior (./data/fitness/cost_model) para no empezar de cero
 
 # Common algorithm parameters
+novelty_max_attempts = 100  # Reintentos de cruce/mutación hasta dar con una solución que no esté en el fitness archive
+novelty = NoveltyFilter(max_attempts=novelty_max_attempts)  # Se le asigna el fitness archive del problema más abajo
 mutation_probability = 0.1  # Mutamos, en promedio, 1 de cada 10 passes (es decir, 3 de los 30 que tenemos)
-mutation_distribution_index = 1.0
-mutation = IntegerPolynomialMutation(probability=mutation_probability, distribution_index=mutation_distribution_index)
-    # distribution_index=0.2 por defecto es BUG???
-    # a mi el distribution_index me da igual realmente, porque no hay distancia entre los valores de las variables (el pass que sea)
-    # con 1.0 se supone que obtengo una distribucion bastante uniforme (chatgpt)
-    # a efectos practicos, creo que estoy aplicando la mutacion simple esa que teniamos custom
-termination_criterion = StoppingByEvaluations(max_evaluations=max_evaluations)
+mutation = IntegerResetMutation(probability=mutation_probability, novelty=novelty)
+    # Cambia el pass por otro cualquiera: no hay distancia entre los valores de las variables (el pass que sea),
+    # así que ya no usamos IntegerPolynomialMutation (también hay IntegerSwapMutation e IntegerInsertMutation)
+termination_criteria = [StoppingByEvaluations(max_evaluations=max_evaluations)]
+if max_wall_clock_hours is not None:
+    termination_criteria.append(StoppingByWallClock(max_seconds=max_wall_clock_hours * 3600))
+if max_tool_cpu_hours is not None:
+    termination_criteria.append(StoppingByToolCpuTime(max_cpu_seconds=max_tool_cpu_hours * 3600))
+if max_real_evaluations is not None:
+    termination_criteria.append(StoppingByRealEvaluations(max_evaluations=max_real_evaluations))
+if stagnation_evaluations is not None:
+    termination_criteria.append(StoppingByStagnation(max_evaluations=stagnation_evaluations))
+termination_criterion = termination_criteria[0] if len(termination_criteria) == 1 else OrTerminationCriterion(*termination_criteria)
 
 # GA-specific parameters
 population_size = 9         # !!! Decidir tamano poblacion
@@ -84,9 +120,23 @@ neighborhood_rows = 3       # !!! Decidir forma poblacion
 neighborhood_columns = 3
 neighborhood = L5(rows=neighborhood_rows, columns=neighborhood_columns)
 crossover_probability = 1.0
-crossover_distribution_index = 1.0
-crossover = IntegerSBXCrossover(probability=crossover_probability, distribution_index=crossover_distribution_index)  # !!! Confirmar que escojo este cruce, y que parametros (existe un TPX porai también, creo que custom)
-    # aqui he puesto tambien el 1.0...
+crossover_points = 2        # Cruce de dos puntos (el TPX); también está IntegerUniformCrossover
+crossover = IntegerNPointCrossover(probability=crossover_probability, points=crossover_points, novelty=novelty)
+
+# NSGA-II-specific parameters
+objectives = ['runtime', 'compile_time']    # 'runtime', 'compile_time' y/o 'binary_size' (al menos dos)
+nsgaii_population_size = 20
+nsgaii_offspring_population_size = 20
+parallel_processes = 1      # Procesos evaluando a la vez (cada uno con su copia de godot_source); los benchmarks compiten por la máquina
+
+if algorithm_choice == 'nsgaii':
+    # Con nsgaii el tiempo de compilación es un objetivo, no un presupuesto, y el almacén de binarios no admite varios procesos
+    if compile_time_budget is not None:
+        print("ERROR --- compile_time_budget is not used by nsgaii (add 'compile_time' to objectives instead).")
+        sys.exit(1)
+    if artifacts_top_k > 0 and parallel_processes > 1:
+        print("ERROR --- artifacts_top_k requires parallel_processes = 1.")
+        sys.exit(1)
 
 # problem = GodotProblem(
 #     n_passes_in_solution=n_passes_in_solution,
@@ -98,8 +148,30 @@ crossover = IntegerSBXCrossover(probability=crossover_probability, distribution_
 #     benchmark_timeout=benchmark_timeout,
 # )
 
+artifact_store = None
+if artifacts_top_k > 0:
+    artifact_store = ArtifactStore(f'./data/artifacts/{timestamp}', top_k=artifacts_top_k,
+                                   max_bytes=int(artifacts_max_gb * 1024**3))
+
+cost_model = None
+if cost_model_file:
+    cost_model = PassCostModel.load(cost_model_file)
+elif compile_time_budget is not None:
+    cost_model = PassCostModel(len(PassRegistry.get('newpm' if pass_manager == 'newpm' else 'legacy-o1')))
+
 # fitness_function = DummyFitnessFunction(delay=0.1)
-fitness_function = GodotRuntimeFitnessFunction(
+# Simulador (sin Godot ni LLVM): tiempos y fallos de las etapas sacados de los stats de ejecuciones reales, 1000 veces más rápido
+# fitness_function = SimulatedFitnessFunction(['../results/1-final/*/data/fitness/stats/fitness_stats-*.json'],
+#                                             seed=seed, time_scale=1000, pass_manager=pass_manager, timestamp=timestamp)
+# Repetición de evaluaciones reales ya archivadas (para ajustar los parámetros de los algoritmos en minutos); las soluciones
+# que no están en los archivos se estiman con los vecinos más cercanos ('nearest') o con un modelo lineal ('surrogate')
+# fitness_function = ReplayFitnessFunction(['../results/1-final/minisforum1/data/fitness/fitness-20250729_112042.json',
+#                                           '../results/1-final/minisforum2/data/fitness/fitness-20250729_111928.json',
+#                                           '../results/1-final/minisforum3/data/fitness/fitness-20250729_111633.json'],
+#                                          fallback='nearest')
+# Con nsgaii, la misma evaluación pero devolviendo también el tiempo de opt + clang++ y el tamaño del binario
+godot_fitness_function_class = GodotMultiObjectiveFitnessFunction if algorithm_choice == 'nsgaii' else GodotRuntimeFitnessFunction
+fitness_function = godot_fitness_function_class(
     godot_source_path=godot_source_path,
     opt_timeout=opt_timeout,
     clang_timeout=clang_timeout,
@@ -107,16 +179,39 @@ fitness_function = GodotRuntimeFitnessFunction(
     benchmark_statistic=benchmark_statistic,
     benchmark_timeout=benchmark_timeout,
     godot_benchmarks_repo_path=godot_benchmarks_repo_path,
-    timestamp=timestamp
-)
-
-problem = LlvmRuntimeProblem(
-    n_passes_in_solution=n_passes_in_solution,
-    fitness_function=fitness_function,
-    fitness_archive_file=fitness_archive_file,
     timestamp=timestamp,
+    trace=trace,
+    pass_manager=pass_manager,
+    reference_binary=reference_binary,
+    benchmark_aggregation=benchmark_aggregation,
+    artifact_store=artifact_store,
+    counters=counters,
+    counter_fitness=counter_fitness,
+    counter_tiebreak=counter_tiebreak,
+    benchmark_executions=benchmark_executions,
+    time_passes=time_passes,
+    cost_model=cost_model
 )
 
+if algorithm_choice == 'nsgaii':
+    problem = LlvmMultiObjectiveProblem(
+        n_passes_in_solution=n_passes_in_solution,
+        fitness_function=fitness_function,
+        fitness_archive_file=fitness_archive_file,
+        timestamp=timestamp,
+        objectives=objectives,
+    )
+else:
+    problem = LlvmRuntimeProblem(
+        n_passes_in_solution=n_passes_in_solution,
+        fitness_function=fitness_function,
+        fitness_archive_file=fitness_archive_file,
+        timestamp=timestamp,
+        compile_time_budget=compile_time_budget,
+        budget_policy=budget_policy,
+    )
+novelty.archive = problem.fitness_archive   # El mismo dict, para que vea las soluciones que se van evaluando
+
 if algorithm_choice == 'ga':
     algorithm = CellularGeneticAlgorithm(
         timestamp=timestamp,
@@ -134,8 +229,18 @@ elif algorithm_choice == 'sa':
         mutation=mutation,
         termination_criterion=termination_criterion,
     )
+elif algorithm_choice == 'nsgaii':
+    algorithm = NSGAII(
+        problem=problem,
+        population_size=nsgaii_population_size,
+        offspring_population_size=nsgaii_offspring_population_size,
+        mutation=mutation,
+        crossover=crossover,
+        termination_criterion=termination_criterion,
+        population_evaluator=ArchivingMultiprocessEvaluator(parallel_processes) if parallel_processes > 1 else SequentialEvaluator(),
+    )
 else:
-    print("ERROR --- Unknown algorithm. Use 'ga' or 'sa'.")
+    print("ERROR --- Unknown algorithm. Use 'ga', 'sa' or 'nsgaii'.")
     sys.exit(1)
 
 progress_bar_observer = ProgressBarObserver(max=max_evaluations)
@@ -153,6 +258,9 @@ observable_data = algorithm.observable_data()
 # Print to console
 print(result)
 print(observable_data)
+if isinstance(fitness_function, ReplayFitnessFunction):
+    print(f"Replay: {fitness_function.fallbacks} de {fitness_function.queries} consultas no estaban en los archivos "
+          f"({fitness_function.fallback_rate:.1%}, estimadas con '{fitness_function.fallback}')")
 
 # Prepare output folder
 output_dir = "data"
@@ -171,6 +279,12 @@ Path(os.path.dirname(config_filename)).mkdir(parents=True, exist_ok=True)
 with open(result_filename, "w") as result_file:
     result_file.write(str(result))
 
+# Frente de Pareto (objetivos y passes de las soluciones no dominadas), en el formato de jMetal
+if algorithm_choice == 'nsgaii':
+    front = get_non_dominated_solutions(result)
+    print_function_values_to_file(front, os.path.join(output_dir, 'result', f"FUN_{algorithm_choice}_{timestamp}.txt"))
+    print_variables_to_file(front, os.path.join(output_dir, 'result', f"VAR_{algorithm_choice}_{timestamp}.txt"))
+
 # with open(observable_filename, "w") as observable_file:
 #     json.dump(observable_data, observable_file, indent=2)
 
@@ -185,10 +299,28 @@ config_data = {
     "clang_timeout": clang_timeout,
     "benchmark": benchmark,
     "benchmark_statistic": benchmark_statistic,
+    "benchmark_aggregation": benchmark_aggregation,
     "benchmark_timeout": benchmark_timeout,
     "max_evaluations": max_evaluations,
+    "max_wall_clock_hours": max_wall_clock_hours,
+    "max_tool_cpu_hours": max_tool_cpu_hours,
+    "max_real_evaluations": max_real_evaluations,
+    "stagnation_evaluations": stagnation_evaluations,
+    "trace": trace,
+    "pass_manager": pass_manager,
+    "reference_binary": reference_binary,
+    "counters": counters,
+    "counter_fitness": counter_fitness,
+    "counter_tiebreak": counter_tiebreak,
+    "benchmark_executions": benchmark_executions,
+    "artifacts_top_k": artifacts_top_k,
+    "artifacts_max_gb": artifacts_max_gb,
+    "time_passes": time_passes,
+    "compile_time_budget": compile_time_budget,
+    "budget_policy": budget_policy,
+    "cost_model_file": cost_model_file,
     "mutation_probability": mutation_probability,
-    "mutation_distribution_index": mutation_distribution_index,
+    "novelty_max_attempts": novelty_max_attempts,
     "mutation_operator": mutation.__class__.__name__,
 }
 
@@ -199,10 +331,20 @@ if algorithm_choice == 'ga':
         "neighborhood_rows": neighborhood_rows,
         "neighborhood_columns": neighborhood_columns,
         "crossover_probability": crossover_probability,
-        "crossover_distribution_index": crossover_distribution_index,
+        "crossover_points": crossover_points,
         "crossover_operator": crossover.__class__.__name__,
         "neighborhood_operator": neighborhood.__class__.__name__,
     })
+elif algorithm_choice == 'nsgaii':
+    config_data.update({
+        "objectives": objectives,
+        "population_size": nsgaii_population_size,
+        "offspring_population_size": nsgaii_offspring_population_size,
+        "parallel_processes": parallel_processes,
+        "crossover_probability": crossover_probability,
+        "crossover_points": crossover_points,
+        "crossover_operator": crossover.__class__.__name__,
+    })
 
 with open(config_filename, "w") as config_file:
     json.dump(config_data, config_file, indent=2)
\ No newline at end of file
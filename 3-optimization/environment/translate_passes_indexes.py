@@ -1,24 +1,26 @@
 import sys
 
-from custom.jmetal.util import LlvmUtils
+from custom.jmetal.util import PassRegistry
 
-def translate_passes_indexes(passes_indexes: list[int]) -> str:
+def translate_passes_indexes(passes_indexes: list[int], flavour: str = 'legacy-o1') -> str:
     """
     Translates a sequence of LLVM passes expressed as a list of indexes into a string of pass names.
 
     :param passes_indexes: List of integers representing the indexes of LLVM passes.
+    :param flavour: Pass catalogue the indexes refer to (legacy-o1, legacy-all or newpm).
     """
     if not passes_indexes:
         return ''
 
-    return ' '.join(LlvmUtils.get_passes()[index] for index in passes_indexes)
+    return PassRegistry.get(flavour).to_pipeline(passes_indexes)
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print('Usage: python translate_passes_indexes.py "[<index1>, <index2>, ...]"')
+        print('Usage: python translate_passes_indexes.py "[<index1>, <index2>, ...]" [legacy-o1|legacy-all|newpm]')
         sys.exit(1)
 
     passes_indexes = sys.argv[1].strip('[]').split(',')
     passes_indexes = [int(index.strip()) for index in passes_indexes]
-    translated_passes = translate_passes_indexes(passes_indexes)
+    flavour = sys.argv[2] if len(sys.argv) > 2 else 'legacy-o1'
+    translated_passes = translate_passes_indexes(passes_indexes, flavour)
     print(translated_passes)
\ No newline at end of file
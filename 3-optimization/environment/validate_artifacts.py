@@ -0,0 +1,154 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+from custom.jmetal.fitness_function.godot_runtime_fitness_function import (BENCHMARK_AGGREGATIONS,
+                                                                           aggregate_benchmark_values,
+                                                                           parse_benchmark_results)
+from custom.jmetal.util import ArtifactStore
+
+def benchmark_binary(binary: str, workdir: str, benchmarks: list[str], statistic: str, repetitions: int,
+                     godot_benchmarks_repo_path: str, timeout: float, aggregation: str = 'geomean') -> dict:
+    """
+    Runs the benchmarks of a binary many times (one launch per repetition) and summarizes the statistic.
+
+    :param binary: Path to the Godot binary.
+    :param workdir: Folder for the JSON output of every repetition.
+    :param benchmarks: Benchmark paths (or glob patterns) run in every launch.
+    :param statistic: Benchmark statistic to summarize.
+    :param repetitions: Number of launches.
+    :param godot_benchmarks_repo_path: Path to the godot-benchmarks repository (working directory of the binary).
+    :param timeout: Timeout of one launch.
+    :param aggregation: How to combine the values of several benchmarks (geomean or sum).
+    :return: Measured values, their median, mean, standard deviation and worst value, and the number of failed launches.
+    """
+    Path(workdir).mkdir(parents=True, exist_ok=True)
+    values = []
+    failures = 0
+    for i in range(1, repetitions + 1):
+        json_path = os.path.join(workdir, f'repetition_{i}.json')
+        command = [binary, '--', '--run-benchmarks', f'--include-benchmarks={",".join(benchmarks)}',
+                   f'--save-json={json_path}']
+        try:
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=godot_benchmarks_repo_path,
+                           timeout=timeout, check=True)
+        except subprocess.SubprocessError:
+            failures += 1
+            continue
+        results = parse_benchmark_results(json_path, benchmarks)
+        benchmark_values = None if results is None else [r.get(statistic) for r in results.values()]
+        if not benchmark_values or None in benchmark_values:
+            failures += 1
+            continue
+        values.append(aggregate_benchmark_values(benchmark_values, aggregation))
+
+    summary = {'values': values, 'failures': failures}
+    if values:
+        summary.update({
+            'median': float(np.median(values)),
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values)),
+            'worst': float(np.max(values))
+        })
+    return summary
+
+def validate_artifacts(store_path: str, base_binaries_path: str, name: str, top: int, repetitions: int, jobs: int,
+                       godot_benchmarks_repo_path: str, timeout: float, benchmarks: list[str] = None,
+                       statistic: str = None, aggregation: str = 'geomean') -> list[dict]:
+    """
+    Re-benchmarks the best solutions of an artifact store with many more repetitions than during the search and publishes
+    them, ranked by the median of the validation, into the base_binaries layout: <base_binaries>/<name>_<rank>/ with the
+    binary (<name>_<rank>.out), the bitcode if it was kept, and solution.json (passes, search fitness and validation).
+    With a single solution the folder is just <name>/, as base_binaries/cga and base_binaries/sa.
+
+    :param store_path: Folder of the ArtifactStore.
+    :param base_binaries_path: base_binaries folder of the godot-benchmarks project.
+    :param name: Prefix of the published folders (e.g. cga or sa).
+    :param top: Number of solutions to validate, starting from the best search fitness.
+    :param repetitions: Launches of every binary.
+    :param jobs: Binaries benchmarked at the same time.
+    :param godot_benchmarks_repo_path: Path to the godot-benchmarks repository.
+    :param timeout: Timeout of one launch.
+    :param benchmarks: Benchmarks to run (by default, the ones each solution was searched with).
+    :param statistic: Statistic to rank by (by default, the one each solution was searched with).
+    :param aggregation: How to combine the values of several benchmarks (geomean or sum).
+    :return: Published entries, from the best validated solution to the worst.
+    """
+    store = ArtifactStore(store_path)
+    ranking = store.ranking()[:top]
+    if not ranking:
+        raise ValueError(f'{store_path} has no solutions')
+
+    def validate(position: int, item: tuple[str, dict]) -> dict:
+        solution, entry = item
+        metadata = entry['metadata']
+        solution_benchmarks = benchmarks or metadata.get('benchmarks')
+        solution_statistic = statistic or metadata.get('benchmark_statistic')
+        if not solution_benchmarks or not solution_statistic:
+            raise ValueError(f'No benchmarks or statistic to validate {solution} with')
+        # One folder per solution: different sequences may share the same binary
+        workdir = os.path.join(store_path, 'validation', str(position))
+        validation = benchmark_binary(store.object_path(entry['binary']), workdir, solution_benchmarks,
+                                      solution_statistic, repetitions, godot_benchmarks_repo_path, timeout, aggregation)
+        validation.update({'benchmarks': solution_benchmarks, 'statistic': solution_statistic})
+        return {'solution': solution, 'entry': entry, 'validation': validation}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        validated = list(executor.map(validate, range(len(ranking)), ranking))
+    validated.sort(key=lambda v: v['validation'].get('median', sys.float_info.max))
+
+    for rank, result in enumerate(validated, start=1):
+        folder_name = name if len(validated) == 1 else f'{name}_{rank}'
+        folder = os.path.join(base_binaries_path, folder_name)
+        Path(folder).mkdir(parents=True, exist_ok=True)
+        entry = result['entry']
+        shutil.copy2(store.object_path(entry['binary']), os.path.join(folder, f'{folder_name}.out'))
+        if entry['bitcode']:
+            shutil.copy2(store.object_path(entry['bitcode']), os.path.join(folder, f'{folder_name}.bc'))
+        with open(os.path.join(folder, 'solution.json'), 'w') as f:
+            json.dump({
+                'solution': result['solution'],
+                'rank': rank,
+                'search_fitness': entry['fitness'],
+                'metadata': entry['metadata'],
+                'validation': result['validation']
+            }, f, indent=2)
+        result['folder'] = folder
+    return validated
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validate the best solutions of an artifact store with many repetitions '
+                                                 'and publish them into the base_binaries layout.')
+    parser.add_argument('store', help='Folder of the artifact store')
+    parser.add_argument('--base-binaries', required=True, help='base_binaries folder to publish into')
+    parser.add_argument('--name', required=True, help='Prefix of the published folders (e.g. cga or sa)')
+    parser.add_argument('--godot-benchmarks', required=True, help='Path to the godot-benchmarks repository')
+    parser.add_argument('--top', type=int, default=5, help='Solutions to validate (default: 5)')
+    parser.add_argument('--repetitions', type=int, default=30, help='Launches of every binary (default: 30)')
+    parser.add_argument('--jobs', type=int, default=1, help='Binaries benchmarked at the same time (default: 1)')
+    parser.add_argument('--timeout', type=float, default=60, help='Timeout of one launch in seconds (default: 60)')
+    parser.add_argument('--benchmarks', help='Comma-separated benchmarks (default: the ones used in the search)')
+    parser.add_argument('--statistic', help='Statistic to rank by (default: the one used in the search)')
+    parser.add_argument('--aggregation', default='geomean', choices=BENCHMARK_AGGREGATIONS,
+                        help='How to combine several benchmarks')
+    args = parser.parse_args()
+
+    try:
+        validated = validate_artifacts(args.store, args.base_binaries, args.name, args.top, args.repetitions, args.jobs,
+                                       args.godot_benchmarks, args.timeout,
+                                       args.benchmarks.split(',') if args.benchmarks else None,
+                                       args.statistic, args.aggregation)
+    except ValueError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+    for result in validated:
+        validation = result['validation']
+        print(f'{result["folder"]}: median {validation.get("median")} over {len(validation["values"])} repetitions '
+              f'({validation["failures"]} failed), search fitness {result["entry"]["fitness"]}')
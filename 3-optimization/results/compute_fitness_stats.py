@@ -1,84 +1,253 @@
 import argparse
 import json
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterator
 
-def load_stats(path: Path) -> dict:
+import numpy as np
+
+STEPS = ["opt", "clang", "benchmark"]
+COLUMNS = STEPS + ["total"]
+PERCENTILES = [50, 90, 95, 99]
+STATS_PATTERN = "fitness_stats-*.json"
+
+def iter_stats_records(path: Path, chunk_size: int = 1 << 20) -> Iterator[tuple[str, dict]]:
+    """
+    Recorre un fichero fitness_stats registro a registro, sin cargar el JSON completo en memoria.
+    Las salidas capturadas ("output") se descartan en cuanto se decodifica cada registro.
+    """
+    decoder = json.JSONDecoder()
     with path.open("r", encoding="utf-8", errors="ignore") as f:
-        stats = json.load(f)
-    return stats
-
-def compute_individual_times(stats: dict, step: str) -> float:
-    time_values = [indiv[step]["duration"] for indiv in stats.values() if indiv[step]["success"]]
-    min_time = min(time_values) if time_values else 0.0
-    max_time = max(time_values) if time_values else 0.0
-    avg_time = sum(time_values) / len(time_values) if time_values else 0.0
-    stddev_time = (sum((x - avg_time) ** 2 for x in time_values) / len(time_values)) ** 0.5 if time_values else 0.0
-    return min_time, max_time, avg_time, stddev_time
-
-def compute_total_times(stats: dict) -> float:
-    total_times = [
-        indiv["opt"]["duration"] + indiv["clang"]["duration"] + indiv["benchmark"]["duration"]
-        for indiv in stats.values() if indiv["opt"]["success"] and indiv["clang"]["success"] and indiv["benchmark"]["success"]
-    ]
-    min_time = min(total_times) if total_times else 0.0
-    max_time = max(total_times) if total_times else 0.0
-    avg_time = sum(total_times) / len(total_times) if total_times else 0.0
-    stddev_time = (sum((x - avg_time) ** 2 for x in total_times) / len(total_times)) ** 0.5 if total_times else 0.0
-    return min_time, max_time, avg_time, stddev_time
-
-def count_unsuccessful(stats: dict, step: str) -> int:
-    return sum(1 for indiv in stats.values() if not indiv[step]["success"])
+        buffer = f.read(chunk_size)
+        position = 0
+        eof = not buffer
 
-def main() -> None:
-    p = argparse.ArgumentParser(
-        description="Graficar la evolución del fitness a partir de logs de GA o SA (detección automática)."
-    )
-    p.add_argument("log", type=Path, help="Ruta al archivo fitness_stats.txt")
-    args = p.parse_args()
+        def more() -> bool:
+            nonlocal buffer, position, eof
+            if eof:
+                return False
+            data = f.read(max(chunk_size, len(buffer) - position))
+            if not data:
+                eof = True
+                return False
+            # Solo se compacta (se descarta lo ya decodificado) al leer más, no tras cada registro
+            buffer = buffer[position:] + data
+            position = 0
+            return True
 
-    stats = load_stats(args.log)
-    opt_min_time, opt_max_time, opt_avg_time, opt_stddev_time = compute_individual_times(stats, "opt")
-    clang_min_time, clang_max_time, clang_avg_time, clang_stddev_time = compute_individual_times(stats, "clang")
-    benchmark_min_time, benchmark_max_time, benchmark_avg_time, benchmark_stddev_time = compute_individual_times(stats, "benchmark")
+        def skip(chars: str) -> str:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in chars:
+                    position += 1
+                if position < len(buffer) or not more():
+                    return buffer[position] if position < len(buffer) else ""
 
-    print("opt:")
-    print(f"\tTiempo mínimo: {opt_min_time:.2f} s")
-    print(f"\tTiempo máximo: {opt_max_time:.2f} s")
-    print(f"\tTiempo promedio: {opt_avg_time:.2f} s")
-    print(f"\tDesviación estándar: {opt_stddev_time:.2f} s")
-    print()
+        def decode():
+            nonlocal position
+            while True:
+                try:
+                    value, position = decoder.raw_decode(buffer, position)
+                    return value
+                except json.JSONDecodeError:
+                    if not more():
+                        raise
 
-    print("clang:")
-    print(f"\tTiempo mínimo: {clang_min_time:.2f} s")
-    print(f"\tTiempo máximo: {clang_max_time:.2f} s")
-    print(f"\tTiempo promedio: {clang_avg_time:.2f} s")
-    print(f"\tDesviación estándar: {clang_stddev_time:.2f} s")
-    print()
+        if skip(" \t\r\n") != "{":
+            raise ValueError(f"{path} no contiene un objeto JSON")
+        position += 1
+
+        while True:
+            token = skip(" \t\r\n,")
+            if token in ("}", ""):
+                return
+            key = decode()
+            if skip(" \t\r\n") != ":":
+                raise ValueError(f"{path}: se esperaba ':' tras la clave {key}")
+            position += 1
+            skip(" \t\r\n")
+            record = decode()
+            for step in STEPS:
+                if isinstance(record.get(step), dict):
+                    record[step].pop("output", None)
+            yield key, record
+
+def infer_machine(path: Path) -> str:
+    # Estructura habitual: <maquina>/data/fitness/stats/fitness_stats-<timestamp>.json
+    parts = path.resolve().parts
+    if len(parts) >= 5 and parts[-4] == "data":
+        return parts[-5]
+    return path.parent.name
+
+def load_stats(path: Path) -> dict:
+    """
+    Carga un fichero fitness_stats como arrays columnares: duraciones (NaN si la fase no tuvo éxito)
+    y éxitos por fase, con una columna extra "total" para los individuos que completaron las tres fases.
+    """
+    durations = []
+    successes = []
+    fitness = []
+    for _, record in iter_stats_records(path):
+        row_durations = []
+        row_successes = []
+        for step in STEPS:
+            stage = record.get(step) or {}
+            success = bool(stage.get("success"))
+            duration = stage.get("duration")
+            row_successes.append(success)
+            row_durations.append(duration if success and duration is not None else np.nan)
+        durations.append(row_durations)
+        successes.append(row_successes)
+        fitness.append(record.get("fitness_value", np.nan))
+
+    durations = np.array(durations, dtype=float).reshape(-1, len(STEPS))
+    successes = np.array(successes, dtype=bool).reshape(-1, len(STEPS))
+    all_success = successes.all(axis=1)
+    total = np.where(all_success, durations.sum(axis=1), np.nan)
+
+    return {
+        "file": str(path),
+        "machine": infer_machine(path),
+        "durations": np.column_stack([durations, total]),
+        "successes": np.column_stack([successes, all_success]),
+        "fitness": np.array(fitness, dtype=float),
+    }
+
+def compute_times(durations: np.ndarray) -> dict:
+    """
+    Calcula de una sola pasada (vectorizada por columnas) el mínimo, máximo, media, desviación estándar
+    y percentiles de cada fase, ignorando los individuos en los que la fase falló (NaN).
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        counts = np.count_nonzero(~np.isnan(durations), axis=0)
+        table = {
+            "min": np.nanmin(durations, axis=0) if len(durations) else np.full(len(COLUMNS), np.nan),
+            "max": np.nanmax(durations, axis=0) if len(durations) else np.full(len(COLUMNS), np.nan),
+            "mean": np.nanmean(durations, axis=0),
+            "stddev": np.nanstd(durations, axis=0),
+        }
+        percentiles = np.nanpercentile(durations, PERCENTILES, axis=0) if len(durations) else \
+            np.full((len(PERCENTILES), len(COLUMNS)), np.nan)
+    for q, row in zip(PERCENTILES, percentiles):
+        table[f"p{q}"] = row
 
-    print("benchmark:")
-    print(f"\tTiempo mínimo: {benchmark_min_time:.2f} s")
-    print(f"\tTiempo máximo: {benchmark_max_time:.2f} s")
-    print(f"\tTiempo promedio: {benchmark_avg_time:.2f} s")
-    print(f"\tDesviación estándar: {benchmark_stddev_time:.2f} s")
+    result = {}
+    for i, column in enumerate(COLUMNS):
+        result[column] = {"count": int(counts[i])}
+        for name, values in table.items():
+            value = float(values[i])
+            result[column][name] = None if np.isnan(value) else value
+    return result
+
+def summarize(runs: list[dict]) -> dict:
+    durations = np.concatenate([run["durations"] for run in runs])
+    successes = np.concatenate([run["successes"] for run in runs])
+    fitness = np.concatenate([run["fitness"] for run in runs])
+    times = compute_times(durations)
+    failures = np.count_nonzero(~successes, axis=0)
+    for i, column in enumerate(COLUMNS):
+        times[column]["failures"] = int(failures[i])
+
+    valid_fitness = fitness[np.isfinite(fitness) & (fitness < np.finfo(float).max)]
+    return {
+        "evaluations": int(len(durations)),
+        "stages": times,
+        "hypothetical_min_total": sum((times[s]["min"] or 0.0) for s in STEPS),
+        "hypothetical_max_total": sum((times[s]["max"] or 0.0) for s in STEPS),
+        "best_fitness": float(valid_fitness.min()) if len(valid_fitness) else None,
+    }
+
+def find_stats_files(paths: list[Path]) -> list[Path]:
+    # Los patrones como 1-final/* también traen otros ficheros (README.txt...), que se ignoran con un aviso
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(path.rglob(STATS_PATTERN)))
+        elif path.match(STATS_PATTERN):
+            files.append(path)
+        else:
+            print(f"Aviso: se ignora {path}, no es un fichero {STATS_PATTERN}", file=sys.stderr)
+    return files
+
+def print_summary(title: str, summary: dict) -> None:
+    def fmt(value):
+        return f"{value if value is not None else 0.0:.2f}"
+
+    stages = summary["stages"]
+    print(f"===== {title} ({summary['evaluations']} evaluaciones) =====")
+    for step in STEPS:
+        stage = stages[step]
+        print(f"{step}:")
+        print(f"\tTiempo mínimo: {fmt(stage['min'])} s")
+        print(f"\tTiempo máximo: {fmt(stage['max'])} s")
+        print(f"\tTiempo promedio: {fmt(stage['mean'])} s")
+        print(f"\tDesviación estándar: {fmt(stage['stddev'])} s")
+        print("\tPercentiles: " + ", ".join(f"p{q}={fmt(stage[f'p{q}'])} s" for q in PERCENTILES))
+        print()
+
+    print(f"Tiempo total mínimo (hipotético, mejores tiempos permitiendo individuos distintos): {summary['hypothetical_min_total']:.2f} s")
+    print(f"Tiempo total máximo (hipotético, peores tiempos permitiendo individuos distintos): {summary['hypothetical_max_total']:.2f} s")
     print()
 
-    print(f"Tiempo total mínimo (hipotético, mejores tiempos permitiendo individuos distintos): {opt_min_time + clang_min_time + benchmark_min_time:.2f} s")
-    print(f"Tiempo total máximo (hipotético, peores tiempos permitiendo individuos distintos): {opt_max_time + clang_max_time + benchmark_max_time:.2f} s")
+    total = stages["total"]
+    print(f"Mejor tiempo total (mejor individuo): {fmt(total['min'])} s")
+    print(f"Peor tiempo total (peor individuo): {fmt(total['max'])} s")
+    print(f"Tiempo total promedio: {fmt(total['mean'])} s")
+    print(f"Desviación estándar del tiempo total: {fmt(total['stddev'])} s")
+    print("Percentiles del tiempo total: " + ", ".join(f"p{q}={fmt(total[f'p{q}'])} s" for q in PERCENTILES))
     print()
 
-    min_total_time, max_total_time, avg_total_time, stddev_time = compute_total_times(stats)
-    print(f"Mejor tiempo total (mejor individuo): {min_total_time:.2f} s")
-    print(f"Peor tiempo total (peor individuo): {max_total_time:.2f} s")
-    print(f"Tiempo total promedio: {avg_total_time:.2f} s")
-    print(f"Desviación estándar del tiempo total: {stddev_time:.2f} s")
+    print(f"Fases de opt fallidas: {stages['opt']['failures']}")
+    print(f"Fases de clang fallidas (incluye los fallos de opt): {stages['clang']['failures']}")
+    print(f"Fases de benchmark fallidas (incluye los fallos de opt y clang): {stages['benchmark']['failures']}")
     print()
 
-    opt_failures = count_unsuccessful(stats, "opt")
-    clang_failures = count_unsuccessful(stats, "clang")
-    benchmark_failures = count_unsuccessful(stats, "benchmark")
-    print(f"Fases de opt fallidas: {opt_failures}")
-    print(f"Fases de clang fallidas (incluye los fallos de opt): {clang_failures}")
-    print(f"Fases de benchmark fallidas (incluye los fallos de opt y clang): {benchmark_failures}")
+def main() -> None:
+    p = argparse.ArgumentParser(
+        description="Calcula estadísticas de tiempos por fase (opt, clang, benchmark) a partir de uno o varios ficheros fitness_stats."
+    )
+    p.add_argument("paths", type=Path, nargs="+",
+                   help="Ficheros fitness_stats-*.json o directorios donde buscarlos recursivamente (p. ej. 1-final/*)")
+    p.add_argument("--jobs", type=int, default=os.cpu_count(), help="Procesos para leer los ficheros en paralelo")
+    p.add_argument("--json", type=Path, help="Ruta donde guardar el resumen en formato JSON")
+    p.add_argument("--quiet", action="store_true", help="No mostrar el resumen de cada ejecución, solo los agregados")
+    args = p.parse_args()
+
+    files = find_stats_files(args.paths)
+    if not files:
+        p.error("No se ha encontrado ningún fichero fitness_stats")
+
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(files)))) as executor:
+        runs = list(executor.map(load_stats, files))
+
+    output = {"runs": [], "machines": {}, "all": None}
+    for run in runs:
+        summary = summarize([run])
+        output["runs"].append({"file": run["file"], "machine": run["machine"], **summary})
+        if not args.quiet:
+            print_summary(f"{run['machine']} - {Path(run['file']).name}", summary)
+
+    machines = sorted({run["machine"] for run in runs})
+    if len(runs) > 1:
+        for machine in machines:
+            machine_runs = [run for run in runs if run["machine"] == machine]
+            output["machines"][machine] = summarize(machine_runs)
+            if len(machine_runs) > 1 and len(machines) > 1:
+                print_summary(f"Máquina {machine} ({len(machine_runs)} ejecuciones)", output["machines"][machine])
+        output["all"] = summarize(runs)
+        print_summary(f"TOTAL ({len(runs)} ejecuciones, {len(machines)} máquinas)", output["all"])
+    else:
+        output["machines"][machines[0]] = output["all"] = output["runs"][0]
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        with args.json.open("w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"Resumen guardado en {args.json}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import argparse
+from datetime import datetime
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Perfilador del coste de cada pass de opt, en paralelo (sustituye a test_individual_passes.sh).
+# Cada trabajo ejecuta opt con un pass (o con una pareja de passes, con --pairs) sobre el mismo godot.bc, que opt
+# solo lee, así que no hace falta la copia fresca del script original. Por cada trabajo se guarda el tiempo real,
+# la CPU y el RSS máximo (wait4), el tamaño del IR de salida y si el pass ha cambiado el IR (hash de la salida
+# frente a la de `opt` sin passes). Los trabajos se admiten según la memoria disponible: cada uno reserva el mayor
+# RSS observado hasta el momento (o una estimación inicial a partir del tamaño del .bc).
+# Salidas: tabla de costes versionada (pass_costs-llvm<versión>.json), opt_times.csv y errors.log.
+
+CSV_HEADER = "pass,real_time_seconds,status"
+
+def read_passes(path):
+    """
+    Passes de un fichero de texto (uno por línea) o del array all_passes=(...) de un test_individual_passes.sh.
+    """
+    with open(path, "r") as f:
+        text = f.read()
+    match = re.search(r"all_passes=\((.*?)\)", text, re.S)
+    if match:
+        return re.findall(r"'([^']+)'", match.group(1))
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+
+def safe_name(passes):
+    # Mismo nombre que usaba el script: sin el guion inicial y con los caracteres raros cambiados por _
+    return "+".join(re.sub(r"[^a-zA-Z0-9]", "_", p[1:] if p.startswith("-") else p) for p in passes)
+
+def llvm_version(opt):
+    output = subprocess.run([opt, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True).stdout
+    match = re.search(r"LLVM version (\S+)", output)
+    return match.group(1) if match else "unknown"
+
+def sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def available_memory():
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+class MemoryBudget:
+    """
+    Admite trabajos mientras la suma de sus reservas quepa en el presupuesto. La reserva de cada trabajo es el mayor
+    RSS máximo observado hasta ahora (con un margen), o la estimación inicial si aún no ha terminado ninguno.
+    Un trabajo siempre se admite si no hay ninguno en marcha, aunque su reserva supere el presupuesto.
+    """
+    def __init__(self, budget, initial_estimate, margin=1.2):
+        self.budget = budget
+        self.estimate = initial_estimate
+        self.margin = margin
+        self.in_use = 0
+        self.running = 0
+        self.observed = False
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.running and self.in_use + self.estimate > self.budget:
+                self.condition.wait()
+            reserved = self.estimate
+            self.in_use += reserved
+            self.running += 1
+            return reserved
+
+    def release(self, reserved, observed_rss=None):
+        with self.condition:
+            self.in_use -= reserved
+            self.running -= 1
+            self._observe(observed_rss)
+            self.condition.notify_all()
+
+    def observe(self, observed_rss):
+        with self.condition:
+            self._observe(observed_rss)
+            self.condition.notify_all()
+
+    def _observe(self, observed_rss):
+        # La estimación inicial solo vale hasta la primera medida real
+        if observed_rss:
+            reserve = int(observed_rss * self.margin)
+            self.estimate = max(self.estimate, reserve) if self.observed else reserve
+            self.observed = True
+
+def run_opt(opt, passes, input_bc, output_bc, timeout):
+    """
+    Ejecuta opt y devuelve (estado, código de salida, tiempo real, rusage). El estado es ok, timeout o error.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([opt, *passes, input_bc, "-o", output_bc],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    finally:
+        timer.cancel()
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if wall >= timeout and process.returncode < 0:
+        return "timeout", process.returncode, wall, rusage
+    return ("ok" if process.returncode == 0 else "error"), process.returncode, wall, rusage
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfila el coste de cada pass de opt (en paralelo y según la memoria).")
+    parser.add_argument("--input", default="godot.bc", help="Bitcode de entrada.")
+    parser.add_argument("--passes-from", default="test_individual_passes.sh",
+                        help="Fichero con los passes: un test_individual_passes.sh (array all_passes) o uno por línea.")
+    parser.add_argument("--pairs", help="Passes separados por coma cuyas parejas ordenadas se perfilan además de los passes sueltos.")
+    parser.add_argument("--opt", default="opt", help="Ejecutable de opt.")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout de cada trabajo en segundos.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Trabajos simultáneos como máximo.")
+    parser.add_argument("--memory-gb", type=float,
+                        help="Memoria para los trabajos (por defecto, el 80%% de MemAvailable).")
+    parser.add_argument("--rss-factor", type=float, default=10.0,
+                        help="RSS inicial estimado por trabajo, en veces el tamaño del .bc de entrada.")
+    parser.add_argument("--output-dir", default=".", help="Carpeta de opt_times.csv, errors.log y la tabla de costes.")
+    args = parser.parse_args()
+
+    if shutil.which(args.opt) is None:
+        print(f"[ERROR] No se encuentra {args.opt}")
+        sys.exit(1)
+
+    passes = read_passes(args.passes_from)
+    jobs = [(p,) for p in passes]
+    if args.pairs:
+        pair_passes = [p.strip() for p in args.pairs.split(",") if p.strip()]
+        jobs += list(itertools.permutations(pair_passes, 2))
+
+    version = llvm_version(args.opt)
+    input_size = os.path.getsize(args.input)
+    if args.memory_gb:
+        budget = int(args.memory_gb * 1024 ** 3)
+    else:
+        budget = int((available_memory() or 8 * 1024 ** 3) * 0.8)
+    memory = MemoryBudget(budget, int(input_size * args.rss_factor))
+
+    print(f"LLVM {version}: {len(passes)} passes y {len(jobs) - len(passes)} parejas, hasta {args.jobs} trabajos a la vez "
+          f"con {budget / 1024 ** 3:.1f} GiB")
+
+    workdir = tempfile.mkdtemp(prefix="profile_opt_", dir=args.output_dir)
+    results = {}
+    lock = threading.Lock()
+    try:
+        # Referencia: opt sin passes, para saber si un pass cambia el IR
+        baseline_bc = os.path.join(workdir, "baseline.bc")
+        status, code, wall, rusage = run_opt(args.opt, [], args.input, baseline_bc, args.timeout)
+        if status != "ok":
+            print(f"[ERROR] opt sin passes ha fallado ({status}, código {code})")
+            sys.exit(1)
+        baseline_hash = sha256(baseline_bc)
+        baseline_size = os.path.getsize(baseline_bc)
+        memory.observe(rusage.ru_maxrss * 1024)
+        baseline = {"real_time_seconds": wall, "max_rss_kb": rusage.ru_maxrss, "ir_size": baseline_size}
+
+        def profile(job):
+            name = safe_name(job)
+            output_bc = os.path.join(workdir, f"{name}.bc")
+            reserved = memory.acquire()
+            rss = None
+            try:
+                status, code, wall, rusage = run_opt(args.opt, list(job), args.input, output_bc, args.timeout)
+                rss = rusage.ru_maxrss * 1024
+                entry = {
+                    "passes": list(job),
+                    "status": status,
+                    "returncode": code,
+                    "real_time_seconds": round(wall, 3),
+                    "user_seconds": round(rusage.ru_utime, 3),
+                    "sys_seconds": round(rusage.ru_stime, 3),
+                    "max_rss_kb": rusage.ru_maxrss
+                }
+                if status == "ok":
+                    size = os.path.getsize(output_bc)
+                    entry.update({"ir_size": size, "ir_size_delta": size - baseline_size,
+                                  "changed": sha256(output_bc) != baseline_hash})
+            finally:
+                if os.path.exists(output_bc):
+                    os.remove(output_bc)
+                memory.release(reserved, rss)
+            with lock:
+                results[name] = entry
+                print(f">> {' '.join(job)}: {status} en {entry['real_time_seconds']}s, "
+                      f"RSS máx {entry['max_rss_kb'] / 1024:.0f} MiB ({len(results)}/{len(jobs)})", flush=True)
+            return entry
+
+        with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            list(executor.map(profile, jobs))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Tabla de costes versionada
+    table = {
+        "llvm_version": version,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "input": os.path.abspath(args.input),
+        "input_size": input_size,
+        "timeout": args.timeout,
+        "baseline": baseline,
+        "passes": {safe_name(job): results[safe_name(job)] for job in jobs if len(job) == 1},
+        "pairs": {safe_name(job): results[safe_name(job)] for job in jobs if len(job) == 2}
+    }
+    table_path = os.path.join(args.output_dir, f"pass_costs-llvm{version}.json")
+    with open(table_path, "w") as f:
+        json.dump(table, f, indent=2)
+
+    # opt_times.csv y errors.log con el mismo formato que el script original (solo passes sueltos)
+    with open(os.path.join(args.output_dir, "opt_times.csv"), "w") as csv, \
+         open(os.path.join(args.output_dir, "errors.log"), "w") as errors:
+        csv.write(CSV_HEADER + "\n")
+        for p in passes:
+            entry = results[safe_name((p,))]
+            if entry["status"] == "ok":
+                csv.write(f"{safe_name((p,))},{entry['real_time_seconds']:.2f},ok\n")
+            elif entry["status"] == "timeout":
+                csv.write(f"{safe_name((p,))},{args.timeout:g},timeout\n")
+                errors.write(f"!! Pass {p} timed out\n")
+            else:
+                csv.write(f"{safe_name((p,))},,error\n")
+                errors.write(f"!! Pass {p} failed (code {entry['returncode']})\n")
+
+    print(f"[OK] Tabla de costes: {table_path}")
+
+if __name__ == "__main__":
+    main()